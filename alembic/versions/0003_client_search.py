@@ -0,0 +1,62 @@
+"""client search indexes (pg_trgm / FTS5)
+
+Revision ID: 0003_client_search
+Revises: 0002_add_user_token_version
+Create Date: 2026-10-17 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003_client_search'
+down_revision: Union[str, None] = '0002_add_user_token_version'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        # CONCURRENTLY keeps the clients table writable while the indexes build
+        with op.get_context().autocommit_block():
+            op.execute('CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_clients_name_trgm ON clients USING gin (name gin_trgm_ops)')
+            op.execute('CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_clients_email_trgm ON clients USING gin (email gin_trgm_ops)')
+    elif dialect == 'sqlite':
+        op.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS clients_fts USING fts5("
+            "name, email, content='clients', content_rowid='id', tokenize='trigram')"
+        )
+        op.execute(
+            "CREATE TRIGGER IF NOT EXISTS clients_fts_ai AFTER INSERT ON clients BEGIN "
+            "INSERT INTO clients_fts(rowid, name, email) VALUES (new.id, new.name, new.email); END"
+        )
+        op.execute(
+            "CREATE TRIGGER IF NOT EXISTS clients_fts_ad AFTER DELETE ON clients BEGIN "
+            "INSERT INTO clients_fts(clients_fts, rowid, name, email) VALUES ('delete', old.id, old.name, old.email); END"
+        )
+        op.execute(
+            "CREATE TRIGGER IF NOT EXISTS clients_fts_au AFTER UPDATE OF name, email ON clients BEGIN "
+            "INSERT INTO clients_fts(clients_fts, rowid, name, email) VALUES ('delete', old.id, old.name, old.email); "
+            "INSERT INTO clients_fts(rowid, name, email) VALUES (new.id, new.name, new.email); END"
+        )
+        # Index the clients that already exist
+        op.execute("INSERT INTO clients_fts(clients_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute('DROP INDEX IF EXISTS ix_clients_email_trgm')
+        op.execute('DROP INDEX IF EXISTS ix_clients_name_trgm')
+    elif dialect == 'sqlite':
+        op.execute('DROP TRIGGER IF EXISTS clients_fts_au')
+        op.execute('DROP TRIGGER IF EXISTS clients_fts_ad')
+        op.execute('DROP TRIGGER IF EXISTS clients_fts_ai')
+        op.execute('DROP TABLE IF EXISTS clients_fts')
@@ -0,0 +1,70 @@
+"""sales report aggregate tables
+
+Revision ID: 0004_sales_reports
+Revises: 0003_client_search
+Create Date: 2026-10-17 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004_sales_reports'
+down_revision: Union[str, None] = '0003_client_search'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'report_daily_revenue',
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('orders_count', sa.Integer(), nullable=False),
+        sa.Column('units', sa.Integer(), nullable=False),
+        sa.Column('revenue', sa.Numeric(precision=14, scale=2), nullable=False),
+        sa.PrimaryKeyConstraint('day')
+    )
+    op.create_table(
+        'report_product_sales',
+        sa.Column('product_id', sa.Integer(), nullable=False),
+        sa.Column('units', sa.Integer(), nullable=False),
+        sa.Column('revenue', sa.Numeric(precision=14, scale=2), nullable=False),
+        sa.PrimaryKeyConstraint('product_id')
+    )
+    op.create_table(
+        'report_section_revenue',
+        sa.Column('section', sa.String(), nullable=False),
+        sa.Column('units', sa.Integer(), nullable=False),
+        sa.Column('revenue', sa.Numeric(precision=14, scale=2), nullable=False),
+        sa.PrimaryKeyConstraint('section')
+    )
+
+    # Backfill from the existing orders (same queries as `python -m app.cli rebuild-reports`)
+    op.execute(
+        "INSERT INTO report_daily_revenue (day, orders_count, units, revenue) "
+        "SELECT date(o.created_at), count(o.id), coalesce(sum(u.units), 0), sum(o.total_value) FROM orders o "
+        "LEFT JOIN (SELECT order_id, sum(quantity) AS units FROM order_items GROUP BY order_id) u ON u.order_id = o.id "
+        "WHERE o.status NOT IN ('cancelled') GROUP BY date(o.created_at)"
+    )
+    op.execute(
+        "INSERT INTO report_product_sales (product_id, units, revenue) "
+        "SELECT i.product_id, sum(i.quantity), sum(i.quantity * i.unit_price) FROM order_items i "
+        "JOIN orders o ON o.id = i.order_id WHERE o.status NOT IN ('cancelled') GROUP BY i.product_id"
+    )
+    op.execute(
+        "INSERT INTO report_section_revenue (section, units, revenue) "
+        "SELECT coalesce(p.section, ''), sum(i.quantity), sum(i.quantity * i.unit_price) FROM order_items i "
+        "JOIN orders o ON o.id = i.order_id JOIN products p ON p.id = i.product_id "
+        "WHERE o.status NOT IN ('cancelled') GROUP BY coalesce(p.section, '')"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('report_section_revenue')
+    op.drop_table('report_product_sales')
+    op.drop_table('report_daily_revenue')
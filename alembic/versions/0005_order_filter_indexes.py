@@ -0,0 +1,55 @@
+"""composite indexes for the order filters
+
+Revision ID: 0005_order_filter_indexes
+Revises: 0004_sales_reports
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005_order_filter_indexes'
+down_revision: Union[str, None] = '0004_sales_reports'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (name, table, columns)
+INDEXES = (
+    ('ix_orders_client_id_created_at', 'orders', ['client_id', 'created_at']),
+    ('ix_orders_status_created_at', 'orders', ['status', 'created_at']),
+    ('ix_orders_created_at', 'orders', ['created_at']),
+    ('ix_order_items_order_id', 'order_items', ['order_id']),
+    ('ix_order_items_product_id_order_id', 'order_items', ['product_id', 'order_id']),
+)
+
+
+def _run(operations) -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        # CONCURRENTLY keeps orders writable while the indexes build; it can't run in a transaction
+        with op.get_context().autocommit_block():
+            operations(postgresql_concurrently=True)
+    else:
+        operations()
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    def operations(**kw):
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, unique=False, if_not_exists=True, **kw)
+        # Covered by ix_orders_status_created_at (status is its leading column)
+        op.drop_index('ix_orders_status', table_name='orders', if_exists=True, **kw)
+    _run(operations)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    def operations(**kw):
+        op.create_index('ix_orders_status', 'orders', ['status'], unique=False, if_not_exists=True, **kw)
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, if_exists=True, **kw)
+    _run(operations)
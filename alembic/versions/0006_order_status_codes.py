@@ -0,0 +1,115 @@
+"""store orders.status as a SMALLINT code
+
+Revision ID: 0006_order_status_codes
+Revises: 0005_order_filter_indexes
+Create Date: 2026-10-17 15:00:00.000000
+
+"""
+import logging
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006_order_status_codes'
+down_revision: Union[str, None] = '0005_order_filter_indexes'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+logger = logging.getLogger('alembic.runtime.migration')
+
+BATCH_SIZE = 10_000
+# Frozen copy of app.models.order_status.ORDER_STATUS_CODES at this revision
+STATUS_CODES = {'pending': 1, 'processing': 2, 'shipped': 3, 'delivered': 4, 'cancelled': 5}
+# Reviewed spellings from before the enum, and the code each one becomes.
+# Any other value stops the upgrade (see _check_statuses): add it here once
+# someone has decided what it means, or fix those rows first
+LEGACY_STATUS_CODES = {'canceled': 5}
+KNOWN_STATUS_CODES = {**STATUS_CODES, **LEGACY_STATUS_CODES}
+# No ELSE: an unmapped value stays NULL and the NOT NULL swap refuses it
+TO_CODE = (
+    "CASE lower(trim(status)) "
+    + " ".join(f"WHEN '{name}' THEN {code}" for name, code in KNOWN_STATUS_CODES.items())
+    + " END"
+)
+TO_TEXT = (
+    "CASE status "
+    + " ".join(f"WHEN {code} THEN '{name}'" for name, code in STATUS_CODES.items())
+    + " END"
+)
+
+
+def _convert_in_batches(column: str, expression: str) -> None:
+    # Fill the new column id range by id range so no statement holds row locks on the whole table
+    bind = op.get_bind()
+    max_id = bind.execute(sa.text('SELECT max(id) FROM orders')).scalar() or 0
+    for low in range(0, max_id, BATCH_SIZE):
+        bind.execute(
+            sa.text(f'UPDATE orders SET {column} = {expression} WHERE id > :low AND id <= :high'),
+            {'low': low, 'high': low + BATCH_SIZE},
+        )
+
+
+def _swap_status_column(new_column: str, nullable_type) -> None:
+    # Replace orders.status with the filled new column
+    op.drop_index('ix_orders_status_id', table_name='orders', if_exists=True)
+    op.drop_index('ix_orders_status_created_at', table_name='orders', if_exists=True)
+    if op.get_bind().dialect.name == 'sqlite':
+        with op.batch_alter_table('orders') as batch_op:
+            batch_op.drop_column('status')
+            batch_op.alter_column(new_column, new_column_name='status', existing_type=nullable_type, nullable=False)
+    else:
+        op.drop_column('orders', 'status')
+        op.alter_column('orders', new_column, new_column_name='status', existing_type=nullable_type, nullable=False)
+    op.create_index('ix_orders_status_created_at', 'orders', ['status', 'created_at'], unique=False)
+    if new_column == 'status_code':
+        # Status-only filters, in page (id) order
+        op.create_index('ix_orders_status_id', 'orders', ['status', 'id'], unique=False)
+
+
+def _check_statuses(bind) -> None:
+    # Fail before changing anything rather than guess what an unknown status meant
+    unknown = bind.execute(sa.text(
+        "SELECT status, count(*) FROM orders "
+        "WHERE status IS NULL OR lower(trim(status)) NOT IN ("
+        + ", ".join(f"'{name}'" for name in KNOWN_STATUS_CODES) + ") "
+        "GROUP BY status ORDER BY count(*) DESC"
+    )).all()
+    if unknown:
+        values = ", ".join(f"{status!r} ({count} orders)" for status, count in unknown)
+        raise RuntimeError(
+            f"0006_order_status_codes: orders.status has values with no status code: {values}. "
+            "Map them in LEGACY_STATUS_CODES or update those orders, then run the upgrade again."
+        )
+    legacy = bind.execute(sa.text(
+        "SELECT count(*) FROM orders WHERE lower(trim(status)) IN ("
+        + ", ".join(f"'{name}'" for name in LEGACY_STATUS_CODES) + ")"
+    )).scalar()
+    if legacy:
+        logger.info("0006_order_status_codes: %d orders with a legacy status spelling mapped through LEGACY_STATUS_CODES", legacy)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    _check_statuses(bind)
+
+    op.add_column('orders', sa.Column('status_code', sa.SmallInteger(), nullable=True))
+    if bind.dialect.name == 'postgresql':
+        # One committed transaction per batch keeps lock times short on a live table
+        with op.get_context().autocommit_block():
+            _convert_in_batches('status_code', TO_CODE)
+    else:
+        _convert_in_batches('status_code', TO_CODE)
+    # Catch rows written by the old code while the batches ran
+    op.execute(f'UPDATE orders SET status_code = {TO_CODE} WHERE status_code IS NULL')
+    _swap_status_column('status_code', sa.SmallInteger())
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.add_column('orders', sa.Column('status_text', sa.String(), nullable=True))
+    _convert_in_batches('status_text', TO_TEXT)
+    _swap_status_column('status_text', sa.String())
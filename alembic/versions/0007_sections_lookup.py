@@ -0,0 +1,88 @@
+"""sections lookup table, products.section_id and orders.section_bits
+
+Revision ID: 0007_sections_lookup
+Revises: 0006_order_status_codes
+Create Date: 2026-10-17 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0007_sections_lookup'
+down_revision: Union[str, None] = '0006_order_status_codes'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 10_000
+# Frozen copy of app.services.section.SECTION_BITMAP_SIZE at this revision
+SECTION_BITMAP_SIZE = 62
+# Bitwise OR of the order's section bits (distinct powers of two, so SUM(DISTINCT) is the OR)
+SECTION_BITS = (
+    "coalesce((SELECT sum(DISTINCT CASE WHEN p.section_id <= {size} "
+    "THEN CAST(1 AS BIGINT) << (p.section_id - 1) ELSE CAST(1 AS BIGINT) << {size} END) "
+    "FROM order_items i JOIN products p ON p.id = i.product_id "
+    "WHERE i.order_id = orders.id AND p.section_id IS NOT NULL), 0)"
+).format(size=SECTION_BITMAP_SIZE)
+
+
+def _fill_section_bits() -> None:
+    # id range by id range so no statement holds row locks on the whole table
+    bind = op.get_bind()
+    max_id = bind.execute(sa.text('SELECT max(id) FROM orders')).scalar() or 0
+    for low in range(0, max_id, BATCH_SIZE):
+        bind.execute(
+            sa.text(f'UPDATE orders SET section_bits = {SECTION_BITS} WHERE id > :low AND id <= :high'),
+            {'low': low, 'high': low + BATCH_SIZE},
+        )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'sections',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('name')
+    )
+    op.create_index(op.f('ix_sections_id'), 'sections', ['id'], unique=False)
+    op.execute(
+        "INSERT INTO sections (name) SELECT DISTINCT section FROM products "
+        "WHERE section IS NOT NULL AND section != '' ORDER BY section"
+    )
+
+    op.add_column('products', sa.Column('section_id', sa.Integer(), nullable=True))
+    op.execute("UPDATE products SET section_id = (SELECT s.id FROM sections s WHERE s.name = products.section)")
+    op.drop_index('ix_products_section', table_name='products', if_exists=True)
+    with op.batch_alter_table('products') as batch_op:
+        batch_op.create_foreign_key('fk_products_section_id_sections', 'sections', ['section_id'], ['id'])
+        batch_op.drop_column('section')
+    op.create_index(op.f('ix_products_section_id'), 'products', ['section_id'], unique=False)
+
+    op.add_column('orders', sa.Column('section_bits', sa.BigInteger(), server_default='0', nullable=False))
+    if op.get_bind().dialect.name == 'postgresql':
+        # One committed transaction per batch keeps lock times short on a live table
+        with op.get_context().autocommit_block():
+            _fill_section_bits()
+    else:
+        _fill_section_bits()
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('orders', 'section_bits')
+
+    op.add_column('products', sa.Column('section', sa.String(), nullable=True))
+    op.execute("UPDATE products SET section = (SELECT s.name FROM sections s WHERE s.id = products.section_id)")
+    op.drop_index(op.f('ix_products_section_id'), table_name='products')
+    with op.batch_alter_table('products') as batch_op:
+        batch_op.drop_constraint('fk_products_section_id_sections', type_='foreignkey')
+        batch_op.drop_column('section_id')
+    op.create_index(op.f('ix_products_section'), 'products', ['section'], unique=False)
+
+    op.drop_index(op.f('ix_sections_id'), table_name='sections')
+    op.drop_table('sections')
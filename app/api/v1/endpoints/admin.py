@@ -0,0 +1,88 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi.responses import JSONResponse
+from app import database
+from app.core import profiler, request_timing, security
+from app.core.principal_cache import Principal
+from app.core.config import settings
+from app.core.response_cache import response_cache
+
+router = APIRouter(route_class=request_timing.TimedRoute)
+
+@router.get("/db/pool", tags=["admin"])
+async def read_pool_metrics(
+    current_user: Principal = Depends(security.get_current_active_superuser) # Require superuser
+):
+    """
+    Report connection pool health for every database engine.
+
+    Requires superuser authentication.
+    - **checked_out** / **idle**: Connections currently in use / available in the pool.
+    - **avg_checkout_wait_ms** / **max_checkout_wait_ms**: Time spent acquiring a connection.
+    - **timeouts**: Checkouts that failed because the pool was exhausted.
+    - **connection_errors**: Failed connects and disconnects detected on use.
+    """
+    return {name: metrics.snapshot() for name, metrics in database.pool_metrics.items()}
+
+@router.get("/db/replicas", tags=["admin"])
+async def read_replica_status(
+    current_user: Principal = Depends(security.get_current_active_superuser) # Require superuser
+):
+    """
+    Report read-replica routing state.
+
+    Requires superuser authentication.
+    - **healthy**: Whether the replica currently receives reads.
+    - **sessions_served**: Read sessions handed out by the replica.
+    - **primary_fallbacks**: Reads sent to the primary because no replica was healthy.
+    """
+    return database.replica_router.status()
+
+@router.get("/cache/responses", tags=["admin"])
+async def read_response_cache_stats(
+    current_user: Principal = Depends(security.get_current_active_superuser) # Require superuser
+):
+    """
+    Report response cache counters (product catalog GETs).
+
+    Requires superuser authentication.
+    - **hits** / **misses**: Lookups answered from / missing in the cache (an invalidated entry counts as a miss).
+    - **not_modified**: `304 Not Modified` answers to `If-None-Match`.
+    - **stale_fills**: Bodies not stored because a write was committed while they were built.
+    - **lagged_fills**: Bodies not stored because they were read from a replica too soon after a write they depend on.
+    """
+    return response_cache.stats()
+
+@router.get("/profile", tags=["admin"])
+async def read_profile(
+    seconds: float = Query(10.0, alias="segundos", gt=0, le=settings.PROFILER_MAX_SECONDS, description="How long to sample"),
+    interval_ms: float = Query(5.0, alias="intervalo_ms", ge=1, le=1000, description="Time between samples"),
+    format: str = Query("collapsed", pattern="^(collapsed|speedscope)$", description="Output format: collapsed or speedscope"),
+    app_only: bool = Query(True, alias="apenas_app", description="Only stacks through app code (handlers, services.*), trimmed to it"),
+    current_user: Principal = Depends(security.get_current_active_superuser) # Require superuser
+):
+    """
+    Sample the stacks of this worker's threads for a while and return the profile.
+
+    Requires superuser authentication.
+    - **segundos**: Profile duration (capped by `PROFILER_MAX_SECONDS`).
+    - **intervalo_ms**: Time between samples; stretched if sampling would exceed `PROFILER_MAX_OVERHEAD`.
+    - **format**: `collapsed` (one `root;...;leaf count` line per stack, for flamegraph.pl) or `speedscope` (JSON for speedscope.app).
+    - **apenas_app**: Keep only stacks through app code, starting at the outermost app frame (default true).
+
+    The response arrives when the profile ends; only the worker serving it is profiled.
+    `X-Profile-Samples`, `X-Profile-Ticks` and `X-Profile-Overhead` (fraction of the wall time spent sampling) describe the run.
+    """
+    try:
+        result = await profiler.profile(seconds, interval_ms / 1000, settings.PROFILER_MAX_OVERHEAD, app_only=app_only)
+    except profiler.ProfilerBusy:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="A profile is already running in this worker")
+    summary = result.summary()
+    headers = {
+        "X-Profile-Samples": str(summary["samples"]),
+        "X-Profile-Ticks": str(summary["ticks"]),
+        "X-Profile-Overhead": str(summary["overhead"]),
+    }
+    if format == "speedscope":
+        headers["Content-Disposition"] = 'attachment; filename="profile.speedscope.json"'
+        return JSONResponse(result.speedscope(name=f"{seconds:g}s at {interval_ms:g}ms"), headers=headers)
+    return Response(content=result.collapsed(), media_type="text/plain", headers=headers)
@@ -1,14 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
-from app import schemas, services, models # Adjust imports based on your structure
-from app.database import get_db
-from app.core import security
+from app import schemas, services # Adjust imports based on your structure
+from app.database import DBSession, get_session
+from app.core import metrics, request_timing, security
+from app.core.principal_cache import Principal
 
-router = APIRouter()
+router = APIRouter(route_class=request_timing.TimedRoute)
 
 @router.post("/register", response_model=schemas.User, status_code=status.HTTP_201_CREATED, tags=["auth"])
-def register_user(user_in: schemas.UserCreate, db: Session = Depends(get_db)):
+async def register_user(user_in: schemas.UserCreate, db: DBSession = Depends(get_session)):
     """
     Register a new user.
 
@@ -19,7 +19,7 @@ def register_user(user_in: schemas.UserCreate, db: Session = Depends(get_db)):
     """
     # Check if user already exists is handled in services.create_user
     try:
-        user = services.auth.create_user(db=db, user=user_in)
+        user = await services.auth.create_user_async(db=db, user=user_in)
         return user
     except HTTPException as e:
         raise e # Re-raise HTTPException from service layer
@@ -28,20 +28,22 @@ def register_user(user_in: schemas.UserCreate, db: Session = Depends(get_db)):
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Could not register user")
 
 @router.post("/login", response_model=schemas.Token, tags=["auth"])
-def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: DBSession = Depends(get_session)):
     """
     Authenticate a user and return JWT tokens.
 
     Uses OAuth2PasswordRequestForm, expects 'username' (which is email here) and 'password'.
     """
-    user = services.auth.authenticate_user(db, email=form_data.username, password=form_data.password)
+    user = await services.auth.authenticate_user_async(db, email=form_data.username, password=form_data.password)
     if not user:
+        metrics.auth_failures.inc("bad_credentials")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
     if not user.is_active:
+        metrics.auth_failures.inc("inactive_user")
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Inactive user")
 
     # Generate access and potentially refresh tokens
@@ -49,7 +51,7 @@ def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db:
     return tokens
 
 @router.post("/refresh-token", response_model=schemas.Token, tags=["auth"])
-def refresh_token(refresh_token_data: schemas.Token, db: Session = Depends(get_db)):
+async def refresh_token(refresh_token_data: schemas.Token, db: DBSession = Depends(get_session)):
     """
     Refresh the access token using a valid refresh token.
     (Note: Current implementation uses the provided token directly for simplicity,
@@ -61,7 +63,7 @@ def refresh_token(refresh_token_data: schemas.Token, db: Session = Depends(get_d
     try:
         # Assuming the input schema `Token` contains the refresh token in `access_token` field for this example
         # Adjust schema if you have a dedicated RefreshToken schema
-        new_tokens = services.auth.refresh_access_token(refresh_token=refresh_token_data.access_token, db=db)
+        new_tokens = await services.aio.auth.refresh_access_token(refresh_token=refresh_token_data.access_token, db=db)
         return new_tokens
     except HTTPException as e:
         raise e
@@ -69,9 +71,35 @@ def refresh_token(refresh_token_data: schemas.Token, db: Session = Depends(get_d
         # Log the exception e
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Could not refresh token")
 
+@router.put("/users/{user_id}", response_model=schemas.User, tags=["users"])
+async def update_user(
+    user_id: int,
+    user_in: schemas.UserUpdate,
+    db: DBSession = Depends(get_session),
+    current_user: Principal = Depends(security.get_current_active_superuser) # Require superuser
+):
+    """
+    Update a user (e.g. deactivate or change privileges).
+
+    Requires superuser authentication. Deactivating, demoting, changing the email
+    or the password revokes every token previously issued to the user.
+    """
+    try:
+        # Hash a new password on the hashing pool rather than inside the DB call
+        hashed_password = await security.get_password_hash_async(user_in.password) if user_in.password else None
+        updated_user = await services.aio.auth.update_user(db=db, user_id=user_id, user_update=user_in, hashed_password=hashed_password)
+        if updated_user is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+        return updated_user
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        # Log e
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Could not update user")
+
 # Example protected endpoint to test authentication
 @router.get("/users/me", response_model=schemas.User, tags=["users"])
-def read_users_me(current_user: models.User = Depends(security.get_current_active_user)):
+async def read_users_me(current_user: Principal = Depends(security.get_current_active_user)):
     """
     Get current logged-in user's details.
     """
@@ -1,17 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from typing import List, Optional
-from app import schemas, services, models
-from app.database import get_db
-from app.core import security
+from app import schemas, services
+from app.database import DBSession, get_read_session, get_session
+from app.core import request_timing, security, pagination
+from app.core.principal_cache import Principal
 
-router = APIRouter()
+router = APIRouter(route_class=request_timing.TimedRoute)
 
 @router.post("/", response_model=schemas.Client, status_code=status.HTTP_201_CREATED, tags=["clients"])
-def create_client(
+async def create_client(
     client_in: schemas.ClientCreate,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(security.get_current_active_user) # Require authentication
+    db: DBSession = Depends(get_session),
+    current_user: Principal = Depends(security.get_current_active_user) # Require authentication
     # Add authorization if needed, e.g., Depends(security.get_current_active_superuser)
 ):
     """
@@ -28,7 +28,7 @@ def create_client(
     # if not current_user.is_superuser:
     #     raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not enough permissions")
     try:
-        return services.client.create_client(db=db, client=client_in)
+        return await services.aio.client.create_client(db=db, client=client_in)
     except HTTPException as e:
         raise e
     except Exception as e:
@@ -36,13 +36,16 @@ def create_client(
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Could not create client")
 
 @router.get("/", response_model=List[schemas.Client], tags=["clients"])
-def read_clients(
+async def read_clients(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     name: Optional[str] = Query(None, description="Filter clients by name (case-insensitive partial match)"),
     email: Optional[str] = Query(None, description="Filter clients by email (case-insensitive partial match)"),
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(security.get_current_active_user) # Require authentication
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header of the previous page (keyset pagination, ignores skip)"),
+    q: Optional[str] = Query(None, description="Search clients by name or email (substring match, ranked by relevance; paginate with skip/limit)"),
+    db: DBSession = Depends(get_read_session),
+    current_user: Principal = Depends(security.get_current_active_user) # Require authentication
 ):
     """
     Retrieve a list of clients with pagination and filtering.
@@ -52,33 +55,38 @@ def read_clients(
     - **limit**: Maximum number of clients to return.
     - **name**: Filter by client name.
     - **email**: Filter by client email.
+    - **cursor**: Continue from a previous page (see the `X-Next-Cursor` response header).
+    - **q**: Search by name or email, best matches first (uses the full-text/trigram search index).
     """
-    clients = services.client.get_clients(db, skip=skip, limit=limit, name=name, email=email)
+    clients = await services.aio.client.get_clients(db, skip=skip, limit=limit, name=name, email=email, cursor=cursor, q=q)
+    cursor_value = pagination.next_cursor(clients, limit) if not (q and q.strip()) else None
+    if cursor_value:
+        response.headers[pagination.NEXT_CURSOR_HEADER] = cursor_value
     return clients
 
 @router.get("/{client_id}", response_model=schemas.Client, tags=["clients"])
-def read_client(
+async def read_client(
     client_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(security.get_current_active_user) # Require authentication
+    db: DBSession = Depends(get_read_session),
+    current_user: Principal = Depends(security.get_current_active_user) # Require authentication
 ):
     """
     Get a specific client by ID.
 
     Requires authentication.
     """
-    db_client = services.client.get_client(db, client_id=client_id)
+    db_client = await services.aio.client.get_client(db, client_id=client_id)
     if db_client is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Client not found")
     # Add authorization check if users should only see specific clients (e.g., related orders)
     return db_client
 
 @router.put("/{client_id}", response_model=schemas.Client, tags=["clients"])
-def update_client(
+async def update_client(
     client_id: int,
     client_in: schemas.ClientUpdate,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(security.get_current_active_user) # Require authentication
+    db: DBSession = Depends(get_session),
+    current_user: Principal = Depends(security.get_current_active_user) # Require authentication
     # Add authorization if needed, e.g., Depends(security.get_current_active_superuser)
 ):
     """
@@ -90,7 +98,7 @@ def update_client(
     # if not current_user.is_superuser:
     #     raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not enough permissions")
     try:
-        updated_client = services.client.update_client(db=db, client_id=client_id, client_update=client_in)
+        updated_client = await services.aio.client.update_client(db=db, client_id=client_id, client_update=client_in)
         if updated_client is None:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Client not found")
         return updated_client
@@ -101,10 +109,10 @@ def update_client(
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Could not update client")
 
 @router.delete("/{client_id}", response_model=schemas.Client, tags=["clients"])
-def delete_client(
+async def delete_client(
     client_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(security.get_current_active_superuser) # Require superuser authentication
+    db: DBSession = Depends(get_session),
+    current_user: Principal = Depends(security.get_current_active_superuser) # Require superuser authentication
 ):
     """
     Delete a client.
@@ -112,7 +120,7 @@ def delete_client(
     Requires superuser authentication.
     Note: Consider implications for related orders (cascade delete, soft delete, prevent deletion).
     """
-    deleted_client = services.client.delete_client(db=db, client_id=client_id)
+    deleted_client = await services.aio.client.delete_client(db=db, client_id=client_id)
     if deleted_client is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Client not found")
     return deleted_client # Returns the client object that was deleted
@@ -1,19 +1,42 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from typing import List, Optional
+import asyncio
+import time
+from fastapi import APIRouter, Depends, Header, HTTPException, status, Query, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional, Union
 from datetime import datetime
-from app import schemas, services, models
+from app import schemas, services
 from app.schemas import message # Corrected import
-from app.database import get_db
-from app.core import security
+from app.database import DBSession, get_read_session, get_session
+from app.core import export, fast_json, request_timing, security, pagination
+from app.core.principal_cache import Principal
+from app.core.config import settings
 
-router = APIRouter()
+router = APIRouter(route_class=request_timing.TimedRoute)
+
+IDEMPOTENCY_POLL_SECONDS = 0.05 # How often a duplicate request checks whether the first one finished
+
+async def _replay_order(db: DBSession, previous) -> Response:
+    # Answer a repeated Idempotency-Key with the first request's response
+    body = previous.response_body
+    if body is None:
+        # Order committed but its response not stored yet (or the worker died in between)
+        order = await services.aio.order.get_order(db, previous.order_id)
+        if order is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="The order created with this Idempotency-Key no longer exists")
+        with request_timing.serializing():
+            body = schemas.Order.model_validate(order).model_dump_json()
+    return Response(
+        content=body, status_code=previous.response_status or status.HTTP_201_CREATED,
+        media_type="application/json", headers={"Idempotent-Replayed": "true"},
+    )
 
 @router.post("/", response_model=schemas.Order, status_code=status.HTTP_201_CREATED, tags=["orders"])
-def create_order(
+async def create_order(
     order_in: schemas.OrderCreate,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(security.get_current_active_user) # Require authentication
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", min_length=1, max_length=255, description="Client-generated key; retries with the same key create the order only once"),
+    db: DBSession = Depends(get_session),
+    current_user: Principal = Depends(security.get_current_active_user) # Require authentication
 ):
     """
     Create a new order.
@@ -24,29 +47,121 @@ def create_order(
     - **items**: List of items in the order:
         - **product_id**: ID of the product.
         - **quantity**: Quantity of the product.
+    - **Idempotency-Key** header: (Optional) Retries with the same key and body return the
+      first response (`Idempotent-Replayed: true`) instead of creating another order. A
+      duplicate sent while the first request is running waits for it. Reusing a key with a
+      different body is rejected (422). Keys are scoped per user and expire after
+      `IDEMPOTENCY_KEY_TTL_SECONDS`.
     """
     # Authorization: Any active user can create an order for now.
     # Could add logic to check if client_id matches user or if user is admin.
+    if idempotency_key is None:
+        try:
+            return await services.aio.order.create_order(db=db, order_in=order_in)
+        except HTTPException as e:
+            raise e
+        except Exception as e:
+            # Log e
+            raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Could not create order: {str(e)}")
+
+    key = (current_user.id, idempotency_key)
+    request_hash = services.idempotency.fingerprint(order_in.model_dump(mode="json"))
+    deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_SECONDS
+    while True:
+        previous = await services.aio.idempotency.claim(db, *key, request_hash)
+        if previous is None:
+            break # This request owns the key
+        if previous.completed:
+            return await _replay_order(db, previous)
+        if time.monotonic() >= deadline:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="A request with this Idempotency-Key is still in progress; retry later")
+        await asyncio.sleep(IDEMPOTENCY_POLL_SECONDS)
+
     try:
-        return services.order.create_order(db=db, order_in=order_in)
-    except HTTPException as e:
-        raise e
+        order = await services.aio.order.create_order(db=db, order_in=order_in, idempotency_key=key)
     except Exception as e:
-        # Log e
+        # Nothing was created: free the key so a retry runs again
+        await services.aio.idempotency.release(db, *key)
+        if isinstance(e, HTTPException):
+            raise e
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Could not create order: {str(e)}")
+    with request_timing.serializing():
+        body = schemas.Order.model_validate(order).model_dump_json()
+    await services.aio.idempotency.store_response(db, *key, status.HTTP_201_CREATED, body)
+    return Response(content=body, status_code=status.HTTP_201_CREATED, media_type="application/json")
+
+@router.post("/batch", response_model=schemas.OrderBatchResult, tags=["orders"])
+async def create_orders_batch(
+    batch: schemas.OrderBatchCreate,
+    db: DBSession = Depends(get_session),
+    current_user: Principal = Depends(security.get_current_active_user) # Require authentication
+):
+    """
+    Create many orders in one request.
+
+    Requires authentication.
+    - **orders**: List of orders, each with the same fields as `POST /orders/` (at most `ORDER_BATCH_MAX_SIZE`).
+    - **mode**: `partial` (default) creates every valid order and reports the others;
+      `all_or_nothing` creates none of them when any order fails.
+
+    Orders are checked in request order, each against the stock left by the orders before it.
+    **results** has one entry per order, in request order, with its **order_id** or its **error**.
+    """
+    return await services.aio.order.create_orders_batch(db, batch)
+
+# The body is encoded by the endpoint (no response_model), so its shapes are documented here.
+# fields/expand drop keys from these schemas: every property but id may be missing.
+READ_ORDERS_EXAMPLES = {
+    "sparse": {
+        "summary": "?fields=id,status,total_value,client.name",
+        "value": [{"status": "pending", "id": 1, "total_value": "59.90", "client": {"name": "Maria Silva"}}],
+    },
+    "no_expansion": {
+        "summary": "?expand= (client_id / product_id only)",
+        "value": [{
+            "client_id": 3, "status": "pending", "id": 1, "total_value": "59.90",
+            "created_at": "2024-05-01T12:00:00Z", "updated_at": None,
+            "items": [{"product_id": 7, "quantity": 2, "id": 1, "order_id": 1, "unit_price": "29.95"}],
+        }],
+    },
+    "compact": {
+        "summary": "?compact=true&fields=id,status,items.quantity,items.product.description",
+        "value": {
+            "data": [{"status": "pending", "id": 1, "items": [{"product_id": 7, "quantity": 2}]}],
+            "included": {"products": {"7": {"description": "Vestido floral"}}},
+        },
+    },
+}
 
-@router.get("/", response_model=List[schemas.Order], tags=["orders"])
-def read_orders(
+@router.get(
+    "/",
+    response_model=None,
+    responses={200: {
+        "model": Union[List[schemas.Order], schemas.OrderCompactPage],
+        "description": (
+            "A list of orders, or with compact=true an OrderCompactPage. With fields or expand, "
+            "only the selected properties are present (id always is), and unexpanded client / "
+            "product objects are omitted, as are their entries in included."
+        ),
+        "content": {"application/json": {"examples": READ_ORDERS_EXAMPLES}},
+    }},
+    tags=["orders"],
+)
+async def read_orders(
     skip: int = 0,
     limit: int = 100,
     start_date: Optional[datetime] = Query(None, alias="periodo_inicio", description="Filter orders created on or after this date/time"),
     end_date: Optional[datetime] = Query(None, alias="periodo_fim", description="Filter orders created on or before this date/time"),
     product_section: Optional[str] = Query(None, alias="secao_produto", description="Filter orders containing products from a specific section"),
     order_id: Optional[int] = Query(None, alias="id_pedido", description="Filter by specific order ID"),
-    status: Optional[str] = Query(None, description="Filter orders by status (case-insensitive partial match)"),
+    status: Optional[str] = Query(None, description="Filter by exact status; several comma-separated (e.g. pending,processing)"),
     client_id: Optional[int] = Query(None, alias="cliente_id", description="Filter orders by client ID"),
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(security.get_current_active_user) # Require authentication
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header of the previous page (keyset pagination, ignores skip)"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, dotted for nested ones (e.g. id,status,client.name,items.quantity)"),
+    expand: Optional[str] = Query(None, description="Embedded objects: client, items.product (default both; empty for none)"),
+    compact: bool = Query(False, description="Return {data, included}: expanded clients and products once each, referenced by id"),
+    db: DBSession = Depends(get_read_session),
+    current_user: Principal = Depends(security.get_current_active_user) # Require authentication
 ):
     """
     Retrieve a list of orders with pagination and filtering.
@@ -58,31 +173,99 @@ def read_orders(
     - **periodo_fim**: Filter by end date/time.
     - **secao_produto**: Filter by product section.
     - **id_pedido**: Filter by order ID.
-    - **status**: Filter by order status.
+    - **status**: Filter by order status (pending, processing, shipped, delivered, cancelled; comma-separated for several).
     - **cliente_id**: Filter by client ID.
+    - **cursor**: Continue from a previous page (see the `X-Next-Cursor` response header).
+    - **fields**: Only these fields (`id` is always returned). `client.<field>`, `items.<field>` and
+      `items.product.<field>` select nested ones; `client`, `items` or `items.product` alone keep all of theirs.
+      With **fields**, nested objects are returned only when named there or listed in **expand**.
+    - **expand**: `client` and/or `items.product` embed those objects (default both). Without them only
+      `client_id` / `product_id` are returned, and their tables are not queried.
+    - **compact**: Instead of a list, `{"data": [...], "included": {"clients": {id: ...}, "products": {id: ...}}}`:
+      each expanded client and product appears once, however many orders and items reference it.
+
+    Only the selected columns are read from the database.
     """
     # Authorization: Allow any authenticated user to list orders for now.
     # Could restrict to own orders or admin view.
-    orders = services.order.get_orders(
+    projection = services.order.parse_order_projection(fields, expand, compact)
+    # Rows straight to dicts shaped like schemas.Order, encoded once (no per-object
+    # validation); the bytes match the response_model path, see core/fast_json.py
+    orders, included = await services.aio.order.get_order_page(
         db, skip=skip, limit=limit,
         start_date=start_date, end_date=end_date,
         product_section=product_section, order_id=order_id,
-        status=status, client_id=client_id
+        status=status, client_id=client_id, cursor=cursor,
+        projection=projection
+    )
+    headers = {}
+    cursor_value = pagination.next_cursor(orders, limit)
+    if cursor_value:
+        headers[pagination.NEXT_CURSOR_HEADER] = cursor_value
+    payload = {"data": orders, "included": included} if compact else orders
+    with request_timing.serializing():
+        body = fast_json.encode(payload)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+@router.get("/export", tags=["orders"])
+async def export_orders(
+    format: str = Query("csv", pattern="^(csv|ndjson)$", description="Export format: csv or ndjson"),
+    start_date: Optional[datetime] = Query(None, alias="periodo_inicio", description="Export orders created on or after this date/time"),
+    end_date: Optional[datetime] = Query(None, alias="periodo_fim", description="Export orders created on or before this date/time"),
+    status: Optional[str] = Query(None, description="Filter by exact status; several comma-separated (e.g. pending,processing)"),
+    client_id: Optional[int] = Query(None, alias="cliente_id", description="Filter orders by client ID"),
+    db: DBSession = Depends(get_read_session),
+    current_user: Principal = Depends(security.get_current_active_user) # Require authentication
+):
+    """
+    Stream orders as CSV or NDJSON, one row per order item with the order and client flattened in.
+
+    Requires authentication.
+    - **format**: `csv` (default) or `ndjson`.
+    - **periodo_inicio**: Filter by start date/time.
+    - **periodo_fim**: Filter by end date/time.
+    - **status**: Filter by order status (comma-separated for several).
+    - **cliente_id**: Filter by client ID.
+
+    Rows are read through a server-side cursor and written as they arrive, so any
+    date range can be exported in a single request with constant memory.
+    """
+    services.order.parse_status_filter(status) # Reject bad values before the response starts streaming
+    filters = dict(start_date=start_date, end_date=end_date, status=status, client_id=client_id)
+    columns = services.order.ORDER_EXPORT_COLUMNS
+    media_type, encode_header, encode_rows = export.FORMATS[format]
+    batch_size = settings.ORDER_EXPORT_BATCH_SIZE
+
+    # The session stays open until the response is sent (request-scoped dependency)
+    if isinstance(db, AsyncSession):
+        async def body():
+            yield encode_header(columns)
+            async for partition in services.order.aiter_order_export(db, batch_size, **filters):
+                yield encode_rows(columns, partition)
+    else:
+        def body(): # Iterated on the threadpool by StreamingResponse
+            yield encode_header(columns)
+            for partition in services.order.iter_order_export(db, batch_size, **filters):
+                yield encode_rows(columns, partition)
+
+    return StreamingResponse(
+        body(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="orders.{format}"'},
     )
-    return orders
 
 @router.get("/{order_id}", response_model=schemas.Order, tags=["orders"])
-def read_order(
+async def read_order(
     order_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(security.get_current_active_user) # Require authentication
+    db: DBSession = Depends(get_read_session),
+    current_user: Principal = Depends(security.get_current_active_user) # Require authentication
 ):
     """
     Get a specific order by ID.
 
     Requires authentication.
     """
-    db_order = services.order.get_order(db, order_id=order_id)
+    db_order = await services.aio.order.get_order(db, order_id=order_id)
     if db_order is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Order not found")
     # Authorization: Allow user to see any order if authenticated.
@@ -90,24 +273,25 @@ def read_order(
     return db_order
 
 @router.put("/{order_id}", response_model=schemas.Order, tags=["orders"])
-def update_order(
+async def update_order(
     order_id: int,
     order_in: schemas.OrderUpdate,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(security.get_current_active_user) # Require authentication
+    db: DBSession = Depends(get_session),
+    current_user: Principal = Depends(security.get_current_active_user) # Require authentication
     # Potentially require superuser for certain status changes
 ):
     """
     Update an order's information, primarily its status.
 
     Requires authentication.
-    - **status**: New status for the order.
+    - **status**: New status for the order. Allowed changes: pending -> processing/cancelled,
+      processing -> pending/shipped/cancelled, shipped -> delivered, cancelled -> pending (reopen).
     """
     # Authorization: Allow authenticated user to update status.
     # Could restrict based on current status or user role.
     # Example: if not current_user.is_superuser and order_in.status == 'cancelled': raise HTTPException(...) 
     try:
-        updated_order = services.order.update_order(db=db, order_id=order_id, order_update=order_in)
+        updated_order = await services.aio.order.update_order(db=db, order_id=order_id, order_update=order_in)
         if updated_order is None:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Order not found")
         return updated_order
@@ -118,10 +302,10 @@ def update_order(
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Could not update order")
 
 @router.delete("/{order_id}", response_model=schemas.message.OrderDeleteResponse, tags=["orders"])
-def delete_order(
+async def delete_order(
     order_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(security.get_current_active_superuser) # Require superuser
+    db: DBSession = Depends(get_session),
+    current_user: Principal = Depends(security.get_current_active_superuser) # Require superuser
 ):
     """
     Delete an order.
@@ -129,7 +313,7 @@ def delete_order(
     Requires superuser authentication.
     Note: Consider implications like stock adjustments if deleting cancelled orders.
     """
-    deleted_order_id = services.order.delete_order(db=db, order_id=order_id)
+    deleted_order_id = await services.aio.order.delete_order(db=db, order_id=order_id)
     if deleted_order_id is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Order not found")
     # Consider stock adjustment logic here or in the service based on business rules
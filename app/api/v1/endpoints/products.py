@@ -1,18 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
 from typing import List, Optional
 from decimal import Decimal
-from app import schemas, services, models
-from app.database import get_db
-from app.core import security
+from pydantic import TypeAdapter
+from app import schemas, services
+from app.database import DBSession, get_read_session, get_session
+from app.core import bulk_import, request_timing, security, pagination
+from app.core.principal_cache import Principal
+from app.core.catalog_index import PRICE_BANDS
+from app.core.response_cache import cached_response, catalog_tags
+from app.core.config import settings
 
-router = APIRouter()
+router = APIRouter(route_class=request_timing.TimedRoute)
+
+# Cached GETs serialize here (the body is what the response cache stores)
+PRODUCT_LIST_ADAPTER = TypeAdapter(List[schemas.Product])
 
 @router.post("/", response_model=schemas.Product, status_code=status.HTTP_201_CREATED, tags=["products"])
-def create_product(
+async def create_product(
     product_in: schemas.ProductCreate,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(security.get_current_active_superuser) # Require superuser
+    db: DBSession = Depends(get_session),
+    current_user: Principal = Depends(security.get_current_active_superuser) # Require superuser
 ):
     """
     Create a new product.
@@ -27,23 +34,51 @@ def create_product(
     - **image_urls**: (Optional) Comma-separated string of image URLs.
     """
     try:
-        return services.product.create_product(db=db, product=product_in)
+        return await services.aio.product.create_product(db=db, product=product_in)
     except HTTPException as e:
         raise e
     except Exception as e:
         # Log e
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Could not create product")
 
+@router.post("/bulk", response_model=schemas.ProductBulkResult, tags=["products"])
+async def bulk_create_products(
+    request: Request,
+    db: DBSession = Depends(get_session),
+    current_user: Principal = Depends(security.get_current_active_superuser) # Require superuser
+):
+    """
+    Import many products from a streamed CSV or NDJSON body.
+
+    Requires superuser authentication.
+    - **Content-Type** `text/csv`: a header row with the product fields (`description`, `sale_value`,
+      `barcode`, `section`, `initial_stock`, `expiry_date`, `image_urls`), then one product per row.
+    - **Content-Type** `application/x-ndjson`: one JSON product object per line.
+
+    Rows are imported in chunks (each chunk committed on its own); invalid rows and
+    duplicate barcodes are skipped and listed in **errors** with their line number.
+    """
+    parse_rows = bulk_import.get_row_parser(request.headers.get("content-type"))
+    result = schemas.ProductBulkResult()
+    async for chunk in bulk_import.iter_chunks(parse_rows(request.stream()), settings.PRODUCT_BULK_CHUNK_SIZE):
+        created, errors = await services.aio.product.bulk_create_products(db, chunk)
+        result.created += created
+        result.errors.extend(errors)
+    result.failed = len(result.errors)
+    return result
+
 @router.get("/", response_model=List[schemas.Product], tags=["products"])
-def read_products(
+async def read_products(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
     category: Optional[str] = Query(None, alias="categoria", description="Filter by category/section (case-insensitive partial match)"),
     min_price: Optional[Decimal] = Query(None, alias="preco_min", description="Filter by minimum price"),
     max_price: Optional[Decimal] = Query(None, alias="preco_max", description="Filter by maximum price"),
     available: Optional[bool] = Query(None, alias="disponibilidade", description="Filter by availability (true=in stock, false=out of stock)"),
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(security.get_current_active_user) # Require authentication
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header of the previous page (keyset pagination, ignores skip)"),
+    db: DBSession = Depends(get_read_session),
+    current_user: Principal = Depends(security.get_current_active_user) # Require authentication
 ):
     """
     Retrieve a list of products with pagination and filtering.
@@ -55,34 +90,96 @@ def read_products(
     - **preco_min**: Filter by minimum price.
     - **preco_max**: Filter by maximum price.
     - **disponibilidade**: Filter by stock availability.
+    - **cursor**: Continue from a previous page (see the `X-Next-Cursor` response header).
+
+    Responses are cached and carry an `ETag`; send it back in `If-None-Match`
+    to get `304 Not Modified` while the page is unchanged.
+    """
+    async def build():
+        products = await services.aio.product.get_products(
+            db, skip=skip, limit=limit, category=category, min_price=min_price, max_price=max_price, available=available,
+            cursor=cursor
+        )
+        headers = {}
+        cursor_value = pagination.next_cursor(products, limit)
+        if cursor_value:
+            headers[pagination.NEXT_CURSOR_HEADER] = cursor_value
+        with request_timing.serializing():
+            body = PRODUCT_LIST_ADAPTER.dump_json(PRODUCT_LIST_ADAPTER.validate_python(products, from_attributes=True))
+        return body, headers, catalog_tags(*(product.id for product in products))
+    return await cached_response(request, current_user, build)
+
+# Declared before /{product_id} so "search" and "autocomplete" aren't taken as ids
+@router.get("/search", response_model=schemas.ProductSearchResult, tags=["products"])
+async def search_products(
+    q: str = Query(..., min_length=1, description="Search terms (description, section or barcode); the last word also matches as a prefix"),
+    section: Optional[str] = Query(None, alias="secao", description="Only products in this section (exact value from the facets)"),
+    price_band: Optional[str] = Query(None, alias="faixa_preco", description="Only products in this price band: " + ", ".join(label for label, _, _ in PRICE_BANDS)),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    db: DBSession = Depends(get_read_session),
+    current_user: Principal = Depends(security.get_current_active_user) # Require authentication
+):
     """
-    products = services.product.get_products(
-        db, skip=skip, limit=limit, category=category, min_price=min_price, max_price=max_price, available=available
-    )
-    return products
+    Search the catalog, best matches first, with facet counts.
+
+    Requires authentication.
+    - **q**: Search terms. Every word has to match; an exact barcode comes first.
+    - **secao**: Filter by section.
+    - **faixa_preco**: Filter by price band.
+    - **skip** / **limit**: Pagination over the ranked results.
+
+    **facets** counts the matches per section and per price band (each facet
+    ignores its own filter, so the other options stay visible).
+    """
+    if price_band is not None and price_band not in {label for label, _, _ in PRICE_BANDS}:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Unknown price band")
+    await services.product.wait_for_catalog_index()
+    return await services.aio.product.search_products(db, q, section=section, price_band=price_band, skip=skip, limit=limit)
+
+@router.get("/autocomplete", response_model=List[schemas.ProductSuggestion], tags=["products"])
+async def autocomplete_products(
+    q: str = Query(..., min_length=1, description="Text typed so far; the last word is completed"),
+    limit: int = Query(10, ge=1, le=50),
+    db: DBSession = Depends(get_read_session),
+    current_user: Principal = Depends(security.get_current_active_user) # Require authentication
+):
+    """
+    Suggest catalog words completing the last word of **q**, most common first.
+
+    Requires authentication.
+    """
+    await services.product.wait_for_catalog_index()
+    return await services.aio.product.autocomplete_products(db, q, limit=limit)
 
 @router.get("/{product_id}", response_model=schemas.Product, tags=["products"])
-def read_product(
+async def read_product(
+    request: Request,
     product_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(security.get_current_active_user) # Require authentication
+    db: DBSession = Depends(get_read_session),
+    current_user: Principal = Depends(security.get_current_active_user) # Require authentication
 ):
     """
     Get a specific product by ID.
 
     Requires authentication.
+    Cached, with an `ETag` (`If-None-Match` gets `304 Not Modified`).
     """
-    db_product = services.product.get_product(db, product_id=product_id)
-    if db_product is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Product not found")
-    return db_product
+    async def build():
+        db_product = await services.aio.product.get_product(db, product_id=product_id)
+        if db_product is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Product not found")
+        with request_timing.serializing():
+            body = schemas.Product.model_validate(db_product).model_dump_json().encode()
+        return body, {}, catalog_tags(product_id, membership=False)
+    return await cached_response(request, current_user, build)
 
 @router.put("/{product_id}", response_model=schemas.Product, tags=["products"])
-def update_product(
+async def update_product(
     product_id: int,
     product_in: schemas.ProductUpdate,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(security.get_current_active_superuser) # Require superuser
+    db: DBSession = Depends(get_session),
+    current_user: Principal = Depends(security.get_current_active_superuser) # Require superuser
 ):
     """
     Update a product's information.
@@ -90,7 +187,7 @@ def update_product(
     Requires superuser authentication.
     """
     try:
-        updated_product = services.product.update_product(db=db, product_id=product_id, product_update=product_in)
+        updated_product = await services.aio.product.update_product(db=db, product_id=product_id, product_update=product_in)
         if updated_product is None:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Product not found")
         return updated_product
@@ -101,10 +198,10 @@ def update_product(
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Could not update product")
 
 @router.delete("/{product_id}", response_model=schemas.Product, tags=["products"])
-def delete_product(
+async def delete_product(
     product_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(security.get_current_active_superuser) # Require superuser
+    db: DBSession = Depends(get_session),
+    current_user: Principal = Depends(security.get_current_active_superuser) # Require superuser
 ):
     """
     Delete a product.
@@ -112,7 +209,7 @@ def delete_product(
     Requires superuser authentication.
     Note: Consider implications (e.g., soft delete) if product is part of existing orders.
     """
-    deleted_product = services.product.delete_product(db=db, product_id=product_id)
+    deleted_product = await services.aio.product.delete_product(db=db, product_id=product_id)
     if deleted_product is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Product not found")
     return deleted_product
@@ -0,0 +1,57 @@
+from fastapi import APIRouter, Depends, Query
+from typing import List, Optional
+from datetime import date
+from app import schemas, services
+from app.database import DBSession, get_read_session
+from app.core import request_timing, security
+from app.core.principal_cache import Principal
+
+router = APIRouter(route_class=request_timing.TimedRoute)
+
+# Every report reads only the aggregate tables (see app/services/report.py),
+# never orders/order_items, so its cost doesn't grow with the order history.
+# Cancelled orders are not counted.
+
+@router.get("/daily-revenue", response_model=List[schemas.DailyRevenue], tags=["reports"])
+async def read_daily_revenue(
+    start_date: Optional[date] = Query(None, alias="periodo_inicio", description="First day included"),
+    end_date: Optional[date] = Query(None, alias="periodo_fim", description="Last day included"),
+    db: DBSession = Depends(get_read_session),
+    current_user: Principal = Depends(security.get_current_active_user) # Require authentication
+):
+    """
+    Revenue, order count and units sold per day.
+
+    Requires authentication.
+    - **periodo_inicio**: First day of the period.
+    - **periodo_fim**: Last day of the period.
+    """
+    return await services.aio.report.get_daily_revenue(db, start_date=start_date, end_date=end_date)
+
+@router.get("/products", response_model=List[schemas.ProductSales], tags=["reports"])
+async def read_product_sales(
+    skip: int = 0,
+    limit: int = Query(100, ge=1, le=1000),
+    db: DBSession = Depends(get_read_session),
+    current_user: Principal = Depends(security.get_current_active_user) # Require authentication
+):
+    """
+    Units sold and revenue per product, best sellers first.
+
+    Requires authentication.
+    - **skip**: Number of products to skip.
+    - **limit**: Maximum number of products to return.
+    """
+    return await services.aio.report.get_product_sales(db, skip=skip, limit=limit)
+
+@router.get("/sections", response_model=List[schemas.SectionRevenue], tags=["reports"])
+async def read_section_revenue(
+    db: DBSession = Depends(get_read_session),
+    current_user: Principal = Depends(security.get_current_active_user) # Require authentication
+):
+    """
+    Units sold and revenue per product section (by each product's current section).
+
+    Requires authentication.
+    """
+    return await services.aio.report.get_section_revenue(db)
@@ -0,0 +1,33 @@
+"""
+Management commands.
+
+    python -m app.cli rebuild-reports            Recompute the sales report aggregates from orders/order_items
+    python -m app.cli purge-idempotency-keys     Delete expired Idempotency-Key records
+"""
+import argparse
+import sys
+from app.database import SessionLocal
+from app.services import idempotency as idempotency_service
+from app.services import report as report_service
+
+def rebuild_reports(args) -> None:
+    with SessionLocal() as db:
+        counts = report_service.rebuild_reports(db)
+    for table, rows in counts.items():
+        print(f"{table}: {rows} rows")
+
+def purge_idempotency_keys(args) -> None:
+    with SessionLocal() as db:
+        print(f"idempotency_keys: {idempotency_service.purge_expired(db)} expired rows deleted")
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("rebuild-reports", help="Backfill the report aggregates from the order tables").set_defaults(handler=rebuild_reports)
+    commands.add_parser("purge-idempotency-keys", help="Delete expired Idempotency-Key records (run periodically)").set_defaults(handler=purge_idempotency_keys)
+    args = parser.parse_args(argv)
+    args.handler(args)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
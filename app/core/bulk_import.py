@@ -0,0 +1,96 @@
+import codecs
+import csv
+import json
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple, Union
+from fastapi import HTTPException, status
+
+# Streaming parsers for bulk imports.
+# The request body is consumed chunk by chunk and turned into
+# (line number, row) pairs, where row is a dict of fields or an error message
+# for rows that could not be parsed. Rows are then grouped into fixed-size
+# chunks, so memory stays flat however large the upload is.
+
+ParsedRow = Tuple[int, Union[Dict[str, object], str]]
+
+CSV_MEDIA_TYPES = {"text/csv", "application/csv"}
+NDJSON_MEDIA_TYPES = {"application/x-ndjson", "application/ndjson", "application/jsonl", "application/x-jsonlines"}
+
+async def iter_lines(stream: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, str]]:
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    buffer = ""
+    line_no = 0
+    async for chunk in stream:
+        try:
+            buffer += decoder.decode(chunk)
+        except UnicodeDecodeError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Request body is not valid UTF-8")
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            line_no += 1
+            yield line_no, line.rstrip("\r")
+    buffer += decoder.decode(b"", final=True)
+    if buffer:
+        yield line_no + 1, buffer.rstrip("\r")
+
+async def iter_csv_rows(stream: AsyncIterator[bytes]) -> AsyncIterator[ParsedRow]:
+    # The first record is the header (ProductCreate field names); empty cells become None
+    header: Optional[List[str]] = None
+    pending: Optional[str] = None
+    start = 0
+    async for line_no, line in iter_lines(stream):
+        if pending is None:
+            record, start = line, line_no
+        else:
+            record = f"{pending}\n{line}"
+        if record.count('"') % 2:
+            # Quoted field continues on the next line
+            pending = record
+            continue
+        pending = None
+        if not record.strip():
+            continue
+        values = next(csv.reader([record]))
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        if len(values) != len(header):
+            yield start, f"Expected {len(header)} columns, got {len(values)}"
+            continue
+        yield start, {name: (value if value != "" else None) for name, value in zip(header, values)}
+    if pending is not None:
+        yield start, "Unterminated quoted field"
+
+async def iter_ndjson_rows(stream: AsyncIterator[bytes]) -> AsyncIterator[ParsedRow]:
+    async for line_no, line in iter_lines(stream):
+        if not line.strip():
+            continue
+        try:
+            value = json.loads(line)
+        except ValueError as e:
+            yield line_no, f"Invalid JSON: {e}"
+            continue
+        if not isinstance(value, dict):
+            yield line_no, "Expected a JSON object"
+            continue
+        yield line_no, value
+
+def get_row_parser(content_type: Optional[str]) -> Callable[[AsyncIterator[bytes]], AsyncIterator[ParsedRow]]:
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    if media_type in CSV_MEDIA_TYPES:
+        return iter_csv_rows
+    if media_type in NDJSON_MEDIA_TYPES:
+        return iter_ndjson_rows
+    raise HTTPException(
+        status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+        detail="Send the import as text/csv or application/x-ndjson",
+    )
+
+async def iter_chunks(rows: AsyncIterator[ParsedRow], size: int) -> AsyncIterator[List[ParsedRow]]:
+    chunk: List[ParsedRow] = []
+    async for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
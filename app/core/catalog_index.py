@@ -0,0 +1,493 @@
+import bisect
+import heapq
+import logging
+import re
+import sys
+import threading
+import time
+import unicodedata
+from array import array
+from collections import Counter
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple, Union
+from starlette.concurrency import run_in_threadpool
+from app.core.config import settings
+
+# In-process catalog search index.
+# Every product id is a bit position. Frequent tokens, sections, price bands
+# and description lengths map to bitmaps (Python ints), so a search is a few
+# C-speed AND/OR over the catalog, facet counts are popcounts (int.bit_count)
+# and ranking walks the length bitmaps in order. Rare tokens keep their sorted
+# ids packed in bytes instead, which is smaller than a mostly empty bitmap.
+# Both are immutable (a write replaces them), and neither they nor the plain
+# tuples describing each product are tracked by the garbage collector, so a
+# large index costs no GC pauses.
+#
+# The index lives in each worker process. It is built from the database on a
+# background thread at first use (searches wait for it), kept in sync by the
+# product service after every committed write, and rebuilt the same way every
+# CATALOG_INDEX_REFRESH_SECONDS so writes made by other workers show up.
+
+logger = logging.getLogger(__name__)
+
+# (label, lower bound inclusive, upper bound exclusive or None)
+PRICE_BANDS: Tuple[Tuple[str, Decimal, Optional[Decimal]], ...] = (
+    ("0-50", Decimal("0"), Decimal("50")),
+    ("50-100", Decimal("50"), Decimal("100")),
+    ("100-200", Decimal("100"), Decimal("200")),
+    ("200-500", Decimal("200"), Decimal("500")),
+    ("500+", Decimal("500"), None),
+)
+
+# A prefix expands to at most this many vocabulary terms (most frequent first)
+MAX_PREFIX_EXPANSION = 50
+# Shortest prefix expanded while searching (autocomplete accepts any length)
+MIN_SEARCH_PREFIX = 2
+# A token's ids become a bitmap once they cover 1/DENSE_RATIO of the id range
+DENSE_RATIO = 64
+# Facets of results up to this size are counted per product rather than per section bitmap
+FACET_SCAN_MAX = 2048
+
+_TOKEN_RE = re.compile(r"\w+")
+_NONZERO_BYTE = re.compile(rb"[^\x00]")
+_MAX_LENGTH = 4095 # Longer descriptions rank like this one
+
+# Postings: a bitmap (int, bit i = product i) or sorted int64 ids packed in bytes
+Posting = Union[int, bytes]
+
+def normalize(text: str) -> str:
+    # Lowercase and strip accents so "Calça" and "calca" are the same token
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+def tokenize(text: Optional[str]) -> List[str]:
+    return _TOKEN_RE.findall(normalize(text)) if text else []
+
+def _ids(posting: bytes):
+    return memoryview(posting).cast("q")
+
+def price_band(value) -> str:
+    value = Decimal(str(value))
+    for label, low, high in PRICE_BANDS:
+        if value >= low and (high is None or value < high):
+            return label
+    return PRICE_BANDS[0][0] # Negative prices fall in the lowest band
+
+def _bitmap(ids: Iterable[int], size: int = 0) -> int:
+    bits = bytearray((size >> 3) + 1)
+    for product_id in ids:
+        if product_id >> 3 >= len(bits):
+            bits.extend(bytes((product_id >> 3) + 1 - len(bits)))
+        bits[product_id >> 3] |= 1 << (product_id & 7)
+    return int.from_bytes(bits, "little")
+
+def _as_bitmap(posting: Optional[Posting]) -> int:
+    if posting is None:
+        return 0
+    if isinstance(posting, int):
+        return posting
+    ids = _ids(posting)
+    return _bitmap(ids, ids[-1])
+
+def _without(bitmap: int, product_id: int) -> int:
+    # bitmap & ~bit would build a negative int as long as the bitmap; & bit is one digit
+    bit = 1 << product_id
+    return bitmap ^ bit if bitmap & bit else bitmap
+
+def _count(posting: Posting) -> int:
+    return posting.bit_count() if isinstance(posting, int) else len(posting) >> 3
+
+def _lowest(bitmap: int, count: int) -> List[int]:
+    # The count smallest ids in bitmap: scan its bytes for non-zero ones (in C)
+    ids: List[int] = []
+    if count <= 0 or not bitmap:
+        return ids
+    data = bitmap.to_bytes((bitmap.bit_length() + 7) >> 3, "little")
+    for match in _NONZERO_BYTE.finditer(data):
+        base, byte = match.start() << 3, data[match.start()]
+        while byte:
+            low = byte & -byte
+            ids.append(base + low.bit_length() - 1)
+            if len(ids) == count:
+                return ids
+            byte ^= low
+    return ids
+
+@dataclass
+class IndexedProduct:
+    id: int
+    description: str
+    section: Optional[str]
+    barcode: Optional[str]
+    sale_value: Decimal
+
+@dataclass
+class SearchResult:
+    total: int
+    ids: List[int]
+    sections: List[Tuple[str, int]]
+    price_bands: List[Tuple[str, int]]
+
+class _Doc(NamedTuple):
+    # What remove() and the facet counts need. Stored as a plain tuple: the
+    # garbage collector stops tracking those, not NamedTuple instances
+    description_tokens: Tuple[str, ...]
+    section_tokens: Tuple[str, ...]
+    section: Optional[str]
+    band: str
+    barcode: Optional[str]
+    length: int
+
+_SECTION, _BAND = _Doc._fields.index("section"), _Doc._fields.index("band")
+
+class _Index:
+    """
+    The index data. Writers are serialized by CatalogIndex's lock; searches run
+    alongside them without it. Postings, bitmaps and lengths are replaced,
+    never mutated, and reads go through get() or a copy, so a search sees each
+    key either before or after a concurrent write.
+    """
+
+    def __init__(self):
+        self.docs: Dict[int, tuple] = {} # _Doc fields
+        self.description_postings: Dict[str, Posting] = {}
+        self.section_postings: Dict[str, Posting] = {}
+        self.vocabulary: List[str] = [] # Sorted, for bisect prefix lookups
+        self.barcodes: Dict[str, int] = {}
+        self.section_bits: Dict[Optional[str], int] = {}
+        self.band_bits: Dict[str, int] = {}
+        self.length_bits: Dict[int, int] = {} # Ranking: shorter descriptions first (more specific), then lower ids
+        self.lengths: List[int] = [] # Sorted keys of length_bits
+        self.size = 0 # Highest id + 1
+
+    def load(self, products: Iterable[IndexedProduct]) -> None:
+        # Bulk build: collect ids per key in arrays, then pick each posting's form once
+        groups: Dict[str, Dict] = {"description": {}, "section": {}, "sections": {}, "bands": {}, "lengths": {}}
+        for product in products:
+            doc = self._doc(product)
+            self.docs[product.id] = tuple(doc)
+            for name, keys in (("description", doc.description_tokens), ("section", doc.section_tokens),
+                               ("sections", (doc.section,)), ("bands", (doc.band,)), ("lengths", (doc.length,))):
+                group = groups[name]
+                for key in keys:
+                    ids = group.get(key)
+                    if ids is None:
+                        group[key] = ids = array("q")
+                    ids.append(product.id)
+            if doc.barcode:
+                self.barcodes[doc.barcode] = product.id
+            self.size = max(self.size, product.id + 1)
+        # Ids arrive in any order from the database
+        for name in ("description", "section"):
+            postings = self.description_postings if name == "description" else self.section_postings
+            for token, ids in groups[name].items():
+                postings[token] = self._posting(array("q", sorted(ids)))
+        self.section_bits = {key: _bitmap(ids, self.size) for key, ids in groups["sections"].items()}
+        self.band_bits = {key: _bitmap(ids, self.size) for key, ids in groups["bands"].items()}
+        self.length_bits = {key: _bitmap(ids, self.size) for key, ids in groups["lengths"].items()}
+        self.lengths = sorted(self.length_bits)
+        self.vocabulary = sorted(self.description_postings.keys() | self.section_postings.keys())
+
+    def _doc(self, product: IndexedProduct) -> _Doc:
+        # Interned: one copy of each token and section name, however many products use it
+        description_tokens = [sys.intern(token) for token in tokenize(product.description)]
+        return _Doc(
+            description_tokens=tuple(dict.fromkeys(description_tokens)),
+            section_tokens=tuple(dict.fromkeys(sys.intern(token) for token in tokenize(product.section))),
+            section=sys.intern(product.section) if product.section else product.section,
+            band=price_band(product.sale_value),
+            barcode=product.barcode,
+            length=min(len(description_tokens), _MAX_LENGTH),
+        )
+
+    def _posting(self, ids: array) -> Posting:
+        return _bitmap(ids, self.size) if len(ids) * DENSE_RATIO >= self.size else ids.tobytes()
+
+    def _post(self, postings: Dict[str, Posting], token: str, product_id: int) -> None:
+        posting = postings.get(token)
+        if posting is None:
+            postings[token] = array("q", (product_id,)).tobytes()
+            index = bisect.bisect_left(self.vocabulary, token)
+            if index == len(self.vocabulary) or self.vocabulary[index] != token:
+                self.vocabulary.insert(index, token)
+        elif isinstance(posting, int):
+            postings[token] = posting | (1 << product_id)
+        else:
+            ids = array("q", _ids(posting)) # A copy: searches may still be reading the old one
+            bisect.insort(ids, product_id)
+            postings[token] = self._posting(ids)
+
+    def _unpost(self, postings: Dict[str, Posting], token: str, product_id: int) -> None:
+        posting = postings.get(token)
+        if posting is None:
+            return
+        if isinstance(posting, int):
+            posting = _without(posting, product_id)
+        else:
+            posting = array("q", (other for other in _ids(posting) if other != product_id)).tobytes()
+        if posting:
+            postings[token] = posting
+            return
+        del postings[token]
+        if token not in self.description_postings and token not in self.section_postings:
+            index = bisect.bisect_left(self.vocabulary, token)
+            if index < len(self.vocabulary) and self.vocabulary[index] == token:
+                del self.vocabulary[index]
+
+    @staticmethod
+    def _set_bit(bitmaps: Dict, key, product_id: int) -> None:
+        bitmaps[key] = bitmaps.get(key, 0) | (1 << product_id)
+
+    @staticmethod
+    def _clear_bit(bitmaps: Dict, key, product_id: int) -> None:
+        bits = _without(bitmaps[key], product_id)
+        if bits:
+            bitmaps[key] = bits
+        else:
+            del bitmaps[key]
+
+    def add(self, product: IndexedProduct) -> None:
+        self.remove(product.id)
+        doc = self._doc(product)
+        self.docs[product.id] = tuple(doc)
+        self.size = max(self.size, product.id + 1)
+        for token in doc.description_tokens:
+            self._post(self.description_postings, token, product.id)
+        for token in doc.section_tokens:
+            self._post(self.section_postings, token, product.id)
+        if doc.barcode:
+            self.barcodes[doc.barcode] = product.id
+        self._set_bit(self.section_bits, doc.section, product.id)
+        self._set_bit(self.band_bits, doc.band, product.id)
+        if doc.length not in self.length_bits:
+            self.lengths = sorted((*self.lengths, doc.length))
+        self._set_bit(self.length_bits, doc.length, product.id)
+
+    def remove(self, product_id: int) -> None:
+        doc = self.docs.pop(product_id, None)
+        if doc is None:
+            return
+        doc = _Doc._make(doc)
+        for token in doc.description_tokens:
+            self._unpost(self.description_postings, token, product_id)
+        for token in doc.section_tokens:
+            self._unpost(self.section_postings, token, product_id)
+        if doc.barcode and self.barcodes.get(doc.barcode) == product_id:
+            del self.barcodes[doc.barcode]
+        self._clear_bit(self.section_bits, doc.section, product_id)
+        self._clear_bit(self.band_bits, doc.band, product_id)
+        self._clear_bit(self.length_bits, doc.length, product_id)
+        if doc.length not in self.length_bits:
+            self.lengths = [length for length in self.lengths if length != doc.length]
+
+    def expand_prefix(self, prefix: str, limit: int) -> List[str]:
+        # Vocabulary terms starting with prefix, most frequent first
+        start = bisect.bisect_left(self.vocabulary, prefix)
+        end = bisect.bisect_left(self.vocabulary, prefix + "\uffff")
+        # The slice may be off by one if a write shifted the list in between
+        terms = [term for term in self.vocabulary[start:end + 1] if term.startswith(prefix)]
+        if len(terms) > limit:
+            terms = heapq.nlargest(limit, terms, key=self.document_frequency)
+        return terms
+
+    def document_frequency(self, token: str) -> int:
+        return sum(_count(posting) for posting in (self.description_postings.get(token), self.section_postings.get(token)) if posting is not None)
+
+    def _union(self, postings: Dict[str, Posting], terms: List[str]) -> int:
+        # OR of the terms' postings: bitmaps directly, the sparse arrays in one pass
+        bits, sparse = 0, []
+        for term in terms:
+            posting = postings.get(term)
+            if isinstance(posting, int):
+                bits |= posting
+            elif posting is not None:
+                sparse.append(posting)
+        if len(sparse) == 1:
+            bits |= _as_bitmap(sparse[0])
+        elif sparse:
+            bits |= _bitmap((product_id for ids in sparse for product_id in _ids(ids)), self.size)
+        return bits
+
+    def _token_matches(self, tokens: List[str], prefix: bool) -> Tuple[List[int], List[int]]:
+        # Per query token: bitmap of ids matching in description, of ids matching anywhere
+        in_description, anywhere = [], []
+        for position, token in enumerate(tokens):
+            if prefix and position == len(tokens) - 1 and len(token) >= MIN_SEARCH_PREFIX:
+                terms = self.expand_prefix(token, MAX_PREFIX_EXPANSION)
+            else:
+                terms = [token]
+            description_bits = self._union(self.description_postings, terms)
+            in_description.append(description_bits)
+            anywhere.append(description_bits | self._union(self.section_postings, terms))
+        return in_description, anywhere
+
+    def search(self, query: str, section: Optional[str], band: Optional[str], skip: int, limit: int, prefix: bool) -> SearchResult:
+        tokens = tokenize(query)
+        if not tokens:
+            return SearchResult(total=0, ids=[], sections=[], price_bands=[])
+        in_description, anywhere = self._token_matches(tokens, prefix)
+
+        # Every token has to match somewhere (AND)
+        matches = anywhere[0]
+        for bits in anywhere[1:]:
+            matches &= bits
+        exact = self.barcodes.get(query.strip())
+        if exact is not None:
+            matches |= 1 << exact
+
+        section_filtered = matches & self.section_bits.get(section, 0) if section is not None else matches
+        band_filtered = matches & self.band_bits.get(band, 0) if band is not None else matches
+        results = section_filtered & band_filtered if (section is not None or band is not None) else matches
+        sections, price_bands = self._facets(section_filtered, band_filtered)
+
+        # Ranking tiers: exact barcode, every token in the description, the rest
+        # (matched through the section); within a tier by (length, id)
+        wanted = skip + limit
+        ranked: List[int] = []
+        if exact is not None and results & (1 << exact):
+            ranked.append(exact)
+            results ^= 1 << exact
+        description_tier = results
+        for bits in in_description:
+            description_tier &= bits
+        for tier in (description_tier, results ^ description_tier):
+            for length in self.lengths:
+                if len(ranked) >= wanted or not tier:
+                    break
+                bits = tier & self.length_bits.get(length, 0)
+                if bits:
+                    ranked.extend(_lowest(bits, wanted - len(ranked)))
+                    tier ^= bits
+
+        return SearchResult(total=(section_filtered & band_filtered).bit_count(), ids=ranked[skip:wanted], sections=sections, price_bands=price_bands)
+
+    def _facets(self, section_filtered: int, band_filtered: int) -> Tuple[list, list]:
+        # Disjunctive facets: each facet is counted with the other facet's filter applied
+        if band_filtered.bit_count() <= FACET_SCAN_MAX:
+            section_counts = Counter(doc[_SECTION] for doc in map(self.docs.get, _lowest(band_filtered, FACET_SCAN_MAX)) if doc)
+        else:
+            section_counts = Counter({key: (band_filtered & bits).bit_count() for key, bits in self.section_bits.copy().items()})
+        if section_filtered.bit_count() <= FACET_SCAN_MAX:
+            band_counts = Counter(doc[_BAND] for doc in map(self.docs.get, _lowest(section_filtered, FACET_SCAN_MAX)) if doc)
+        else:
+            band_counts = Counter({key: (section_filtered & bits).bit_count() for key, bits in self.band_bits.copy().items()})
+        return (
+            sorted(((key, count) for key, count in section_counts.items() if count), key=lambda item: (-item[1], item[0] or "")),
+            [(label, band_counts[label]) for label, _, _ in PRICE_BANDS if band_counts[label]],
+        )
+
+    def autocomplete(self, prefix: str, limit: int) -> List[Tuple[str, int]]:
+        tokens = tokenize(prefix)
+        if not tokens:
+            return []
+        suggestions = [(term, self.document_frequency(term)) for term in self.expand_prefix(tokens[-1], limit)]
+        return sorted(suggestions, key=lambda item: (-item[1], item[0]))
+
+class CatalogIndex:
+    """
+    The per-worker index: built and refreshed on a background thread, published once per build.
+
+    Writes hold the lock. Searches don't: they take the current _Index
+    reference and read it as it is (see _Index).
+    """
+
+    def __init__(self, refresh_seconds: float = 0):
+        self.refresh_seconds = refresh_seconds
+        self._index: Optional[_Index] = None
+        self._lock = threading.Lock()
+        self._built_at = 0.0
+        self._building = False
+        self._build_done = threading.Event() # Replaced for every build; set when it publishes or fails
+        self._pending: List[Tuple[str, object]] = [] # Writes made while a build loads its snapshot
+
+    @property
+    def built(self) -> bool:
+        return self._index is not None
+
+    def build(self, products: Iterable[IndexedProduct]) -> None:
+        """Replace the index with one built from products, on the calling thread."""
+        index = _Index()
+        index.load(products)
+        with self._lock:
+            self._index = index
+            self._built_at = time.monotonic()
+        self._build_done.set()
+
+    def ensure_built(self, load: Callable[[], Iterable[IndexedProduct]]) -> None:
+        """Start a build on a background thread if there is no index yet or it is due a refresh; don't wait."""
+        if self._index is None or (self.refresh_seconds and time.monotonic() - self._built_at > self.refresh_seconds):
+            self._start_build(load)
+
+    def wait(self, timeout: float) -> bool:
+        """Block until the first build is published (True) or has failed or timed out (False)."""
+        if self._index is None:
+            self._build_done.wait(timeout)
+        return self._index is not None
+
+    async def wait_async(self, timeout: float) -> bool:
+        # Off the event loop: in async mode the services run on the loop thread
+        if self._index is not None:
+            return True
+        return await run_in_threadpool(self.wait, timeout)
+
+    def _start_build(self, load: Callable[[], Iterable[IndexedProduct]]) -> None:
+        with self._lock:
+            if self._building:
+                return
+            # Set before the load query starts: every write committed after its
+            # snapshot is queued and replayed
+            self._building = True
+            self._pending = []
+            if self._index is None:
+                self._build_done = threading.Event()
+        threading.Thread(target=self._build, args=(load,), name="catalog-index-build", daemon=True).start()
+
+    def _build(self, load: Callable[[], Iterable[IndexedProduct]]) -> None:
+        started = time.perf_counter()
+        try:
+            index = _Index()
+            index.load(load())
+            with self._lock:
+                # Replay writes this worker made while the snapshot was loading
+                for operation, argument in self._pending:
+                    index.add(argument) if operation == "add" else index.remove(argument)
+                self._index = index
+                self._built_at = time.monotonic()
+            logger.info("Catalog index built: %d products in %.2fs", len(index.docs), time.perf_counter() - started)
+        except Exception:
+            logger.exception("Catalog index build failed")
+            with self._lock:
+                self._built_at = time.monotonic() # A refresh retries after the next interval
+        finally:
+            with self._lock:
+                self._building = False
+                self._pending = []
+            self._build_done.set()
+
+    def add(self, product: IndexedProduct) -> None:
+        with self._lock:
+            if self._building:
+                self._pending.append(("add", product))
+            if self._index is not None: # Not built yet and not building: the first build loads it from the database
+                self._index.add(product)
+
+    def remove(self, product_id: int) -> None:
+        with self._lock:
+            if self._building:
+                self._pending.append(("remove", product_id))
+            if self._index is not None:
+                self._index.remove(product_id)
+
+    def search(self, query: str, section: Optional[str] = None, band: Optional[str] = None,
+               skip: int = 0, limit: int = 20, prefix: bool = True) -> SearchResult:
+        return self._index.search(query, section, band, skip, limit, prefix)
+
+    def autocomplete(self, prefix: str, limit: int = 10) -> List[Tuple[str, int]]:
+        return self._index.autocomplete(prefix, limit)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._index = None
+
+catalog_index = CatalogIndex(refresh_seconds=settings.CATALOG_INDEX_REFRESH_SECONDS)
@@ -1,4 +1,5 @@
 from pydantic_settings import BaseSettings
+from typing import Optional
 import os
 from dotenv import load_dotenv
 
@@ -14,8 +15,81 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
 
+    # Principal cache (authenticated users kept in memory between requests)
+    # TTL also bounds how long other workers may serve a stale principal. 0 disables the cache.
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 60
+    PRINCIPAL_CACHE_MAX_SIZE: int = 10000
+
+    # Response cache for the product catalog GETs (ETag / 304). TTL 0 disables it.
+    # In-process LRU by default; set RESPONSE_CACHE_REDIS_URL to share it between workers.
+    RESPONSE_CACHE_TTL_SECONDS: int = 60
+    RESPONSE_CACHE_MAX_SIZE: int = 10000
+    RESPONSE_CACHE_REDIS_URL: str = ""
+    # With read replicas: how far behind the primary they may run. A body read within
+    # this long after a write to one of its products is served but not cached.
+    RESPONSE_CACHE_REPLICA_LAG_SECONDS: float = 5.0
+
+    # Password hashing pool (bcrypt runs off the request threadpool)
+    PASSWORD_HASH_WORKERS: int = min(4, os.cpu_count() or 1)
+    PASSWORD_HASH_MAX_QUEUE: int = 64 # Jobs allowed to wait beyond the running ones before rejecting
+
     # Database
     DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./test_db.db") # Default to SQLite for local dev/test if not set
+    # Async mode: AsyncEngine/AsyncSession and async services (aiosqlite/asyncpg drivers)
+    DATABASE_ASYNC_MODE: bool = False
+    ASYNC_DATABASE_URL: Optional[str] = None # Derived from DATABASE_URL when not set
+
+    # Connection pool (ignored for in-memory SQLite)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0 # Seconds to wait for a free connection before failing
+    DB_POOL_RECYCLE: int = 1800 # Seconds before a connection is replaced; -1 disables
+    DB_POOL_PRE_PING: bool = True # Test connections on checkout (survives failovers/stale connections)
+    DB_POOL_SLOW_CHECKOUT_MS: float = 100.0 # Log checkouts that wait longer than this
+
+    # Read replicas: comma-separated URLs used round-robin by the read-only (GET) endpoints.
+    # Empty means every request uses DATABASE_URL.
+    DATABASE_REPLICA_URLS: str = ""
+    DB_REPLICA_RETRY_SECONDS: float = 30.0 # How long an unhealthy replica is skipped before it is probed again
+
+    # Bulk product import: rows validated, checked and inserted per chunk (one commit each)
+    PRODUCT_BULK_CHUNK_SIZE: int = 1000
+    # Order export: rows fetched per server-side cursor batch (and per response chunk)
+    ORDER_EXPORT_BATCH_SIZE: int = 1000
+    # Batch order creation (POST /orders/batch): most orders accepted in one request
+    ORDER_BATCH_MAX_SIZE: int = 1000
+
+    # Order section filter (secao_produto): answer from the denormalized orders.section_bits
+    # bitmap instead of the EXISTS semi-join over order_items. The bitmap is always maintained.
+    ORDER_SECTION_BITMAP_FILTER: bool = False
+
+    # Idempotency-Key on POST /orders: how long a key (and its stored response) is kept,
+    # how long a duplicate waits for the first request to finish, and after how long a
+    # claim whose request never finished (crashed worker) may be taken over
+    IDEMPOTENCY_KEY_TTL_SECONDS: int = 86400
+    IDEMPOTENCY_WAIT_SECONDS: float = 10.0
+    IDEMPOTENCY_LOCK_SECONDS: int = 60
+
+    # Request timing: Server-Timing header (db, serialize, handler, total) on every
+    # response, and a warning with the normalized SQL for statements slower than
+    # SLOW_QUERY_MS (0 disables the slow query log)
+    SERVER_TIMING_HEADER: bool = True
+    SLOW_QUERY_MS: float = 200.0
+
+    # GET /metrics (Prometheus text format). With METRICS_TOKEN set, scrapes must send
+    # "Authorization: Bearer <token>"; METRICS_ENABLED=false stops the request metrics
+    METRICS_ENABLED: bool = True
+    METRICS_TOKEN: str = ""
+
+    # GET /admin/profile: sampling profiler limits (per request; one profile at a time per worker)
+    PROFILER_MAX_SECONDS: float = 60.0
+    PROFILER_MAX_OVERHEAD: float = 0.05 # Fraction of wall time the sampler may hold the GIL
+
+    # Catalog search index (in-process, per worker): full rebuild interval so other
+    # workers' writes become visible. 0 disables the refresh.
+    CATALOG_INDEX_REFRESH_SECONDS: int = 300
+    # How long a search waits for the first build in a worker before answering 503
+    CATALOG_INDEX_BUILD_TIMEOUT_SECONDS: float = 60.0
 
     # Add other settings as needed, e.g., Sentry DSN, WhatsApp API keys
     # SENTRY_DSN: Optional[str] = None
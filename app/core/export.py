@@ -0,0 +1,43 @@
+import csv
+import io
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Callable, Dict, Sequence, Tuple
+
+# Encoders for streamed exports.
+# Rows arrive in partitions (one server-side cursor batch at a time) and each
+# partition is encoded to a single bytes chunk of the response body, so only
+# one batch is ever held in memory.
+
+def _text(value) -> object:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+def csv_header(columns: Sequence[str]) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(columns)
+    return buffer.getvalue().encode()
+
+def csv_rows(columns: Sequence[str], rows: Sequence[Sequence]) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # None becomes an empty cell
+    writer.writerows([_text(value) for value in row] for row in rows)
+    return buffer.getvalue().encode()
+
+def ndjson_header(columns: Sequence[str]) -> bytes:
+    return b""
+
+def ndjson_rows(columns: Sequence[str], rows: Sequence[Sequence]) -> bytes:
+    lines = [json.dumps(dict(zip(columns, (_text(value) for value in row)))) for row in rows]
+    return ("\n".join(lines) + "\n").encode() if lines else b""
+
+# format -> (media type, header encoder, partition encoder)
+FORMATS: Dict[str, Tuple[str, Callable, Callable]] = {
+    "csv": ("text/csv", csv_header, csv_rows),
+    "ndjson": ("application/x-ndjson", ndjson_header, ndjson_rows),
+}
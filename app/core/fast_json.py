@@ -0,0 +1,37 @@
+import typing
+from typing import Dict, Type
+import pydantic_core
+from pydantic import BaseModel
+
+# Fast JSON path for large list responses.
+# Returning ORM objects through a response_model makes FastAPI validate every
+# object (from_attributes walks each attribute and nested model) and then
+# serialize the validated copies. For data read straight from the columns the
+# schema mirrors, the validation changes nothing: the endpoints can build plain
+# dicts from row tuples, in the schema's field order, and encode them with
+# pydantic's own JSON encoder (Rust, like orjson). The bytes are the same as the
+# validated path: same key order, and Decimal, datetime and Enum values are
+# written by the same serializer.
+
+def _is_nested(annotation) -> bool:
+    # A BaseModel, or a list/Optional of one: filled in from another query
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return True
+    return any(_is_nested(argument) for argument in typing.get_args(annotation))
+
+def field_columns(schema: Type[BaseModel], model, **overrides) -> Dict[str, object]:
+    """{field: column} for the scalar fields of schema, in its field order (overrides for computed fields)."""
+    columns = {}
+    nested_seen = False
+    for name, field in schema.model_fields.items():
+        if _is_nested(field.annotation):
+            nested_seen = True
+            continue
+        if nested_seen:
+            # Rows are turned into dicts by position, nested values appended last
+            raise TypeError(f"{schema.__name__}.{name}: nested fields must come after the scalar ones")
+        columns[name] = overrides[name] if name in overrides else getattr(model, name)
+    return columns
+
+def encode(payload) -> bytes:
+    return pydantic_core.to_json(payload)
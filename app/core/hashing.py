@@ -0,0 +1,94 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable
+
+# Dedicated, bounded executor for bcrypt.
+# Hashing/verifying a password burns tens of milliseconds of CPU. Running it on
+# the request threadpool lets a login burst occupy every worker thread and starve
+# unrelated endpoints. bcrypt releases the GIL, so a small dedicated thread pool
+# gives real parallelism; admission is capped (running + queued) and anything
+# beyond that is rejected immediately instead of piling up.
+
+class HasherSaturated(Exception):
+    """Raised when the hashing pool already holds its maximum of pending jobs."""
+
+class PasswordHasher:
+    def __init__(self, hash_fn: Callable[[str], str], verify_fn: Callable[[str, str], bool], max_workers: int, max_queue: int):
+        self._hash_fn = hash_fn
+        self._verify_fn = verify_fn
+        self.max_workers = max_workers
+        self.max_pending = max_workers + max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="password-hasher")
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._lock = threading.Lock()
+        self.pending = 0 # Queued + running
+        self.running = 0
+        self.submitted = 0
+        self.rejected = 0
+        self.completed = 0
+        self.total_hash_seconds = 0.0
+        self.max_hash_seconds = 0.0
+        self.total_wait_seconds = 0.0
+
+    def _submit(self, fn: Callable, *args) -> Future:
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise HasherSaturated()
+        enqueued_at = time.perf_counter()
+        with self._lock:
+            self.pending += 1
+            self.submitted += 1
+
+        def job():
+            started_at = time.perf_counter()
+            with self._lock:
+                self.running += 1
+                self.total_wait_seconds += started_at - enqueued_at
+            try:
+                return fn(*args)
+            finally:
+                elapsed = time.perf_counter() - started_at
+                with self._lock:
+                    self.running -= 1
+                    self.pending -= 1
+                    self.completed += 1
+                    self.total_hash_seconds += elapsed
+                    self.max_hash_seconds = max(self.max_hash_seconds, elapsed)
+                self._slots.release()
+
+        try:
+            return self._executor.submit(job)
+        except Exception:
+            with self._lock:
+                self.pending -= 1
+            self._slots.release()
+            raise
+
+    async def hash(self, password: str) -> str:
+        return await asyncio.wrap_future(self._submit(self._hash_fn, password))
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await asyncio.wrap_future(self._submit(self._verify_fn, plain_password, hashed_password))
+
+    def stats(self) -> dict:
+        with self._lock:
+            completed = self.completed or 1
+            return {
+                "workers": self.max_workers,
+                "max_pending": self.max_pending,
+                "pending": self.pending,
+                "running": self.running,
+                "queue_depth": self.pending - self.running,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "avg_hash_ms": round(self.total_hash_seconds / completed * 1000, 3),
+                "max_hash_ms": round(self.max_hash_seconds * 1000, 3),
+                "avg_queue_wait_ms": round(self.total_wait_seconds / completed * 1000, 3),
+            }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
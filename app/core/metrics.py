@@ -0,0 +1,255 @@
+import bisect
+import threading
+import time
+import weakref
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+from app import database
+from app.core.config import settings
+
+# Prometheus-style metrics, rendered in the text exposition format by GET /metrics
+# (no client library needed). Writers never take a lock: every thread
+# increments its own shard of slots (a plain list), and a scrape sums the
+# shards. The only lock is taken once per thread and metric child, when that
+# shard is created, and when the thread exits and its shard is folded into the
+# totals. Exact totals, and no contention between the event loop and the
+# threadpool.
+
+class _ShardHolder:
+    # Lives in the thread-local: collected when its thread exits
+    __slots__ = ("slots", "__weakref__")
+
+    def __init__(self, slots: list):
+        self.slots = slots
+
+class _Shards:
+    """Per-thread slot lists for one metric child; a finished thread's shard is folded into a base total."""
+
+    __slots__ = ("size", "_local", "_shards", "_base", "_lock")
+
+    def __init__(self, size: int):
+        self.size = size
+        self._local = threading.local()
+        self._shards: List[list] = []
+        self._base = [0] * size # Totals of the threads that have exited
+        self._lock = threading.Lock()
+
+    def slots(self) -> list:
+        try:
+            return self._local.holder.slots
+        except AttributeError:
+            slots = [0] * self.size
+            holder = _ShardHolder(slots)
+            with self._lock:
+                self._shards.append(slots)
+            # Worker threads come and go (anyio retires idle ones): don't keep their shards forever
+            weakref.finalize(holder, self._retire, slots)
+            self._local.holder = holder
+            return slots
+
+    def _retire(self, slots: list) -> None:
+        with self._lock:
+            for index, value in enumerate(slots):
+                self._base[index] += value
+            self._shards = [shard for shard in self._shards if shard is not slots]
+
+    def totals(self) -> list:
+        with self._lock:
+            shards = [self._base, *self._shards]
+            return [sum(values) for values in zip(*shards)]
+
+class _Metric:
+    kind = ""
+    size = 1
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], _Shards] = {}
+        self._lock = threading.Lock()
+
+    def _shards(self, labelvalues: Tuple[str, ...]) -> _Shards:
+        shards = self._children.get(labelvalues)
+        if shards is None:
+            with self._lock:
+                shards = self._children.setdefault(labelvalues, _Shards(self.size))
+        return shards
+
+    def _label_string(self, labelvalues: Tuple[str, ...], extra: str = "") -> str:
+        pairs = [f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, labelvalues)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}", *self.samples()]
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labelvalues: str, amount: float = 1) -> None:
+        self._shards(labelvalues).slots()[0] += amount
+
+    def value(self, *labelvalues: str) -> float:
+        shards = self._children.get(labelvalues)
+        return shards.totals()[0] if shards is not None else 0
+
+    def samples(self) -> Iterable[str]:
+        for labelvalues, shards in list(self._children.items()):
+            yield f"{self.name}{self._label_string(labelvalues)} {_number(shards.totals()[0])}"
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labelvalues: str, amount: float = 1) -> None:
+        self._shards(labelvalues).slots()[0] -= amount
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = ()):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = sorted(buckets)
+        self.size = len(self.buckets) + 3 # One slot per bucket, +Inf, sum, count
+
+    def observe(self, value: float, *labelvalues: str) -> None:
+        slots = self._shards(labelvalues).slots()
+        slots[bisect.bisect_left(self.buckets, value)] += 1
+        slots[-2] += value
+        slots[-1] += 1
+
+    def samples(self) -> Iterable[str]:
+        for labelvalues, shards in list(self._children.items()):
+            totals = shards.totals()
+            cumulative = 0
+            for bound, count in zip([*self.buckets, float("inf")], totals):
+                cumulative += count
+                le = 'le="' + _number(bound) + '"'
+                yield f"{self.name}_bucket{self._label_string(labelvalues, le)} {cumulative}"
+            yield f"{self.name}_sum{self._label_string(labelvalues)} {_number(totals[-2])}"
+            yield f"{self.name}_count{self._label_string(labelvalues)} {totals[-1]}"
+
+class CallbackGauge(_Metric):
+    """Gauge (or counter) read from a callback at scrape time: {labelvalues: value}."""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str], callback: Callable[[], Dict[Tuple[str, ...], float]], kind: str = "gauge"):
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+        self.kind = kind
+
+    def samples(self) -> Iterable[str]:
+        for labelvalues, value in self.callback().items():
+            yield f"{self.name}{self._label_string(labelvalues)} {_number(value)}"
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+class Registry:
+    def __init__(self):
+        self.metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
+
+# Request latency in seconds (the Prometheus client's default buckets)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+
+http_request_duration = registry.register(Histogram(
+    "http_request_duration_seconds", "Time until the response is complete, by route template.",
+    ("method", "route", "status"), LATENCY_BUCKETS,
+))
+http_requests_in_flight = registry.register(Gauge("http_requests_in_flight", "Requests being handled right now."))
+orders_created = registry.register(Counter(
+    "orders_created_total",
+    "Order creation attempts by outcome (success, insufficient_stock, missing_product, missing_client, invalid, aborted, error).",
+    ("outcome",),
+))
+auth_failures = registry.register(Counter(
+    "auth_failures_total",
+    "Failed authentications by reason (bad_credentials, invalid_token, revoked_token, inactive_user, forbidden, hasher_busy).",
+    ("reason",),
+))
+
+def _pool_values(keys: Sequence[str]) -> Callable[[], Dict[Tuple[str, ...], float]]:
+    def read() -> Dict[Tuple[str, ...], float]:
+        values = {}
+        for name, metrics in database.pool_metrics.items():
+            snapshot = metrics.snapshot()
+            for key in keys:
+                if snapshot.get(key) is not None:
+                    # SQLAlchemy reports unopened pool slots as negative overflow
+                    value = max(0, snapshot[key]) if key == "overflow" else snapshot[key]
+                    values[(name, key) if len(keys) > 1 else (name,)] = value
+        return values
+    return read
+
+registry.register(CallbackGauge("db_pool_size", "Configured size of each database pool.", ("pool",), _pool_values(("size",))))
+registry.register(CallbackGauge(
+    "db_pool_connections", "Connections of each database pool by state.", ("pool", "state"),
+    _pool_values(("checked_out", "idle", "overflow")),
+))
+registry.register(CallbackGauge("db_pool_checkouts_total", "Connection checkouts.", ("pool",), _pool_values(("checkouts",)), kind="counter"))
+registry.register(CallbackGauge("db_pool_timeouts_total", "Checkouts that timed out (pool exhausted).", ("pool",), _pool_values(("timeouts",)), kind="counter"))
+registry.register(CallbackGauge("db_pool_connection_errors_total", "Failed connects and disconnects.", ("pool",), _pool_values(("connection_errors",)), kind="counter"))
+
+def route_template(scope) -> str:
+    """Route template of a request ("/api/v1/orders/{order_id}"), "unmatched" when no route matched."""
+    route = scope.get("route")
+    path_format = getattr(route, "path_format", None)
+    if path_format is None:
+        return "unmatched" # One series for every unknown path: raw paths would explode the label set
+    # The route only knows its path inside its router; the include prefix is what precedes it
+    try:
+        rendered = path_format.format(**scope.get("path_params", {}))
+    except (KeyError, IndexError):
+        return path_format
+    path = scope["path"]
+    prefix = path[:-len(rendered)] if path.endswith(rendered) else ""
+    return prefix + route.path
+
+class MetricsMiddleware:
+    """Pure ASGI middleware: in-flight gauge and latency histogram per route template."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.METRICS_ENABLED:
+            return await self.app(scope, receive, send)
+        started = time.perf_counter()
+        status_code = 500 # If the app fails before responding
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        http_requests_in_flight.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            http_requests_in_flight.dec()
+            http_request_duration.observe(time.perf_counter() - started, scope["method"], route_template(scope), str(status_code))
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+def render() -> str:
+    return registry.render()
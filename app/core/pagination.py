@@ -0,0 +1,42 @@
+import base64
+import binascii
+import json
+from typing import Optional, Sequence
+from fastapi import HTTPException, status
+from sqlalchemy.orm import Query
+
+# Keyset (cursor) pagination helpers shared by the list endpoints.
+# Cursors are opaque to clients: a base64url-encoded JSON payload holding the
+# last id of the previous page. Filtering on `id > last_id` lets the database
+# seek straight into the primary key index instead of scanning and discarding
+# `skip` rows, so every page costs the same.
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def encode_cursor(last_id: int) -> str:
+    payload = json.dumps({"id": last_id}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        last_id = json.loads(base64.urlsafe_b64decode(padded.encode()))["id"]
+        if not isinstance(last_id, int):
+            raise ValueError("cursor id must be an integer")
+        return last_id
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+def paginate(query: Query, id_column, skip: int = 0, limit: int = 100, cursor: Optional[str] = None) -> Query:
+    # Always order by id so offset and cursor pages are stable and agree with each other
+    query = query.order_by(id_column)
+    if cursor:
+        return query.filter(id_column > decode_cursor(cursor)).limit(limit)
+    return query.offset(skip).limit(limit)
+
+def next_cursor(items: Sequence, limit: int) -> Optional[str]:
+    # A short page means there is nothing left to fetch
+    if not items or len(items) < limit:
+        return None
+    last = items[-1]
+    return encode_cursor(last["id"] if isinstance(last, dict) else last.id) # ORM objects or fast-path dicts
@@ -0,0 +1,156 @@
+import logging
+import threading
+import time
+from typing import Optional
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+# Connection pool instrumentation.
+# InstrumentedQueuePool times every checkout (including the wait for a free
+# connection) and detects exhaustion (pool timeout). Pool/engine events count
+# connections opened, invalidated and connection errors. PoolMetrics.snapshot()
+# is what the admin endpoint reports.
+
+logger = logging.getLogger(__name__)
+
+# Log "all connections in use" at most this often
+SATURATION_LOG_INTERVAL_SECONDS = 10.0
+
+class PoolMetrics:
+    def __init__(self, name: str, slow_checkout_ms: float = 100.0):
+        self.name = name
+        self.slow_checkout_ms = slow_checkout_ms
+        self.pool: Optional[QueuePool] = None
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.connections_opened = 0
+        self.invalidations = 0
+        self.connection_errors = 0
+        self.timeouts = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.last_exhausted_at: Optional[float] = None
+        self._last_saturation_log = 0.0
+
+    def record_checkout(self, wait_seconds: float) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.total_wait_seconds += wait_seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, wait_seconds)
+        if wait_seconds * 1000 >= self.slow_checkout_ms:
+            logger.warning("Slow connection checkout on pool %s: waited %.1f ms (%s)", self.name, wait_seconds * 1000, self._status())
+
+    def record_timeout(self) -> None:
+        with self._lock:
+            self.timeouts += 1
+            self.last_exhausted_at = time.time()
+        logger.error("Connection pool %s exhausted: checkout timed out (%s)", self.name, self._status())
+
+    def record_connection_error(self) -> None:
+        with self._lock:
+            self.connection_errors += 1
+
+    def check_saturation(self) -> None:
+        # Called on every checkout: warn when the last free connection was just taken
+        pool = self.pool
+        if pool is None or not isinstance(pool, QueuePool):
+            return
+        if pool.checkedout() < pool.size() + max(pool._max_overflow, 0):
+            return
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_saturation_log < SATURATION_LOG_INTERVAL_SECONDS:
+                return
+            self._last_saturation_log = now
+        logger.warning("Connection pool %s saturated: every connection is checked out (%s)", self.name, self._status())
+
+    def _status(self) -> str:
+        return self.pool.status() if self.pool is not None else "no pool"
+
+    def snapshot(self) -> dict:
+        pool = self.pool
+        gauges = {}
+        if isinstance(pool, QueuePool):
+            gauges = {
+                "size": pool.size(),
+                "max_overflow": pool._max_overflow,
+                "checked_out": pool.checkedout(),
+                "idle": pool.checkedin(),
+                "overflow": pool.overflow(),
+            }
+        with self._lock:
+            checkouts = self.checkouts or 1
+            return {
+                "name": self.name,
+                "pool_class": type(pool).__name__ if pool is not None else None,
+                **gauges,
+                "checkouts": self.checkouts,
+                "connections_opened": self.connections_opened,
+                "invalidations": self.invalidations,
+                "connection_errors": self.connection_errors,
+                "timeouts": self.timeouts,
+                "avg_checkout_wait_ms": round(self.total_wait_seconds / checkouts * 1000, 3),
+                "max_checkout_wait_ms": round(self.max_wait_seconds * 1000, 3),
+                "last_exhausted_at": self.last_exhausted_at,
+            }
+
+class _InstrumentedPoolMixin:
+    metrics: Optional[PoolMetrics] = None
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            if self.metrics is not None:
+                self.metrics.record_timeout()
+            raise
+        except Exception:
+            if self.metrics is not None:
+                self.metrics.record_connection_error()
+            raise
+        if self.metrics is not None:
+            self.metrics.record_checkout(time.perf_counter() - start)
+        return connection
+
+    def recreate(self):
+        # engine.dispose() swaps in a new pool; keep reporting to the same metrics
+        new_pool = super().recreate()
+        new_pool.metrics = self.metrics
+        if self.metrics is not None:
+            self.metrics.pool = new_pool
+        return new_pool
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    pass
+
+class InstrumentedAsyncQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+def instrument_engine(engine: Engine, metrics: PoolMetrics) -> PoolMetrics:
+    """Attach metrics to an engine built with one of the instrumented pool classes."""
+    metrics.pool = engine.pool
+    if isinstance(engine.pool, _InstrumentedPoolMixin):
+        engine.pool.metrics = metrics
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        with metrics._lock:
+            metrics.connections_opened += 1
+
+    @event.listens_for(engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        metrics.check_saturation()
+
+    @event.listens_for(engine, "invalidate")
+    def _on_invalidate(dbapi_connection, connection_record, exception):
+        with metrics._lock:
+            metrics.invalidations += 1
+
+    @event.listens_for(engine, "handle_error")
+    def _on_error(context):
+        if context.is_disconnect:
+            metrics.record_connection_error()
+
+    return metrics
@@ -0,0 +1,102 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+from app.core.config import settings
+
+# In-process cache of authenticated principals.
+# get_current_user used to hit the database on every request just to re-read the
+# user row behind the JWT. The cache keeps a snapshot of that row keyed by the
+# token subject (email); an entry only answers tokens carrying the same
+# token_version, so bumping users.token_version (deactivation, demotion,
+# password change) revokes outstanding tokens. Entries expire after a TTL,
+# which bounds staleness in other worker processes.
+
+@dataclass(frozen=True)
+class Principal:
+    id: int
+    email: str
+    is_active: bool
+    is_superuser: bool
+    token_version: int
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+    @classmethod
+    def from_user(cls, user) -> "Principal":
+        return cls(
+            id=user.id,
+            email=user.email,
+            is_active=bool(user.is_active),
+            is_superuser=bool(user.is_superuser),
+            token_version=user.token_version or 0,
+            created_at=user.created_at,
+            updated_at=user.updated_at,
+        )
+
+class PrincipalCache:
+    """Thread-safe LRU cache with per-entry TTL and hit/miss counters."""
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple[Principal, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0 and self.max_size > 0
+
+    def get(self, email: str, token_version: int) -> Optional[Principal]:
+        if not self.enabled:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(email)
+            if entry is not None:
+                principal, expires_at = entry
+                if expires_at > now and principal.token_version == token_version:
+                    self._entries.move_to_end(email)
+                    self.hits += 1
+                    return principal
+                if expires_at <= now:
+                    del self._entries[email]
+            self.misses += 1
+            return None
+
+    def put(self, principal: Principal) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[principal.email] = (principal, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(principal.email)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, email: str) -> None:
+        with self._lock:
+            self._entries.pop(email, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+principal_cache = PrincipalCache(
+    max_size=settings.PRINCIPAL_CACHE_MAX_SIZE,
+    ttl_seconds=settings.PRINCIPAL_CACHE_TTL_SECONDS,
+)
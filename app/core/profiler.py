@@ -0,0 +1,155 @@
+import asyncio
+import sys
+import threading
+import time
+from collections import Counter
+from types import CodeType
+from typing import Dict, List, Optional, Tuple
+
+# In-process sampling profiler for live diagnosis (GET /admin/profile).
+# A background thread wakes every interval, reads the current stack of every
+# other thread (sys._current_frames) and counts identical stacks. Nothing is
+# hooked into the profiled code, unlike cProfile / sys.setprofile, so the only
+# cost is the sampling itself: it holds the GIL while walking the stacks. That
+# time is measured, reported as the overhead, and capped: the sampler sleeps
+# long enough after each sample to stay under max_overhead of the wall time.
+# Only one profile runs at a time per worker, for a bounded duration.
+
+Frame = Tuple[str, str, int] # (module:qualname, file, first line)
+
+class ProfilerBusy(Exception):
+    """Raised when a profile is already being taken in this worker."""
+
+def _is_app_module(module: str) -> bool:
+    return module == "app" or module.startswith("app.")
+
+class SamplingProfiler:
+    def __init__(self, interval: float, max_overhead: float = 0.05, app_only: bool = True, max_depth: int = 128):
+        self.interval = interval
+        self.max_overhead = max_overhead
+        self.app_only = app_only # Keep only stacks going through app code, from the first app frame down
+        self.max_depth = max_depth
+        self.stacks: Counter = Counter() # {(Frame, ...) root first: samples}
+        self.ticks = 0
+        self.sampling_seconds = 0.0 # Time the sampler held the GIL
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self._frames: Dict[CodeType, Frame] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self.started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.finished = time.perf_counter()
+
+    @property
+    def duration(self) -> float:
+        return (self.finished or time.perf_counter()) - self.started
+
+    @property
+    def overhead(self) -> float:
+        return self.sampling_seconds / self.duration if self.duration > 0 else 0.0
+
+    def _frame(self, code: CodeType, module: str) -> Frame:
+        frame = self._frames.get(code)
+        if frame is None:
+            frame = self._frames[code] = (f"{module}:{code.co_qualname}", code.co_filename, code.co_firstlineno)
+        return frame
+
+    def _stack(self, frame) -> Optional[Tuple[Frame, ...]]:
+        stack: List[Frame] = []
+        root = None # Index of the outermost app frame
+        while frame is not None and len(stack) < self.max_depth:
+            module = frame.f_globals.get("__name__", "?")
+            if _is_app_module(module):
+                root = len(stack)
+            stack.append(self._frame(frame.f_code, module))
+            frame = frame.f_back
+        if self.app_only:
+            if root is None:
+                return None # Idle or framework-only thread (event loop selector, waiting workers...)
+            del stack[root + 1:]
+        return tuple(reversed(stack))
+
+    def sample(self) -> None:
+        own = threading.get_ident()
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own:
+                continue
+            stack = self._stack(frame)
+            if stack:
+                self.stacks[stack] += 1
+        self.ticks += 1
+
+    def _run(self) -> None:
+        next_tick = time.perf_counter()
+        while not self._stop.is_set():
+            tick_started = time.perf_counter()
+            self.sample()
+            cost = time.perf_counter() - tick_started
+            self.sampling_seconds += cost
+            # Keep the schedule, but never sample more often than the overhead cap allows
+            next_tick = max(next_tick + self.interval, tick_started + cost / self.max_overhead)
+            self._stop.wait(max(0.0, next_tick - time.perf_counter()))
+
+    def summary(self) -> dict:
+        return {
+            "duration_seconds": round(self.duration, 3),
+            "interval_ms": self.interval * 1000,
+            "ticks": self.ticks,
+            "samples": sum(self.stacks.values()),
+            "distinct_stacks": len(self.stacks),
+            "sampling_ms": round(self.sampling_seconds * 1000, 3),
+            "overhead": round(self.overhead, 5), # Fraction of the wall time spent sampling
+        }
+
+    def collapsed(self) -> str:
+        """Brendan Gregg's collapsed stacks ("root;...;leaf count" per line), for flamegraph.pl / speedscope."""
+        return "".join(f"{';'.join(name for name, _, _ in stack)} {count}\n" for stack, count in self.stacks.most_common())
+
+    def speedscope(self, name: str = "profile") -> dict:
+        """Speedscope file (https://www.speedscope.app/file-format-schema.json), one sampled profile weighted in seconds."""
+        index: Dict[Frame, int] = {}
+        samples, weights = [], []
+        period = self.duration / self.ticks if self.ticks else self.interval # Actual, after the overhead cap
+        for stack, count in self.stacks.most_common():
+            samples.append([index.setdefault(frame, len(index)) for frame in stack])
+            weights.append(count * period)
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "shared": {"frames": [{"name": frame_name, "file": file, "line": line} for frame_name, file, line in index]},
+            "profiles": [{
+                "type": "sampled",
+                "name": name,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": samples,
+                "weights": weights,
+            }],
+            "name": name,
+            "exporter": "lu_estilos_api",
+        }
+
+_running = threading.Lock()
+
+async def profile(seconds: float, interval: float, max_overhead: float, app_only: bool = True) -> SamplingProfiler:
+    """Sample this worker for `seconds` without blocking the event loop; ProfilerBusy if a profile is already running."""
+    if not _running.acquire(blocking=False):
+        raise ProfilerBusy()
+    try:
+        profiler = SamplingProfiler(interval, max_overhead=max_overhead, app_only=app_only)
+        profiler.start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            profiler.stop()
+        return profiler
+    finally:
+        _running.release()
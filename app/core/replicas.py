@@ -0,0 +1,117 @@
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+# Read-replica routing.
+# Read-only requests get a session from the next healthy replica (round-robin);
+# everything else, and reads when no replica is healthy, stays on the primary.
+# A replica is marked unhealthy when a connect fails or a disconnect is
+# detected on it, and is probed again (SELECT 1) once the retry interval passes.
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class Replica:
+    name: str
+    engine: Engine # Sync engine, also used for health probes
+    session_factory: Callable
+    async_session_factory: Optional[Callable] = None
+    async_engine: Optional[AsyncEngine] = None # Async mode only; errors on it also mark the replica
+    healthy: bool = True
+    unhealthy_since: Optional[float] = None
+    last_error: Optional[str] = None
+    sessions_served: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def mark_unhealthy(self, error) -> None:
+        with self._lock:
+            if self.healthy:
+                logger.warning("Replica %s marked unhealthy: %s", self.name, error)
+            self.healthy = False
+            self.unhealthy_since = time.monotonic()
+            self.last_error = str(error)
+
+    def probe(self) -> bool:
+        try:
+            with self.engine.connect() as connection:
+                connection.execute(text("SELECT 1"))
+        except Exception as e:
+            self.mark_unhealthy(e)
+            return False
+        with self._lock:
+            if not self.healthy:
+                logger.info("Replica %s is healthy again", self.name)
+            self.healthy = True
+            self.unhealthy_since = None
+            self.last_error = None
+        return True
+
+class ReplicaRouter:
+    def __init__(self, primary_session_factory: Callable, replicas: List[Replica],
+                 retry_interval: float = 30.0, primary_async_session_factory: Optional[Callable] = None):
+        self.primary_session_factory = primary_session_factory
+        self.primary_async_session_factory = primary_async_session_factory
+        self.replicas = replicas
+        self.retry_interval = retry_interval
+        self.primary_fallbacks = 0
+        self._next = 0
+        self._lock = threading.Lock()
+        for replica in replicas:
+            self._watch(replica)
+
+    def _watch(self, replica: Replica) -> None:
+        def _on_error(context):
+            # No connection means the connect itself failed
+            if context.is_disconnect or context.connection is None:
+                replica.mark_unhealthy(context.original_exception)
+        event.listen(replica.engine, "handle_error", _on_error)
+        if replica.async_engine is not None:
+            event.listen(replica.async_engine.sync_engine, "handle_error", _on_error)
+
+    def choose_replica(self) -> Optional[Replica]:
+        """Next healthy replica in round-robin order, or None to use the primary."""
+        if not self.replicas:
+            return None
+        with self._lock:
+            start = self._next
+            self._next = (self._next + 1) % len(self.replicas)
+        now = time.monotonic()
+        for offset in range(len(self.replicas)):
+            replica = self.replicas[(start + offset) % len(self.replicas)]
+            if not replica.healthy:
+                if now - (replica.unhealthy_since or 0) < self.retry_interval or not replica.probe():
+                    continue
+            replica.sessions_served += 1
+            return replica
+        with self._lock:
+            self.primary_fallbacks += 1
+        return None
+
+    def read_session_factory(self) -> Callable:
+        replica = self.choose_replica()
+        return replica.session_factory if replica else self.primary_session_factory
+
+    def async_read_session_factory(self) -> Callable:
+        replica = self.choose_replica()
+        if replica and replica.async_session_factory:
+            return replica.async_session_factory
+        return self.primary_async_session_factory
+
+    def status(self) -> dict:
+        return {
+            "primary_fallbacks": self.primary_fallbacks,
+            "replicas": [
+                {
+                    "name": replica.name,
+                    "healthy": replica.healthy,
+                    "sessions_served": replica.sessions_served,
+                    "last_error": replica.last_error,
+                }
+                for replica in self.replicas
+            ],
+        }
@@ -0,0 +1,181 @@
+import functools
+import inspect
+import json
+import logging
+import re
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Iterator, Optional
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.core.config import settings
+
+# Per-request timing: where did the time go? SQL (cursor execute hooks on the
+# engines), response serialization (from the endpoint's return to the response
+# start, plus bodies the endpoints serialize themselves) and the rest of the
+# handler (dependencies, endpoint logic, password hashing...). Reported in a
+# Server-Timing header and one structured log line per request; queries slower
+# than SLOW_QUERY_MS are logged with their normalized SQL.
+# The timing is found through a context variable, which follows the request
+# into the threadpool (sync sessions) and into AsyncSession.run_sync.
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class RequestTiming:
+    started: float
+    request: str = "" # "GET /api/v1/orders/", for the slow query log
+    queries: int = 0
+    db_seconds: float = 0.0
+    serialize_seconds: float = 0.0
+    endpoint_finished: Optional[float] = None # When the endpoint returned (FastAPI serializes after that)
+    response_started: Optional[float] = None
+
+    @property
+    def total_seconds(self) -> float:
+        return (self.response_started or time.perf_counter()) - self.started
+
+    @property
+    def handler_seconds(self) -> float:
+        return max(0.0, self.total_seconds - self.db_seconds - self.serialize_seconds)
+
+    def server_timing(self) -> str:
+        return ", ".join((
+            f'db;dur={self.db_seconds * 1000:.1f};desc="{self.queries} queries"',
+            f"serialize;dur={self.serialize_seconds * 1000:.1f}",
+            f"handler;dur={self.handler_seconds * 1000:.1f}",
+            f"total;dur={self.total_seconds * 1000:.1f}",
+        ))
+
+current_timing: ContextVar[Optional[RequestTiming]] = ContextVar("request_timing", default=None)
+
+@contextmanager
+def serializing() -> Iterator[None]:
+    # For endpoints that render their own body (cached responses, stored replays)
+    timing = current_timing.get()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if timing is not None:
+            timing.serialize_seconds += time.perf_counter() - start
+
+# Normalized SQL: literals and placeholders become "?", IN lists collapse to
+# "(?, ...)", so the same statement always logs the same text
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%\(\w+\)s|%s|\$\d+|(?<!:):\w+|\?")
+_PLACEHOLDER_LIST = re.compile(r"\?(?:\s*,\s*\?)+")
+_WHITESPACE = re.compile(r"\s+")
+
+def normalize_sql(statement: str) -> str:
+    statement = _STRING_LITERAL.sub("?", statement)
+    statement = _PLACEHOLDER.sub("?", statement)
+    statement = _NUMBER_LITERAL.sub("?", statement)
+    statement = _PLACEHOLDER_LIST.sub("?, ...", statement)
+    return _WHITESPACE.sub(" ", statement).strip()
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get("query_started")
+    if not started:
+        return
+    elapsed = time.perf_counter() - started.pop()
+    timing = current_timing.get()
+    if timing is not None:
+        timing.queries += 1
+        timing.db_seconds += elapsed
+    if settings.SLOW_QUERY_MS > 0 and elapsed * 1000 >= settings.SLOW_QUERY_MS:
+        logger.warning(json.dumps({
+            "event": "slow_query",
+            "duration_ms": round(elapsed * 1000, 2),
+            "request": timing.request if timing is not None else None,
+            "executemany": executemany,
+            "sql": normalize_sql(statement),
+        }))
+
+def _handle_error(exception_context):
+    # A failed statement never reaches after_cursor_execute: drop its start time
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("query_started"):
+        connection.info["query_started"].pop()
+
+def instrument_queries(engine: Engine) -> None:
+    """Count and time every statement run through the engine (a sync Engine; use AsyncEngine.sync_engine)."""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+class TimedRoute(APIRoute):
+    """APIRoute that notes when the endpoint returns, separating handler time from response serialization."""
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        if inspect.iscoroutinefunction(endpoint):
+            @functools.wraps(endpoint)
+            async def timed_endpoint(*args, **values):
+                try:
+                    return await endpoint(*args, **values)
+                finally:
+                    _endpoint_finished()
+        else:
+            @functools.wraps(endpoint)
+            def timed_endpoint(*args, **values):
+                try:
+                    return endpoint(*args, **values)
+                finally:
+                    _endpoint_finished()
+        super().__init__(path, timed_endpoint, **kwargs)
+
+def _endpoint_finished() -> None:
+    timing = current_timing.get()
+    if timing is not None:
+        timing.endpoint_finished = time.perf_counter()
+
+class RequestTimingMiddleware:
+    """Pure ASGI middleware (contextvars set here reach the endpoint, unlike BaseHTTPMiddleware)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        timing = RequestTiming(started=time.perf_counter(), request=f"{scope['method']} {scope['path']}")
+        token = current_timing.set(timing)
+        status_code = None
+
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                timing.response_started = time.perf_counter()
+                if timing.endpoint_finished is not None:
+                    timing.serialize_seconds += timing.response_started - timing.endpoint_finished
+                if settings.SERVER_TIMING_HEADER:
+                    # Streaming bodies keep querying after this: the log line has their full cost
+                    message["headers"] = [*message.get("headers", []), (b"server-timing", timing.server_timing().encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_timing.reset(token)
+            route = scope.get("route") # Set by the router; its path lacks the include prefixes
+            duration = time.perf_counter() - timing.started # Up to the last body chunk
+            logger.info(json.dumps({
+                "event": "request",
+                "method": scope["method"],
+                "path": scope["path"],
+                "endpoint": getattr(route, "name", None),
+                "status": status_code,
+                "duration_ms": round(duration * 1000, 2),
+                "db_queries": timing.queries,
+                "db_ms": round(timing.db_seconds * 1000, 2),
+                "serialize_ms": round(timing.serialize_seconds * 1000, 2),
+                "handler_ms": round(max(0.0, duration - timing.db_seconds - timing.serialize_seconds) * 1000, 2),
+            }))
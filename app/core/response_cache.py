@@ -0,0 +1,286 @@
+import base64
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+from urllib.parse import urlencode
+from fastapi import Request, Response, status
+from starlette.concurrency import run_in_threadpool
+from app.core.config import settings
+
+# Response cache for hot, rarely changing GET endpoints (the product catalog).
+# Entries hold the serialized body with a strong ETag (hash of the body) and
+# are keyed by route, query string and auth scope. Each entry records the
+# versions of the tags it was built from ("catalog" for list membership,
+# "product:<id>" per product shown); writers bump the tags they touch after
+# committing, which invalidates exactly the entries depending on them.
+# The in-process backend only sees this worker's bumps (other workers catch up
+# after the TTL); the Redis backend shares entries and versions between workers.
+# Bodies may come from a read replica that hasn't replayed the latest write
+# yet, so a fill is only kept if none of its tags was bumped within the
+# replicas' lag before it started.
+
+EPOCH = "*" # Bumped with every invalidation: detects writes racing a fill
+
+def catalog_tags(*product_ids: int, membership: bool = True) -> List[str]:
+    # membership: the write can add/remove products from some list (or move them between pages)
+    return (["catalog"] if membership else []) + [f"product:{product_id}" for product_id in product_ids]
+
+class FillStamp(NamedTuple):
+    epoch: int
+    started_at: float # time.time(): compared with tag bump times recorded by any worker
+
+@dataclass(frozen=True)
+class CachedResponse:
+    etag: str
+    body: bytes
+    headers: Dict[str, str] = field(default_factory=dict)
+    deps: Dict[str, int] = field(default_factory=dict) # Tag versions the body was built from
+
+class MemoryBackend:
+    """Thread-safe LRU of entries with per-entry TTL, plus tag version counters and bump times."""
+
+    blocking = False
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, Tuple[CachedResponse, float]]" = OrderedDict()
+        self._versions: Dict[str, int] = {}
+        self._bumped_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get_entry(self, key: str) -> Optional[CachedResponse]:
+        now = time.monotonic()
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            entry, expires_at = item
+            if expires_at <= now:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def put_entry(self, key: str, entry: CachedResponse, ttl_seconds: float) -> None:
+        with self._lock:
+            self._entries[key] = (entry, time.monotonic() + ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_versions(self, tags: List[str]) -> List[int]:
+        with self._lock:
+            return [self._versions.get(tag, 0) for tag in tags]
+
+    def get_tag_state(self, tags: List[str]) -> List[Tuple[int, float]]:
+        # (version, time of the last bump) per tag
+        with self._lock:
+            return [(self._versions.get(tag, 0), self._bumped_at.get(tag, 0.0)) for tag in tags]
+
+    def bump(self, tags: List[str]) -> None:
+        now = time.time()
+        with self._lock:
+            for tag in tags:
+                self._versions[tag] = self._versions.get(tag, 0) + 1
+                self._bumped_at[tag] = now
+
+    def size(self) -> int:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._versions.clear()
+            self._bumped_at.clear()
+
+class RedisBackend:
+    """Entries and versions in a Redis-compatible server, shared by every worker (needs the `redis` package)."""
+
+    blocking = True # Network round trips: called from the threadpool in async code
+
+    def __init__(self, url: str, prefix: str = "response-cache:"):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("RESPONSE_CACHE_REDIS_URL requires the 'redis' package (pip install redis)") from e
+        self._client = redis.Redis.from_url(url)
+        self._prefix = prefix
+        self.evictions = 0 # Done by the server (maxmemory policy / TTL)
+
+    def get_entry(self, key: str) -> Optional[CachedResponse]:
+        raw = self._client.get(f"{self._prefix}entry:{key}")
+        if raw is None:
+            return None
+        data = json.loads(raw)
+        return CachedResponse(etag=data["etag"], body=base64.b64decode(data["body"]), headers=data["headers"], deps=data["deps"])
+
+    def put_entry(self, key: str, entry: CachedResponse, ttl_seconds: float) -> None:
+        data = {"etag": entry.etag, "body": base64.b64encode(entry.body).decode(), "headers": entry.headers, "deps": entry.deps}
+        self._client.set(f"{self._prefix}entry:{key}", json.dumps(data), px=int(ttl_seconds * 1000))
+
+    def get_versions(self, tags: List[str]) -> List[int]:
+        return [int(value or 0) for value in self._client.mget([f"{self._prefix}version:{tag}" for tag in tags])]
+
+    def get_tag_state(self, tags: List[str]) -> List[Tuple[int, float]]:
+        values = self._client.mget([f"{self._prefix}version:{tag}" for tag in tags] + [f"{self._prefix}bumped:{tag}" for tag in tags])
+        return [(int(version or 0), float(bumped_at or 0)) for version, bumped_at in zip(values[:len(tags)], values[len(tags):])]
+
+    def bump(self, tags: List[str]) -> None:
+        # MULTI/EXEC: readers see all of the bumps or none
+        now = time.time()
+        with self._client.pipeline(transaction=True) as pipe:
+            for tag in tags:
+                pipe.incr(f"{self._prefix}version:{tag}")
+                pipe.set(f"{self._prefix}bumped:{tag}", now)
+            pipe.execute()
+
+    def size(self) -> Optional[int]:
+        return None
+
+    def clear(self) -> None:
+        for key in self._client.scan_iter(f"{self._prefix}*"):
+            self._client.delete(key)
+
+class ResponseCache:
+    """Versioned response cache with hit/miss counters; ttl_seconds <= 0 disables it."""
+
+    def __init__(self, ttl_seconds: float, max_size: int, redis_url: str = "", replica_lag_seconds: float = 0.0):
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self.redis_url = redis_url
+        self.replica_lag_seconds = replica_lag_seconds # 0: bodies are built from the primary
+        self._backend = None
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.stale_fills = 0
+        self.lagged_fills = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0 and self.max_size > 0
+
+    @property
+    def backend(self):
+        # Created on first use, so importing the app never needs Redis
+        if self._backend is None:
+            self._backend = RedisBackend(self.redis_url) if self.redis_url else MemoryBackend(self.max_size)
+        return self._backend
+
+    def lookup(self, key: str) -> Optional[CachedResponse]:
+        entry = self.backend.get_entry(key)
+        if entry is not None and self.backend.get_versions(list(entry.deps)) == list(entry.deps.values()):
+            self.hits += 1
+            return entry
+        self.misses += 1
+        return None
+
+    def begin_fill(self) -> FillStamp:
+        """Call before building a body (before its database reads); pass the stamp to store()."""
+        return FillStamp(self.backend.get_versions([EPOCH])[0], time.time())
+
+    def store(self, key: str, stamp: FillStamp, entry: CachedResponse, tags: Iterable[str]) -> None:
+        # Versions are read after the body was built; a write committed meanwhile
+        # has bumped the epoch, and then the (possibly stale) body isn't kept.
+        # A write bumped shortly before the fill started may not have reached the
+        # replica the body was read from yet: not kept either
+        tags = list(dict.fromkeys(tags))
+        state = self.backend.get_tag_state([EPOCH, *tags])
+        if state[0][0] != stamp.epoch:
+            self.stale_fills += 1
+            return
+        if any(stamp.started_at - bumped_at < self.replica_lag_seconds for _, bumped_at in state[1:]):
+            self.lagged_fills += 1
+            return
+        deps = {tag: version for tag, (version, _) in zip(tags, state[1:])}
+        self.backend.put_entry(key, CachedResponse(entry.etag, entry.body, entry.headers, deps), self.ttl_seconds)
+
+    def invalidate(self, tags: Iterable[str]) -> None:
+        """Call after committing a write, with the tags it touched."""
+        if self.enabled:
+            self.backend.bump([EPOCH, *tags])
+
+    def clear(self) -> None:
+        if self._backend is not None:
+            self._backend.clear()
+
+    def stats(self) -> dict:
+        backend = self.backend
+        return {
+            "backend": "redis" if isinstance(backend, RedisBackend) else "memory",
+            "size": backend.size(),
+            "hits": self.hits,
+            "misses": self.misses,
+            "not_modified": self.not_modified,
+            "stale_fills": self.stale_fills,
+            "lagged_fills": self.lagged_fills,
+            "evictions": backend.evictions,
+        }
+
+response_cache = ResponseCache(
+    ttl_seconds=settings.RESPONSE_CACHE_TTL_SECONDS,
+    max_size=settings.RESPONSE_CACHE_MAX_SIZE,
+    redis_url=settings.RESPONSE_CACHE_REDIS_URL,
+    # Without replicas the catalog GETs read the primary: nothing to wait for
+    replica_lag_seconds=settings.RESPONSE_CACHE_REPLICA_LAG_SECONDS if settings.DATABASE_REPLICA_URLS else 0.0,
+)
+
+def make_etag(body: bytes) -> str:
+    # Strong validator: identical bytes, identical ETag, in every worker and across restarts
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = {value.strip().removeprefix("W/") for value in if_none_match.split(",")}
+    return etag in candidates
+
+def _request_key(request: Request, user) -> str:
+    # Route + normalized query string + auth scope (responses may differ by role)
+    scope = "superuser" if user.is_superuser else "user"
+    query = urlencode(sorted(request.query_params.multi_items()))
+    return f"{scope}:{request.url.path}?{query}"
+
+def _respond(request: Request, entry: CachedResponse, cache_status: str) -> Response:
+    headers = {"ETag": entry.etag, "Cache-Control": "private, no-cache", "X-Cache": cache_status}
+    if etag_matches(request.headers.get("if-none-match"), entry.etag):
+        response_cache.not_modified += 1
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers={**entry.headers, **headers})
+
+# build() returns (JSON body, extra response headers, tags the body depends on)
+Builder = Callable[[], Awaitable[Tuple[bytes, Dict[str, str], Iterable[str]]]]
+
+async def cached_response(request: Request, user, build: Builder) -> Response:
+    """
+    Serve a GET from the response cache, or build, store and serve it.
+
+    Conditional requests (If-None-Match) get a 304 when the ETag still matches,
+    from the cache without touching the database when the entry is there.
+    """
+    if not response_cache.enabled:
+        body, headers, _ = await build()
+        return _respond(request, CachedResponse(make_etag(body), body, headers), "BYPASS")
+
+    async def call(function, *args):
+        if response_cache.backend.blocking:
+            return await run_in_threadpool(function, *args)
+        return function(*args)
+
+    key = _request_key(request, user)
+    entry = await call(response_cache.lookup, key)
+    if entry is not None:
+        return _respond(request, entry, "HIT")
+    stamp = await call(response_cache.begin_fill)
+    body, headers, tags = await build()
+    entry = CachedResponse(make_etag(body), body, headers)
+    await call(response_cache.store, key, stamp, entry, tags)
+    return _respond(request, entry, "MISS")
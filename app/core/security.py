@@ -2,7 +2,10 @@ from datetime import datetime, timedelta, timezone
 from typing import Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
+from app.core import metrics
 from app.core.config import settings
+from app.core.hashing import HasherSaturated, PasswordHasher
+from app.core.principal_cache import Principal, principal_cache
 from app.schemas.token import TokenData
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
@@ -24,6 +27,34 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
+password_hasher = PasswordHasher(
+    hash_fn=get_password_hash,
+    verify_fn=verify_password,
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    max_queue=settings.PASSWORD_HASH_MAX_QUEUE,
+)
+
+def _hasher_busy_exception() -> HTTPException:
+    metrics.auth_failures.inc("hasher_busy")
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Authentication service is busy, please retry",
+        headers={"Retry-After": "1"},
+    )
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    # Runs bcrypt on the dedicated hashing pool; 503 when it is saturated
+    try:
+        return await password_hasher.verify(plain_password, hashed_password)
+    except HasherSaturated:
+        raise _hasher_busy_exception()
+
+async def get_password_hash_async(password: str) -> str:
+    try:
+        return await password_hasher.hash(password)
+    except HasherSaturated:
+        raise _hasher_busy_exception()
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
     if expires_delta:
@@ -51,7 +82,10 @@ def decode_token(token: str) -> Optional[dict]:
     except JWTError:
         return None
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(database.get_db)) -> models.User:
+def _get_user_by_email(db: Session, email: str) -> models.User | None:
+    return db.query(models.User).filter(models.User.email == email).first()
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: database.DBSession = Depends(database.get_session)) -> Principal:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -59,24 +93,41 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
     )
     payload = decode_token(token)
     if payload is None:
+        metrics.auth_failures.inc("invalid_token")
         raise credentials_exception
     email: str = payload.get("sub")
     if email is None:
+        metrics.auth_failures.inc("invalid_token")
         raise credentials_exception
-    token_data = schemas.TokenData(email=email)
+    # Tokens issued before token versioning carry no "ver" claim and count as version 0
+    token_data = schemas.TokenData(email=email, token_version=payload.get("ver", 0))
 
-    user = db.query(models.User).filter(models.User.email == token_data.email).first()
+    # Served from memory when possible; the session is only used on a cache miss
+    principal = principal_cache.get(token_data.email, token_data.token_version)
+    if principal is not None:
+        return principal
+
+    user = await database.run_db(db, _get_user_by_email, token_data.email)
     if user is None:
+        metrics.auth_failures.inc("invalid_token")
+        raise credentials_exception
+    if (user.token_version or 0) != token_data.token_version:
+        # Token was revoked (user deactivated, demoted or changed password)
+        metrics.auth_failures.inc("revoked_token")
         raise credentials_exception
-    return user
+    principal = Principal.from_user(user)
+    principal_cache.put(principal)
+    return principal
 
-async def get_current_active_user(current_user: models.User = Depends(get_current_user)) -> models.User:
+async def get_current_active_user(current_user: Principal = Depends(get_current_user)) -> Principal:
     if not current_user.is_active:
+        metrics.auth_failures.inc("inactive_user")
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
 
-async def get_current_active_superuser(current_user: models.User = Depends(get_current_active_user)) -> models.User:
+async def get_current_active_superuser(current_user: Principal = Depends(get_current_active_user)) -> Principal:
     if not current_user.is_superuser:
+        metrics.auth_failures.inc("forbidden")
         raise HTTPException(
             status_code=403,
             detail="The user doesn't have enough privileges"
@@ -1,9 +1,15 @@
+from typing import List, Union
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from fastapi.concurrency import run_in_threadpool
 import os
 from dotenv import load_dotenv
 from app.core.config import settings # Import settings
+from app.core.pool_metrics import InstrumentedAsyncQueuePool, InstrumentedQueuePool, PoolMetrics, instrument_engine
+from app.core.replicas import Replica, ReplicaRouter
+from app.core.request_timing import instrument_queries
 
 load_dotenv()
 
@@ -15,12 +21,91 @@ connect_args = {}
 if DATABASE_URL and "sqlite" in DATABASE_URL:
     connect_args = {"check_same_thread": False}
 
-engine = create_engine(DATABASE_URL, connect_args=connect_args)
+def get_pool_options(url: str, async_driver: bool = False) -> dict:
+    """Pool settings from Settings; in-memory SQLite keeps SQLAlchemy's default pool."""
+    if "sqlite" in url and (":memory:" in url or url.rstrip("/").endswith("sqlite:")):
+        return {}
+    return {
+        "poolclass": InstrumentedAsyncQueuePool if async_driver else InstrumentedQueuePool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+# Pool metrics per engine, reported by the admin endpoint
+pool_metrics = {}
+
+engine = create_engine(DATABASE_URL, connect_args=connect_args, **get_pool_options(DATABASE_URL))
+pool_metrics["primary"] = instrument_engine(engine, PoolMetrics("primary", settings.DB_POOL_SLOW_CHECKOUT_MS))
+instrument_queries(engine)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
+# Either flavour of session an endpoint may receive, depending on DATABASE_ASYNC_MODE
+DBSession = Union[Session, AsyncSession]
+
+def get_async_database_url(url: str) -> str:
+    """Map a sync DATABASE_URL to the matching asyncio driver."""
+    if url.startswith("sqlite:"):
+        return url.replace("sqlite:", "sqlite+aiosqlite:", 1)
+    for prefix in ("postgresql+psycopg2:", "postgresql:", "postgres:"):
+        if url.startswith(prefix):
+            return url.replace(prefix, "postgresql+asyncpg:", 1)
+    return url
+
+# Async mode (opt-in): an AsyncEngine next to the sync one. The sync engine is
+# still used for table creation, migrations and scripts.
+async_engine = None
+AsyncSessionLocal = None
+if settings.DATABASE_ASYNC_MODE:
+    ASYNC_DATABASE_URL = settings.ASYNC_DATABASE_URL or get_async_database_url(DATABASE_URL)
+    async_engine = create_async_engine(
+        ASYNC_DATABASE_URL,
+        connect_args={} if "sqlite" in ASYNC_DATABASE_URL else connect_args,
+        **get_pool_options(ASYNC_DATABASE_URL, async_driver=True),
+    )
+    pool_metrics["primary_async"] = instrument_engine(async_engine.sync_engine, PoolMetrics("primary_async", settings.DB_POOL_SLOW_CHECKOUT_MS))
+    instrument_queries(async_engine.sync_engine)
+    # expire_on_commit=False: attributes can't be lazily reloaded outside a greenlet
+    AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+def get_replica_urls() -> List[str]:
+    return [url.strip() for url in settings.DATABASE_REPLICA_URLS.split(",") if url.strip()]
+
+def create_replica(name: str, url: str) -> Replica:
+    """Engine(s) and session factories for one replica, instrumented like the primary."""
+    replica_connect_args = {"check_same_thread": False} if "sqlite" in url else {}
+    replica_engine = create_engine(url, connect_args=replica_connect_args, **get_pool_options(url))
+    pool_metrics[name] = instrument_engine(replica_engine, PoolMetrics(name, settings.DB_POOL_SLOW_CHECKOUT_MS))
+    instrument_queries(replica_engine)
+    replica = Replica(name=name, engine=replica_engine,
+                      session_factory=sessionmaker(autocommit=False, autoflush=False, bind=replica_engine))
+    if settings.DATABASE_ASYNC_MODE:
+        async_url = get_async_database_url(url)
+        replica_async_engine = create_async_engine(
+            async_url,
+            connect_args={} if "sqlite" in async_url else replica_connect_args,
+            **get_pool_options(async_url, async_driver=True),
+        )
+        pool_metrics[f"{name}_async"] = instrument_engine(replica_async_engine.sync_engine, PoolMetrics(f"{name}_async", settings.DB_POOL_SLOW_CHECKOUT_MS))
+        instrument_queries(replica_async_engine.sync_engine)
+        replica.async_engine = replica_async_engine
+        replica.async_session_factory = async_sessionmaker(bind=replica_async_engine, autoflush=False, expire_on_commit=False)
+    return replica
+
+# Read replicas (optional). Without DATABASE_REPLICA_URLS the router always
+# hands out primary sessions.
+replica_router = ReplicaRouter(
+    SessionLocal,
+    [create_replica(f"replica_{i}", url) for i, url in enumerate(get_replica_urls())],
+    retry_interval=settings.DB_REPLICA_RETRY_SECONDS,
+    primary_async_session_factory=AsyncSessionLocal,
+)
+
 def get_db():
     db = SessionLocal()
     try:
@@ -28,3 +113,39 @@ def get_db():
     finally:
         db.close()
 
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def get_read_db():
+    # Read-only endpoints: a replica session when one is healthy, else the primary
+    db = replica_router.read_session_factory()()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_read_db():
+    # Picking a replica may probe one with a blocking SELECT 1, so keep it off the loop
+    if replica_router.replicas:
+        factory = await run_in_threadpool(replica_router.async_read_session_factory)
+    else:
+        factory = AsyncSessionLocal
+    async with factory() as db:
+        yield db
+
+# The session dependencies used by the endpoints: get_session for writes (and
+# reads that must see them), get_read_session for read-only endpoints
+get_session = get_async_db if settings.DATABASE_ASYNC_MODE else get_db
+get_read_session = get_async_read_db if settings.DATABASE_ASYNC_MODE else get_read_db
+
+async def run_db(db: DBSession, fn, *args, **kwargs):
+    """
+    Run a sync service function without blocking the event loop.
+
+    With an AsyncSession the function runs through run_sync (real async I/O
+    via greenlets); with a plain Session it runs on the threadpool.
+    """
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(fn, *args, **kwargs)
+    return await run_in_threadpool(fn, db, *args, **kwargs)
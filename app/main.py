@@ -1,12 +1,17 @@
-from fastapi import FastAPI
-from fastapi.responses import RedirectResponse
+import secrets
+from fastapi import FastAPI, Header, HTTPException, status
+from fastapi.responses import PlainTextResponse, RedirectResponse
 from app.api.v1.api import api_router
 from app.core.config import settings
+from app.core import metrics
+from app.core.request_timing import RequestTimingMiddleware
 from app.database import engine, Base
+from app.models.search import ensure_sqlite_client_search
 # Create database tables (Only for SQLite during development/testing)
 # For PostgreSQL with Alembic, migrations handle table creation.
 if "sqlite" in str(engine.url):
     Base.metadata.create_all(bind=engine)
+    ensure_sqlite_client_search(engine)
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -15,10 +20,22 @@ app = FastAPI(
 
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
+# Query count, DB / serialization / handler time per request (Server-Timing header and logs)
+app.add_middleware(RequestTimingMiddleware)
+# Latency histograms per route template and in-flight requests, for GET /metrics
+app.add_middleware(metrics.MetricsMiddleware)
+
 @app.get("/", tags=["Root"])
 def read_root():
     return RedirectResponse(url="/docs")
 
+@app.get("/metrics", include_in_schema=False)
+def read_metrics(authorization: str = Header("")):
+    # Prometheus scrape target: request latency, in-flight requests, DB pools, order and auth outcomes
+    if settings.METRICS_TOKEN and not secrets.compare_digest(authorization, f"Bearer {settings.METRICS_TOKEN}"):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid metrics token")
+    return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
 # Add other configurations like CORS middleware if needed
 # from fastapi.middleware.cors import CORSMiddleware
 # app.add_middleware(
@@ -1,5 +1,7 @@
 # This file makes the 'models' directory a Python package
 # Import all models here to make them accessible via app.models.ModelName
 
-from .base import Base, User, Client, Product, Order, OrderItem
+from .base import Base, User, Client, Section, Product, Order, OrderItem, DailyRevenue, ProductSales, SectionRevenue, IdempotencyKey
+from .order_status import OrderStatus, ORDER_STATUS_CODES, ORDER_STATUS_TRANSITIONS
 
+from . import search # Registers the client search indexes (FTS5 / pg_trgm) with the clients table
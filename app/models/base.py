@@ -1,7 +1,8 @@
 from app.database import Base
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Numeric, Text
+from sqlalchemy import BigInteger, Column, Integer, String, Boolean, Date, DateTime, ForeignKey, Index, Numeric, Text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
+from app.models.order_status import OrderStatus, OrderStatusType
 
 class User(Base):
     __tablename__ = "users"
@@ -11,6 +12,7 @@ class User(Base):
     hashed_password = Column(String, nullable=False)
     is_active = Column(Boolean, default=True)
     is_superuser = Column(Boolean, default=False)
+    token_version = Column(Integer, nullable=False, default=0, server_default="0") # Bumped to revoke issued tokens
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
@@ -28,6 +30,14 @@ class Client(Base):
 
     orders = relationship("Order", back_populates="client")
 
+class Section(Base):
+    __tablename__ = "sections"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, unique=True, nullable=False)
+
+    products = relationship("Product", back_populates="section_ref")
+
 class Product(Base):
     __tablename__ = "products"
 
@@ -35,7 +45,7 @@ class Product(Base):
     description = Column(String, index=True, nullable=False)
     sale_value = Column(Numeric(10, 2), nullable=False)
     barcode = Column(String, unique=True, index=True, nullable=True) # Barcode might be optional or unique
-    section = Column(String, index=True, nullable=True)
+    section_id = Column(Integer, ForeignKey("sections.id"), index=True, nullable=True)
     initial_stock = Column(Integer, nullable=False, default=0)
     current_stock = Column(Integer, nullable=False, default=0)
     expiry_date = Column(DateTime, nullable=True)
@@ -44,22 +54,44 @@ class Product(Base):
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
     order_items = relationship("OrderItem", back_populates="product")
+    # Joined eagerly: the section name is part of every product response
+    section_ref = relationship("Section", back_populates="products", lazy="joined")
+
+    @property
+    def section(self) -> str | None:
+        # Section name, as the API exposes it (set it through services.section)
+        return self.section_ref.name if self.section_ref is not None else None
 
 class Order(Base):
     __tablename__ = "orders"
+    # Composite indexes for the get_orders filters: equality column first, then
+    # the created_at range. (status, id) serves status-only filters in page
+    # order, so a page stops after `limit` matches instead of sorting them all.
+    __table_args__ = (
+        Index("ix_orders_client_id_created_at", "client_id", "created_at"),
+        Index("ix_orders_status_created_at", "status", "created_at"),
+        Index("ix_orders_status_id", "status", "id"),
+        Index("ix_orders_created_at", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     client_id = Column(Integer, ForeignKey("clients.id"), nullable=False)
-    status = Column(String, index=True, nullable=False, default="pending") # e.g., pending, processing, shipped, delivered, cancelled
+    status = Column(OrderStatusType, nullable=False, default=OrderStatus.PENDING) # SMALLINT code, see models/order_status.py
     total_value = Column(Numeric(10, 2), nullable=False, default=0.00)
+    # Denormalized bitmap of the sections of the order's products (see services/section.py)
+    section_bits = Column(BigInteger, nullable=False, default=0, server_default="0")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
     client = relationship("Client", back_populates="orders")
-    items = relationship("OrderItem", back_populates="order", cascade="all, delete-orphan")
+    items = relationship("OrderItem", back_populates="order", cascade="all, delete-orphan", order_by="OrderItem.id")
 
 class OrderItem(Base):
     __tablename__ = "order_items"
+    __table_args__ = (
+        Index("ix_order_items_order_id", "order_id"), # Loading an order's items
+        Index("ix_order_items_product_id_order_id", "product_id", "order_id"), # Section filter: product -> orders
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     order_id = Column(Integer, ForeignKey("orders.id"), nullable=False)
@@ -70,6 +102,44 @@ class OrderItem(Base):
     order = relationship("Order", back_populates="items")
     product = relationship("Product", back_populates="order_items")
 
+# Sales aggregates for the reports. Maintained incrementally by the order
+# service in the same transaction as each order write (app/services/report.py)
+# and rebuildable from orders/order_items with `python -m app.cli rebuild-reports`.
+class DailyRevenue(Base):
+    __tablename__ = "report_daily_revenue"
+
+    day = Column(Date, primary_key=True)
+    orders_count = Column(Integer, nullable=False, default=0)
+    units = Column(Integer, nullable=False, default=0)
+    revenue = Column(Numeric(14, 2), nullable=False, default=0)
+
+class ProductSales(Base):
+    __tablename__ = "report_product_sales"
+
+    product_id = Column(Integer, primary_key=True) # No FK: products without remaining sales can still be deleted
+    units = Column(Integer, nullable=False, default=0)
+    revenue = Column(Numeric(14, 2), nullable=False, default=0)
+
+class SectionRevenue(Base):
+    __tablename__ = "report_section_revenue"
+
+    section = Column(String, primary_key=True) # "" for products without a section
+    units = Column(Integer, nullable=False, default=0)
+    revenue = Column(Numeric(14, 2), nullable=False, default=0)
+
 # Import models here to ensure Base has them registered before use
 # This is often done in models/base.py or models/__init__.py
 
+
+# Idempotency-Key records for POST /orders (see app/services/idempotency.py)
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+
+    user_id = Column(Integer, primary_key=True) # Keys are scoped per user
+    key = Column(String(255), primary_key=True)
+    request_hash = Column(String(64), nullable=False) # SHA-256 of the request body
+    order_id = Column(Integer, nullable=True) # Set in the same transaction that creates the order
+    response_status = Column(Integer, nullable=True)
+    response_body = Column(Text, nullable=True)
+    locked_at = Column(DateTime, nullable=False) # When the request currently running it claimed the key (UTC)
+    expires_at = Column(DateTime, nullable=False, index=True) # UTC
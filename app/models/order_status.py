@@ -0,0 +1,44 @@
+import enum
+from sqlalchemy import SmallInteger
+from sqlalchemy.types import TypeDecorator
+
+class OrderStatus(enum.StrEnum):
+    PENDING = "pending"
+    PROCESSING = "processing"
+    SHIPPED = "shipped"
+    DELIVERED = "delivered"
+    CANCELLED = "cancelled"
+
+# Stored codes. Persisted in orders.status: never renumber, only append.
+ORDER_STATUS_CODES = {
+    OrderStatus.PENDING: 1,
+    OrderStatus.PROCESSING: 2,
+    OrderStatus.SHIPPED: 3,
+    OrderStatus.DELIVERED: 4,
+    OrderStatus.CANCELLED: 5,
+}
+_STATUS_BY_CODE = {code: order_status for order_status, code in ORDER_STATUS_CODES.items()}
+
+# Allowed status changes (setting the current status again is always allowed)
+ORDER_STATUS_TRANSITIONS = {
+    OrderStatus.PENDING: {OrderStatus.PROCESSING, OrderStatus.CANCELLED},
+    OrderStatus.PROCESSING: {OrderStatus.PENDING, OrderStatus.SHIPPED, OrderStatus.CANCELLED},
+    OrderStatus.SHIPPED: {OrderStatus.DELIVERED},
+    OrderStatus.DELIVERED: set(),
+    OrderStatus.CANCELLED: {OrderStatus.PENDING}, # Reopen
+}
+
+class OrderStatusType(TypeDecorator):
+    """OrderStatus stored as a SMALLINT code; accepts members or their string values."""
+    impl = SmallInteger
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return ORDER_STATUS_CODES[OrderStatus(value)]
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return _STATUS_BY_CODE[value]
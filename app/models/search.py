@@ -0,0 +1,64 @@
+from sqlalchemy import DDL, Column, Float, Integer, MetaData, String, Table, event
+from app.models.base import Client
+
+# Client search indexes (name/email substring search).
+# - PostgreSQL: pg_trgm GIN indexes, which serve ILIKE '%q%' and similarity().
+# - SQLite: an FTS5 table with the trigram tokenizer (substring MATCH, bm25
+#   ranking) kept in sync with `clients` by triggers.
+# They are created with the clients table by metadata.create_all; existing
+# databases get them from the Alembic migration 0003_client_search.
+
+SQLITE_CLIENT_SEARCH_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS clients_fts USING fts5("
+    "name, email, content='clients', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS clients_fts_ai AFTER INSERT ON clients BEGIN "
+    "INSERT INTO clients_fts(rowid, name, email) VALUES (new.id, new.name, new.email); END",
+    "CREATE TRIGGER IF NOT EXISTS clients_fts_ad AFTER DELETE ON clients BEGIN "
+    "INSERT INTO clients_fts(clients_fts, rowid, name, email) VALUES ('delete', old.id, old.name, old.email); END",
+    "CREATE TRIGGER IF NOT EXISTS clients_fts_au AFTER UPDATE OF name, email ON clients BEGIN "
+    "INSERT INTO clients_fts(clients_fts, rowid, name, email) VALUES ('delete', old.id, old.name, old.email); "
+    "INSERT INTO clients_fts(rowid, name, email) VALUES (new.id, new.name, new.email); END",
+)
+
+POSTGRES_CLIENT_SEARCH_DDL = (
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_clients_name_trgm ON clients USING gin (name gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_clients_email_trgm ON clients USING gin (email gin_trgm_ops)",
+)
+
+for statement in SQLITE_CLIENT_SEARCH_DDL:
+    event.listen(Client.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+for statement in POSTGRES_CLIENT_SEARCH_DDL:
+    event.listen(Client.__table__, "after_create", DDL(statement).execute_if(dialect="postgresql"))
+# The triggers go with the clients table; the FTS table has to be dropped explicitly
+event.listen(Client.__table__, "before_drop", DDL("DROP TABLE IF EXISTS clients_fts").execute_if(dialect="sqlite"))
+
+# Query-side handle on the FTS table. Kept out of Base.metadata so create_all
+# never tries to create it as a regular table.
+clients_fts = Table(
+    "clients_fts", MetaData(),
+    Column("rowid", Integer, primary_key=True),
+    Column("name", String),
+    Column("email", String),
+    Column("rank", Float), # Hidden FTS5 column: the ranking function's score for a MATCH
+)
+
+def ensure_sqlite_client_search(engine) -> None:
+    """Add the FTS table and triggers to a SQLite database created before them (no Alembic)."""
+    with engine.begin() as conn:
+        exists = conn.exec_driver_sql("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'clients_fts'").first()
+        if exists:
+            return
+        for statement in SQLITE_CLIENT_SEARCH_DDL:
+            conn.exec_driver_sql(statement)
+        conn.exec_driver_sql("INSERT INTO clients_fts(clients_fts) VALUES ('rebuild')")
+
+def include_object(object, name, type_, reflected, compare_to) -> bool:
+    """Alembic include_object hook: leave the search objects above out of autogenerate and check."""
+    # Created by raw DDL, so absent from the metadata: autogenerate would drop
+    # clients_fts and its FTS5 shadow tables (clients_fts_data, _idx, ...)
+    if type_ == "table" and name.startswith("clients_fts"):
+        return False
+    if type_ == "index" and name in ("ix_clients_name_trgm", "ix_clients_email_trgm"):
+        return False
+    return True
@@ -2,6 +2,6 @@
 from .token import Token, TokenData
 from .user import User, UserCreate, UserUpdate, UserInDB
 from .client import Client, ClientCreate, ClientUpdate, ClientInDB
-from .product import Product, ProductCreate, ProductUpdate, ProductInDB
-from .order import Order, OrderCreate, OrderUpdate, OrderInDB, OrderItem, OrderItemCreate, OrderItemUpdate
-
+from .product import Product, ProductCreate, ProductUpdate, ProductInDB, ProductBulkError, ProductBulkResult, ProductSearchResult, ProductSuggestion
+from .order import Order, OrderCreate, OrderUpdate, OrderInDB, OrderItem, OrderItemCreate, OrderItemUpdate, OrderBatchCreate, OrderBatchItemResult, OrderBatchResult, OrderCompact, OrderItemCompact, OrderIncluded, OrderCompactPage
+from .report import DailyRevenue, ProductSales, SectionRevenue
@@ -1,9 +1,10 @@
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Dict, Literal, Optional, List
 from datetime import datetime
 from decimal import Decimal
 from .product import Product # Import Product schema for response model
 from .client import Client # Import Client schema for response model
+from app.models.order_status import OrderStatus
 
 # Properties for items within an order
 class OrderItemBase(BaseModel):
@@ -31,15 +32,32 @@ class OrderItem(OrderItemInDBBase):
 # Shared properties for Order
 class OrderBase(BaseModel):
     client_id: int
-    status: Optional[str] = "pending"
+    status: Optional[OrderStatus] = OrderStatus.PENDING
 
 # Properties to receive via API on creation
 class OrderCreate(OrderBase):
     items: List[OrderItemCreate]
 
+# Many orders in one request (POST /orders/batch)
+class OrderBatchCreate(BaseModel):
+    orders: List[OrderCreate]
+    # partial: create every valid order and report the others;
+    # all_or_nothing: any failure rejects the whole batch
+    mode: Literal["partial", "all_or_nothing"] = "partial"
+
+class OrderBatchItemResult(BaseModel):
+    index: int # Position of the order in the request
+    order_id: Optional[int] = None # Set when the order was created
+    error: Optional[str] = None
+
+class OrderBatchResult(BaseModel):
+    created: int = 0
+    failed: int = 0
+    results: List[OrderBatchItemResult] = []
+
 # Properties to receive via API on update
 class OrderUpdate(BaseModel):
-    status: Optional[str] = None
+    status: Optional[OrderStatus] = None # Validated against models.ORDER_STATUS_TRANSITIONS
     # Updating items might be complex, potentially handled separately or disallowed
     # items: Optional[List[OrderItemUpdate]] = None
 
@@ -62,3 +80,26 @@ class OrderInDB(OrderInDBBase):
 class Order(OrderInDBBase):
     pass
 
+
+# GET /orders?compact=true: clients and products are returned once, in
+# "included", and the orders only reference them by id
+class OrderItemCompact(OrderItemBase):
+    id: int
+    order_id: int
+    unit_price: Decimal
+
+class OrderCompact(OrderBase):
+    id: int
+    total_value: Decimal
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+    items: List[OrderItemCompact]
+
+class OrderIncluded(BaseModel):
+    # Only the expanded ones (see ?expand=), keyed by id
+    clients: Dict[int, Client] = {}
+    products: Dict[int, Product] = {}
+
+class OrderCompactPage(BaseModel):
+    data: List[OrderCompact]
+    included: OrderIncluded
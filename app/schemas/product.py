@@ -46,3 +46,32 @@ class ProductInDB(ProductInDBBase):
 class Product(ProductInDBBase):
     pass
 
+
+# Bulk import report
+class ProductBulkError(BaseModel):
+    line: int # Line of the row in the uploaded file (the CSV header is line 1)
+    barcode: Optional[str] = None
+    errors: List[str]
+
+class ProductBulkResult(BaseModel):
+    created: int = 0
+    failed: int = 0
+    errors: List[ProductBulkError] = []
+
+# Catalog search
+class FacetCount(BaseModel):
+    value: Optional[str] = None # Section name or price band label ("0-50", ..., "500+")
+    count: int
+
+class ProductFacets(BaseModel):
+    sections: List[FacetCount]
+    price_bands: List[FacetCount]
+
+class ProductSearchResult(BaseModel):
+    total: int
+    items: List[Product]
+    facets: ProductFacets
+
+class ProductSuggestion(BaseModel):
+    term: str
+    count: int # Products containing the term
@@ -0,0 +1,35 @@
+from pydantic import BaseModel, field_validator
+from typing import Optional
+from datetime import date
+from decimal import Decimal
+
+# Rows of the sales reports (read from the aggregate tables)
+class DailyRevenue(BaseModel):
+    day: date
+    orders_count: int
+    units: int
+    revenue: Decimal
+
+    class Config:
+        from_attributes = True
+
+class ProductSales(BaseModel):
+    product_id: int
+    units: int
+    revenue: Decimal
+
+    class Config:
+        from_attributes = True
+
+class SectionRevenue(BaseModel):
+    section: Optional[str] = None # None for products without a section
+    units: int
+    revenue: Decimal
+
+    class Config:
+        from_attributes = True
+
+    @field_validator("section", mode="before")
+    @classmethod
+    def empty_section_is_none(cls, value):
+        return value or None
@@ -7,6 +7,7 @@ class Token(BaseModel):
 
 class TokenData(BaseModel):
     email: Optional[str] = None
+    token_version: int = 0
     # Add other relevant data you might store in the token, like user_id or roles
     # user_id: Optional[int] = None
     # roles: Optional[List[str]] = None
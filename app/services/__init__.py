@@ -1,6 +1,10 @@
 # Make services accessible via app.services.<service_name>
 from . import auth
 from . import client
+from . import section
 from . import product
 from . import order
+from . import report
+from . import idempotency
 
+from . import aio
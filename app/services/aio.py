@@ -0,0 +1,42 @@
+# Async versions of the service functions.
+# Every sync service function taking `db` as its first argument is exposed here
+# as a coroutine with the same name and signature, e.g.
+#   await services.aio.client.get_clients(db, skip=0, limit=10)
+# It runs through database.run_db, so it accepts either an AsyncSession (async
+# mode) or a plain Session (threadpool), and the business logic stays in one place.
+import functools
+import inspect
+from types import SimpleNamespace
+from app.database import run_db
+from app.services import auth as auth_service
+from app.services import client as client_service
+from app.services import idempotency as idempotency_service
+from app.services import order as order_service
+from app.services import product as product_service
+from app.services import report as report_service
+
+def asyncify(fn):
+    @functools.wraps(fn)
+    async def wrapper(db, *args, **kwargs):
+        return await run_db(db, fn, *args, **kwargs)
+    return wrapper
+
+def _async_module(module) -> SimpleNamespace:
+    functions = {}
+    for name, fn in vars(module).items():
+        if name.startswith("_") or not inspect.isfunction(fn) or fn.__module__ != module.__name__:
+            continue
+        # Already async, or generators that stream on the caller's side
+        if inspect.iscoroutinefunction(fn) or inspect.isasyncgenfunction(fn) or inspect.isgeneratorfunction(fn):
+            continue
+        params = list(inspect.signature(fn).parameters)
+        if params and params[0] == "db":
+            functions[name] = asyncify(fn)
+    return SimpleNamespace(**functions)
+
+auth = _async_module(auth_service)
+client = _async_module(client_service)
+product = _async_module(product_service)
+order = _async_module(order_service)
+report = _async_module(report_service)
+idempotency = _async_module(idempotency_service)
@@ -2,17 +2,20 @@ from sqlalchemy.orm import Session
 from fastapi import HTTPException, status
 from datetime import timedelta # Import timedelta
 from app import models, schemas
+from app.database import DBSession, run_db
 from app.core import security
 from app.core.config import settings
+from app.core.principal_cache import principal_cache
 
 def get_user_by_email(db: Session, email: str) -> models.User | None:
     return db.query(models.User).filter(models.User.email == email).first()
 
-def create_user(db: Session, user: schemas.UserCreate) -> models.User:
+def create_user(db: Session, user: schemas.UserCreate, hashed_password: str | None = None) -> models.User:
     db_user = get_user_by_email(db, email=user.email)
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
-    hashed_password = security.get_password_hash(user.password)
+    if hashed_password is None:
+        hashed_password = security.get_password_hash(user.password)
     # Create user instance (adjust if you have more fields in UserCreate/User model)
     db_user = models.User(
         email=user.email,
@@ -25,6 +28,45 @@ def create_user(db: Session, user: schemas.UserCreate) -> models.User:
     db.refresh(db_user)
     return db_user
 
+def get_user(db: Session, user_id: int) -> models.User | None:
+    return db.query(models.User).filter(models.User.id == user_id).first()
+
+def update_user(db: Session, user_id: int, user_update: schemas.UserUpdate, hashed_password: str | None = None) -> models.User | None:
+    db_user = get_user(db, user_id)
+    if not db_user:
+        return None
+
+    update_data = user_update.model_dump(exclude_unset=True)
+    previous_email = db_user.email
+
+    if "email" in update_data and update_data["email"] != db_user.email:
+        if get_user_by_email(db, update_data["email"]):
+            raise HTTPException(status_code=400, detail="Email already registered")
+
+    # Changes that reduce what a token may do revoke every token issued so far
+    revoke_tokens = (
+        ("is_active" in update_data and db_user.is_active and not update_data["is_active"])
+        or ("is_superuser" in update_data and db_user.is_superuser and not update_data["is_superuser"])
+        or ("email" in update_data and update_data["email"] != db_user.email)
+        or bool(update_data.get("password"))
+    )
+
+    password = update_data.pop("password", None)
+    if password:
+        db_user.hashed_password = hashed_password or security.get_password_hash(password)
+    for key, value in update_data.items():
+        setattr(db_user, key, value)
+    if revoke_tokens:
+        db_user.token_version = (db_user.token_version or 0) + 1
+
+    db.add(db_user)
+    db.commit()
+    db.refresh(db_user)
+    # Drop cached principals so the next request re-reads the user
+    principal_cache.invalidate(previous_email)
+    principal_cache.invalidate(db_user.email)
+    return db_user
+
 def authenticate_user(db: Session, email: str, password: str) -> models.User | None:
     user = get_user_by_email(db, email=email)
     if not user:
@@ -33,12 +75,39 @@ def authenticate_user(db: Session, email: str, password: str) -> models.User | N
         return None
     return user
 
+# Async variants used by the auth endpoints: bcrypt runs on the dedicated
+# hashing pool (security.password_hasher) and only the short DB work uses the
+# request threadpool (or the AsyncSession). The session is closed in the same
+# hop as the lookup so a request queued behind bcrypt never holds a pooled DB
+# connection (close() detaches loaded objects without expiring them; the session
+# stays usable).
+def _get_user_by_email_and_release(db: Session, email: str) -> models.User | None:
+    try:
+        return get_user_by_email(db, email=email)
+    finally:
+        db.close()
+
+async def create_user_async(db: DBSession, user: schemas.UserCreate) -> models.User:
+    # Cheap duplicate check first so we don't spend a bcrypt round on it
+    if await run_db(db, _get_user_by_email_and_release, user.email):
+        raise HTTPException(status_code=400, detail="Email already registered")
+    hashed_password = await security.get_password_hash_async(user.password)
+    return await run_db(db, create_user, user, hashed_password=hashed_password)
+
+async def authenticate_user_async(db: DBSession, email: str, password: str) -> models.User | None:
+    user = await run_db(db, _get_user_by_email_and_release, email)
+    if not user:
+        return None
+    if not await security.verify_password_async(password, user.hashed_password):
+        return None
+    return user
+
 def generate_tokens(user: models.User) -> schemas.Token:
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     refresh_token_expires = timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
 
     access_token = security.create_access_token(
-        data={"sub": user.email}, expires_delta=access_token_expires
+        data={"sub": user.email, "ver": user.token_version or 0}, expires_delta=access_token_expires
     )
     # Optionally add more data to refresh token if needed, but keep it minimal
     # refresh_token = security.create_refresh_token(
@@ -73,11 +142,13 @@ def refresh_access_token(refresh_token: str, db: Session) -> schemas.Token:
     user = get_user_by_email(db, email=email)
     if user is None or not user.is_active:
         raise credentials_exception
+    if (user.token_version or 0) != payload.get("ver", 0):
+        raise credentials_exception
 
     # Generate a new access token
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     new_access_token = security.create_access_token(
-        data={"sub": user.email}, expires_delta=access_token_expires
+        data={"sub": user.email, "ver": user.token_version or 0}, expires_delta=access_token_expires
     )
 
     return schemas.Token(
@@ -1,8 +1,16 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import case, func, or_, select, text
+from sqlalchemy.orm import Query, Session
 from fastapi import HTTPException, status
 from app import models, schemas
+from app.core import pagination
+from app.models.search import clients_fts
 from typing import List, Optional
 
+# The FTS5 trigram tokenizer only matches terms of at least 3 characters
+FTS_MIN_QUERY_LENGTH = 3
+# FTS5 rank function for client search: name hits weigh more than email ones
+FTS_RANK_FUNCTION = "bm25(2.0, 1.0)"
+
 def get_client(db: Session, client_id: int) -> models.Client | None:
     return db.query(models.Client).filter(models.Client.id == client_id).first()
 
@@ -17,14 +25,59 @@ def get_clients(
     skip: int = 0,
     limit: int = 100,
     name: Optional[str] = None,
-    email: Optional[str] = None
+    email: Optional[str] = None,
+    cursor: Optional[str] = None,
+    q: Optional[str] = None
 ) -> List[models.Client]:
     query = db.query(models.Client)
     if name:
         query = query.filter(models.Client.name.ilike(f"%{name}%")) # Case-insensitive search
     if email:
         query = query.filter(models.Client.email.ilike(f"%{email}%"))
-    return query.offset(skip).limit(limit).all()
+    if q and q.strip():
+        # Ranked search: ordered by relevance, so only skip/limit pagination applies
+        if cursor:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor pagination is not available with q; use skip/limit")
+        # Without other filters the index only has to rank up to the end of the page
+        top = None if (name or email) else skip + limit
+        return _search(db, query, q.strip(), top=top).offset(skip).limit(limit).all()
+    return pagination.paginate(query, models.Client.id, skip=skip, limit=limit, cursor=cursor).all()
+
+def _search(db: Session, query: Query, q: str, top: Optional[int] = None) -> Query:
+    """
+    Filter and rank clients whose name or email contains q (case-insensitive).
+
+    Uses the dialect's search index (see app.models.search): FTS5 MATCH ranked
+    by bm25 on SQLite, trigram-indexed ILIKE ranked by similarity() on
+    PostgreSQL. Elsewhere (and for queries too short for trigrams) it falls
+    back to a plain ILIKE scan with prefix matches first. `top`, when the
+    query has no other filters, lets FTS5 keep only the best matches.
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite" and len(q) >= FTS_MIN_QUERY_LENGTH:
+        phrase = '"' + q.replace('"', '""') + '"' # Match q literally as one phrase
+        # ORDER BY rank is answered inside FTS5, over every match: it keeps only the
+        # `top` best scores instead of handing all the matches to the outer query
+        ranked = (
+            select(clients_fts.c.rowid, clients_fts.c.rank.label("score"))
+            .where(text("clients_fts MATCH :search_phrase").bindparams(search_phrase=phrase))
+            .where(text("rank MATCH :rank_function").bindparams(rank_function=FTS_RANK_FUNCTION))
+            .order_by(clients_fts.c.rank)
+            .limit(top)
+            .subquery()
+        )
+        return query.join(ranked, ranked.c.rowid == models.Client.id).order_by(ranked.c.score, models.Client.id)
+
+    matches = or_(models.Client.name.icontains(q, autoescape=True), models.Client.email.icontains(q, autoescape=True))
+    query = query.filter(matches)
+    if dialect == "postgresql":
+        score = func.greatest(func.similarity(models.Client.name, q), func.similarity(models.Client.email, q))
+        return query.order_by(score.desc(), models.Client.id)
+    prefix_first = case(
+        (or_(models.Client.name.istartswith(q, autoescape=True), models.Client.email.istartswith(q, autoescape=True)), 0),
+        else_=1,
+    )
+    return query.order_by(prefix_first, models.Client.id)
 
 def create_client(db: Session, client: schemas.ClientCreate) -> models.Client:
     # Validate unique email
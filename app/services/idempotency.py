@@ -0,0 +1,132 @@
+import hashlib
+import json
+from dataclasses import dataclass
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from fastapi import HTTPException, status
+from app import models
+from app.core.config import settings
+from typing import Any, Optional
+from datetime import datetime, timedelta, timezone
+
+# Idempotency-Key for POST /orders. The first request with a key claims it
+# with INSERT ... ON CONFLICT DO NOTHING; the primary key lets exactly one
+# claim win, and that request runs. The order transaction itself records the
+# new order id on the key, so an order is created at most once per key, even
+# if a stale claim is taken over. Duplicates replay the stored response, or
+# wait while the first request is still running.
+
+@dataclass(frozen=True)
+class IdempotentRequest:
+    # Snapshot of a key claimed by an earlier request
+    order_id: Optional[int]
+    response_status: Optional[int]
+    response_body: Optional[str]
+
+    @property
+    def completed(self) -> bool:
+        return self.order_id is not None
+
+def _now() -> datetime:
+    # Naive UTC, comparable with the stored DateTime columns on every database
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+def fingerprint(payload: Any) -> str:
+    # Same key with a different body is a client bug, not a retry
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str).encode()).hexdigest()
+
+def _key_filter(user_id: int, key: str):
+    return (models.IdempotencyKey.user_id == user_id, models.IdempotencyKey.key == key)
+
+def _insert_claim(db: Session, values: dict) -> bool:
+    # Insert the key row and commit; False if another request holds the key
+    dialect = db.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        dialect_insert = sqlite.insert if dialect == "sqlite" else postgresql.insert
+        statement = dialect_insert(models.IdempotencyKey).values(**values).on_conflict_do_nothing(index_elements=["user_id", "key"])
+        inserted = db.execute(statement).rowcount == 1
+        db.commit()
+        return inserted
+    try:
+        db.execute(insert(models.IdempotencyKey).values(**values))
+        db.commit()
+        return True
+    except IntegrityError:
+        db.rollback()
+        return False
+
+def claim(db: Session, user_id: int, key: str, request_hash: str) -> Optional[IdempotentRequest]:
+    """
+    Claim the key for this request and commit.
+
+    Returns None when the caller owns the key and should run the request, or
+    the earlier request's state (completed: replay it; otherwise it is still
+    running). Expired keys are reused; a claim older than
+    IDEMPOTENCY_LOCK_SECONDS without an order is taken over.
+    """
+    for _ in range(3):
+        now = _now()
+        # A Core INSERT, not db.add: the row loaded by a previous attempt stays in
+        # the session's identity map, and must not clash with a new instance
+        if _insert_claim(db, dict(
+            user_id=user_id, key=key, request_hash=request_hash, locked_at=now,
+            expires_at=now + timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL_SECONDS),
+        )):
+            return None
+
+        record = db.execute(select(models.IdempotencyKey).where(*_key_filter(user_id, key))).scalar_one_or_none()
+        if record is None:
+            continue # Purged in between
+        if record.expires_at <= now:
+            db.execute(delete(models.IdempotencyKey).where(*_key_filter(user_id, key), models.IdempotencyKey.expires_at <= now))
+            db.commit()
+            continue
+        if record.request_hash != request_hash:
+            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_CONTENT, detail="Idempotency-Key was already used with a different request")
+        state = IdempotentRequest(record.order_id, record.response_status, record.response_body)
+        if not state.completed and record.locked_at <= now - timedelta(seconds=settings.IDEMPOTENCY_LOCK_SECONDS):
+            # The request holding the claim never finished: take it over
+            taken = db.execute(
+                update(models.IdempotencyKey)
+                .where(*_key_filter(user_id, key), models.IdempotencyKey.locked_at == record.locked_at, models.IdempotencyKey.order_id.is_(None))
+                .values(locked_at=now)
+            )
+            db.commit()
+            if taken.rowcount == 1:
+                return None
+            continue
+        db.commit() # End the read transaction, so the next poll sees fresh data
+        return state
+    raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Idempotency-Key is being claimed concurrently; retry")
+
+def record_order(db: Session, user_id: int, key: str, order_id: int) -> None:
+    """Attach the new order to the key, in the order's transaction (the caller commits)."""
+    updated = db.execute(
+        update(models.IdempotencyKey)
+        .where(*_key_filter(user_id, key), models.IdempotencyKey.order_id.is_(None))
+        .values(order_id=order_id)
+    )
+    if updated.rowcount != 1:
+        # Another request with this key created its order first (claim taken over)
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Idempotency-Key was already used to create an order")
+
+def store_response(db: Session, user_id: int, key: str, response_status: int, response_body: str) -> None:
+    db.execute(
+        update(models.IdempotencyKey)
+        .where(*_key_filter(user_id, key))
+        .values(response_status=response_status, response_body=response_body)
+    )
+    db.commit()
+
+def release(db: Session, user_id: int, key: str) -> None:
+    # The request failed without creating an order: a retry may run it again
+    db.rollback()
+    db.execute(delete(models.IdempotencyKey).where(*_key_filter(user_id, key), models.IdempotencyKey.order_id.is_(None)))
+    db.commit()
+
+def purge_expired(db: Session) -> int:
+    deleted = db.execute(delete(models.IdempotencyKey).where(models.IdempotencyKey.expires_at <= _now()))
+    db.commit()
+    return deleted.rowcount
@@ -1,34 +1,75 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import Select, case, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
 from fastapi import HTTPException, status
 from app import models, schemas
+from app.core import fast_json, metrics, pagination
+from app.core.config import settings
+from app.core.response_cache import catalog_tags, response_cache
 from app.services import client as client_service
+from app.services import idempotency as idempotency_service
 from app.services import product as product_service
-from typing import List, Optional
+from app.services import report as report_service
+from app.services import section as section_service
+from dataclasses import dataclass
+from typing import AsyncIterator, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
 from datetime import datetime
 from decimal import Decimal
 
+# Loader strategy for every path that returns orders to the API.
+# schemas.Order embeds the client and each item's product, so without this the
+# response serialization lazy-loads them row by row (N+1). selectinload keeps
+# the query count fixed (orders, clients, items, products) regardless of page
+# size and plays well with LIMIT/DISTINCT, unlike joinedload on collections.
+ORDER_LOAD_OPTIONS = (
+    selectinload(models.Order.client),
+    selectinload(models.Order.items).selectinload(models.OrderItem.product),
+)
+
+def _reload_order(db: Session, order_id: int) -> models.Order | None:
+    # Re-read an order after a commit with its whole response graph loaded
+    return (
+        db.query(models.Order)
+        .options(*ORDER_LOAD_OPTIONS)
+        .populate_existing()
+        .filter(models.Order.id == order_id)
+        .first()
+    )
+
+def parse_status_filter(status_filter: Optional[str]) -> List[models.OrderStatus]:
+    # "pending,processing" -> [PENDING, PROCESSING]; exact values only, so the status index applies
+    statuses = []
+    for value in (status_filter or "").split(","):
+        value = value.strip().lower()
+        if not value:
+            continue
+        try:
+            statuses.append(models.OrderStatus(value))
+        except ValueError:
+            allowed = ", ".join(member.value for member in models.OrderStatus)
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid status '{value}'. Allowed: {allowed}")
+    return statuses
+
 def get_order(db: Session, order_id: int) -> models.Order | None:
-    return db.query(models.Order).filter(models.Order.id == order_id).first()
+    return db.query(models.Order).options(*ORDER_LOAD_OPTIONS).filter(models.Order.id == order_id).first()
 
-def get_orders(
+def _filter_orders(
     db: Session,
-    skip: int = 0,
-    limit: int = 100,
+    query,
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
     product_section: Optional[str] = None,
     order_id: Optional[int] = None,
     status: Optional[str] = None,
     client_id: Optional[int] = None
-) -> List[models.Order]:
-    query = db.query(models.Order)
-
+):
     if order_id is not None:
         query = query.filter(models.Order.id == order_id)
     if client_id is not None:
         query = query.filter(models.Order.client_id == client_id)
-    if status:
-        query = query.filter(models.Order.status.ilike(f"%{status}%"))
+    statuses = parse_status_filter(status)
+    if statuses:
+        query = query.filter(models.Order.status.in_(statuses))
     if start_date:
         query = query.filter(models.Order.created_at >= start_date)
     if end_date:
@@ -36,87 +77,446 @@ def get_orders(
         # query = query.filter(models.Order.created_at < (end_date + timedelta(days=1)))
         query = query.filter(models.Order.created_at <= end_date)
     if product_section:
-        # This requires joining OrderItem and Product tables
-        query = query.join(models.OrderItem).join(models.Product)
-        query = query.filter(models.Product.section.ilike(f"%{product_section}%"))
-        # Ensure distinct orders if multiple items match the section
-        query = query.distinct()
+        # Partial match on the sections lookup table first, then a semi-join per
+        # order (or the section bitmap): no JOIN + DISTINCT over the items
+        section_ids = section_service.matching_section_ids(db, product_section)
+        query = query.filter(section_service.order_has_sections(section_ids))
+    return query
+
+def get_orders(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    **filters
+) -> List[models.Order]:
+    query = _filter_orders(db, db.query(models.Order).options(*ORDER_LOAD_OPTIONS), **filters)
+    return pagination.paginate(query, models.Order.id, skip=skip, limit=limit, cursor=cursor).all()
+
+# Columns behind each schemas.Order field (see core/fast_json.py), for
+# get_order_dicts: plain row tuples, no ORM objects or identity map.
+ORDER_COLUMNS = fast_json.field_columns(schemas.Order, models.Order)
+CLIENT_COLUMNS = fast_json.field_columns(schemas.Client, models.Client)
+ORDER_ITEM_COLUMNS = fast_json.field_columns(schemas.OrderItem, models.OrderItem)
+PRODUCT_COLUMNS = fast_json.field_columns(schemas.Product, models.Product, section=models.Section.name)
+ITEMS_IN_CHUNK = 500 # Ids per IN query (bound parameter limits)
+
+ORDER_EXPANSIONS = ("client", "items.product")
+
+@dataclass(frozen=True)
+class OrderProjection:
+    """The parts of schemas.Order a list response carries (?fields=, ?expand=, compact)."""
+    order_fields: Tuple[str, ...]
+    client_fields: Optional[Tuple[str, ...]] = None # None: client not expanded
+    item_fields: Optional[Tuple[str, ...]] = None # None: no items
+    product_fields: Optional[Tuple[str, ...]] = None # None: item products not expanded
+    compact: bool = False # Expanded clients and products side-loaded once, in "included"
+
+FULL_ORDER_PROJECTION = OrderProjection(tuple(ORDER_COLUMNS), tuple(CLIENT_COLUMNS), tuple(ORDER_ITEM_COLUMNS), tuple(PRODUCT_COLUMNS))
+
+def _split_list(value: str) -> List[str]:
+    return [part.strip() for part in value.split(",") if part.strip()]
+
+def parse_order_projection(fields: Optional[str] = None, expand: Optional[str] = None, compact: bool = False) -> OrderProjection:
+    """
+    fields: order fields plus dotted nested ones ("id,status,client.name,items.quantity,items.product.description");
+    naming "client", "items" or "items.product" alone keeps all of its fields. None keeps everything; "id" is always kept.
+    With fields, a nested part is only returned when named there or listed in expand.
+    expand: "client" and/or "items.product"; None expands both, "" neither (only client_id / product_id references).
+    """
+    expansions = set(ORDER_EXPANSIONS) if expand is None else set(_split_list(expand))
+    unknown = sorted(expansions - set(ORDER_EXPANSIONS))
+    if unknown:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid expand '{unknown[0]}'. Allowed: {', '.join(ORDER_EXPANSIONS)}")
 
-    return query.offset(skip).limit(limit).all()
+    requested = _split_list(fields) if fields is not None else []
+    if not requested:
+        fields = None # "?fields=" alone: everything
+    # Requested names per part ("" for the order itself); parts named alone keep all their fields
+    parts = {"": ORDER_COLUMNS, "client.": CLIENT_COLUMNS, "items.": ORDER_ITEM_COLUMNS, "items.product.": PRODUCT_COLUMNS}
+    named = {prefix: set() for prefix in parts}
+    whole = set()
+    for name in requested:
+        if name in ("client", "items", "items.product"):
+            whole.add(name)
+            continue
+        prefix = next((prefix for prefix in ("items.product.", "items.", "client.") if name.startswith(prefix)), "")
+        if name[len(prefix):] not in parts[prefix]:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid field '{name}'. Allowed: {', '.join(parts[prefix])}")
+        named[prefix].add(name[len(prefix):])
 
-def create_order(db: Session, order_in: schemas.OrderCreate) -> models.Order:
+    def pick(prefix: str, extra: Iterable[str] = ()) -> Tuple[str, ...]:
+        # In schema order (the response keeps the schema's key order)
+        if fields is None or prefix[:-1] in whole or not named[prefix]:
+            return tuple(parts[prefix])
+        keep = named[prefix] | set(extra)
+        return tuple(name for name in parts[prefix] if name in keep)
+
+    def wanted(expansion: str) -> bool:
+        if expansion in whole or named[expansion + "."]:
+            if expansion not in expansions:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Fields of '{expansion}' need expand={expansion}")
+            return True
+        return expansion in expansions and (fields is None or expand is not None)
+
+    with_client = wanted("client")
+    with_products = wanted("items.product")
+    with_items = fields is None or with_products or "items" in whole or bool(named["items."])
+
+    order_extra = {"id"} | ({"client_id"} if compact and with_client else set()) # compact mode references by id
+    if fields is None:
+        order_fields = tuple(ORDER_COLUMNS)
+    else:
+        order_fields = tuple(name for name in ORDER_COLUMNS if name in named[""] | order_extra)
+    return OrderProjection(
+        order_fields=order_fields,
+        client_fields=pick("client.") if with_client else None,
+        item_fields=pick("items.", {"product_id"} if compact and with_products else ()) if with_items else None,
+        product_fields=pick("items.product.") if with_products else None,
+        compact=compact,
+    )
+
+def get_order_dicts(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    projection: OrderProjection = FULL_ORDER_PROJECTION,
+    **filters
+) -> List[dict]:
+    """Same page as get_orders, as dicts shaped like schemas.Order (ready for fast_json.encode), cut down to projection."""
+    return get_order_page(db, skip=skip, limit=limit, cursor=cursor, projection=projection, **filters)[0]
+
+def get_order_page(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    projection: OrderProjection = FULL_ORDER_PROJECTION,
+    **filters
+) -> Tuple[List[dict], Dict[str, Dict[int, dict]]]:
+    """get_order_dicts plus, in compact mode, {"clients": {id: client}, "products": {id: product}} for the page."""
+    # Only the projected columns are selected: orders joined with their client
+    # (client_id is never null), then items joined with their product. Compact
+    # mode reads the same rows but keeps each client and product once, apart.
+    client_fields, product_fields = projection.client_fields, projection.product_fields
+    clients: Dict[int, dict] = {} # Compact mode: {id: client}, filled from the joined rows
+    products: Dict[int, dict] = {}
+    included: Dict[str, Dict[int, dict]] = {}
+    if projection.compact and client_fields is not None:
+        included["clients"] = clients
+    if projection.compact and product_fields is not None:
+        included["products"] = products
+
+    order_fields = list(projection.order_fields)
+    columns = [ORDER_COLUMNS[name] for name in order_fields]
+    if client_fields is not None:
+        columns += [CLIENT_COLUMNS[name] for name in client_fields]
+    query = db.query(*columns)
+    if client_fields is not None:
+        query = query.join(models.Client, models.Order.client_id == models.Client.id)
+    else:
+        query = query.select_from(models.Order)
+    query = _filter_orders(db, query, **filters)
+    rows = pagination.paginate(query, models.Order.id, skip=skip, limit=limit, cursor=cursor).all()
+
+    split = len(order_fields)
+    orders, by_id = [], {}
+    for row in rows:
+        order = dict(zip(order_fields, row[:split]))
+        if client_fields is not None:
+            if not projection.compact:
+                order["client"] = dict(zip(client_fields, row[split:]))
+            elif order["client_id"] not in clients:
+                clients[order["client_id"]] = dict(zip(client_fields, row[split:]))
+        if projection.item_fields is not None:
+            order["items"] = []
+        orders.append(order)
+        by_id[order["id"]] = order
+    if projection.item_fields is None or not orders:
+        return orders, included
+
+    item_fields = list(projection.item_fields)
+    columns = [models.OrderItem.order_id, *(ORDER_ITEM_COLUMNS[name] for name in item_fields)]
+    if product_fields is not None:
+        columns += [PRODUCT_COLUMNS[name] for name in product_fields]
+    items_query = select(*columns).select_from(models.OrderItem).order_by(models.OrderItem.id) # Same order as Order.items
+    if product_fields is not None:
+        items_query = items_query.join(models.Product, models.OrderItem.product_id == models.Product.id)
+        if "section" in product_fields: # The section name lives in the sections table
+            items_query = items_query.outerjoin(models.Section, models.Product.section_id == models.Section.id)
+    split = 1 + len(item_fields)
+    order_ids = list(by_id)
+    for start in range(0, len(order_ids), ITEMS_IN_CHUNK):
+        chunk = order_ids[start:start + ITEMS_IN_CHUNK]
+        for row in db.execute(items_query.where(models.OrderItem.order_id.in_(chunk))):
+            item = dict(zip(item_fields, row[1:split]))
+            if product_fields is not None:
+                if not projection.compact:
+                    item["product"] = dict(zip(product_fields, row[split:]))
+                elif item["product_id"] not in products:
+                    products[item["product_id"]] = dict(zip(product_fields, row[split:]))
+            by_id[row[0]]["items"].append(item)
+    return orders, included
+
+# Flattened export: one row per order item (orders without items get one row
+# with empty item columns), ordered by order then item.
+ORDER_EXPORT_COLUMNS = (
+    "order_id", "order_status", "order_created_at", "order_total_value",
+    "client_id", "client_name", "client_email", "client_cpf",
+    "item_id", "product_id", "product_description", "product_barcode", "quantity", "unit_price",
+)
+
+def get_order_export_statement(
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    status: Optional[str] = None,
+    client_id: Optional[int] = None
+) -> Select:
+    statement = (
+        select(
+            models.Order.id, models.Order.status, models.Order.created_at, models.Order.total_value,
+            models.Client.id, models.Client.name, models.Client.email, models.Client.cpf,
+            models.OrderItem.id, models.Product.id, models.Product.description, models.Product.barcode,
+            models.OrderItem.quantity, models.OrderItem.unit_price,
+        )
+        .join(models.Client, models.Order.client_id == models.Client.id)
+        .outerjoin(models.OrderItem, models.OrderItem.order_id == models.Order.id)
+        .outerjoin(models.Product, models.OrderItem.product_id == models.Product.id)
+        .order_by(models.Order.id, models.OrderItem.id)
+    )
+    # Same filter semantics as get_orders
+    if client_id is not None:
+        statement = statement.where(models.Order.client_id == client_id)
+    statuses = parse_status_filter(status)
+    if statuses:
+        statement = statement.where(models.Order.status.in_(statuses))
+    if start_date:
+        statement = statement.where(models.Order.created_at >= start_date)
+    if end_date:
+        statement = statement.where(models.Order.created_at <= end_date)
+    return statement
+
+def iter_order_export(db: Session, batch_size: int = 1000, **filters) -> Iterator[Sequence]:
+    """Yield export rows in partitions of batch_size from a server-side cursor."""
+    statement = get_order_export_statement(**filters).execution_options(stream_results=True, yield_per=batch_size)
+    result = db.execute(statement)
+    try:
+        yield from result.partitions()
+    finally:
+        result.close()
+
+async def aiter_order_export(db: AsyncSession, batch_size: int = 1000, **filters) -> AsyncIterator[Sequence]:
+    """Async counterpart of iter_order_export for AsyncSession."""
+    result = await db.stream(get_order_export_statement(**filters).execution_options(yield_per=batch_size))
+    try:
+        async for partition in result.partitions():
+            yield partition
+    finally:
+        await result.close()
+
+def _order_quantities(order_in: schemas.OrderCreate) -> Dict[int, int]:
+    # product_id -> total quantity; repeated products are summed
+    quantities = {}
+    for item_in in order_in.items:
+        quantities[item_in.product_id] = quantities.get(item_in.product_id, 0) + item_in.quantity
+    return quantities
+
+def create_order(db: Session, order_in: schemas.OrderCreate, idempotency_key: Optional[Tuple[int, str]] = None) -> models.Order:
+    # idempotency_key: (user_id, key) claimed by the caller; recorded with the order
     # 1. Validate Client exists
     db_client = client_service.get_client(db, order_in.client_id)
     if not db_client:
+        metrics.orders_created.inc("missing_client")
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Client with id {order_in.client_id} not found")
 
+    # 2. Reserve stock for every product at once (one locked IN query, one
+    # conditional UPDATE per product). Quantities of repeated products are summed.
+    quantities = _order_quantities(order_in)
+    try:
+        products = product_service.reserve_stock(db, quantities)
+    except HTTPException as e:
+        # 404: unknown product, 400: not enough stock
+        metrics.orders_created.inc("missing_product" if e.status_code == status.HTTP_404_NOT_FOUND else "insufficient_stock")
+        raise
+    # The session already holds the decremented stock. Selling out moves a product
+    # between the disponibilidade lists; other stock changes only touch its own entries.
+    sold_out = any(products[product_id].current_stock <= 0 for product_id in quantities)
+
     total_order_value = Decimal("0.00")
     order_items_to_create = []
-    product_stock_updates = [] # Keep track of stock changes
-
-    # 2. Validate Products and Stock for each item
     for item_in in order_in.items:
-        db_product = product_service.get_product(db, item_in.product_id)
-        if not db_product:
-            db.rollback() # Rollback if any product is invalid
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Product with id {item_in.product_id} not found")
-
-        if db_product.current_stock < item_in.quantity:
-            db.rollback()
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Insufficient stock for product id {item_in.product_id}. Available: {db_product.current_stock}, Requested: {item_in.quantity}")
-
+        db_product = products[item_in.product_id]
         # Calculate item total and add to order total
-        item_total = db_product.sale_value * item_in.quantity
-        total_order_value += item_total
-
-        # Prepare OrderItem data
-        order_item_data = {
+        total_order_value += db_product.sale_value * item_in.quantity
+        order_items_to_create.append({
             "product_id": item_in.product_id,
             "quantity": item_in.quantity,
             "unit_price": db_product.sale_value # Store price at time of order
-        }
-        order_items_to_create.append(order_item_data)
-
-        # Track stock update needed for this product
-        product_stock_updates.append({"product_id": item_in.product_id, "change": -item_in.quantity})
+        })
 
-    # 3. Create Order and OrderItems within a transaction
+    # 3. Create Order and OrderItems in the same transaction as the reservation
     try:
         db_order = models.Order(
             client_id=order_in.client_id,
-            status=order_in.status or "pending",
-            total_value=total_order_value
+            status=order_in.status or models.OrderStatus.PENDING,
+            total_value=total_order_value,
+            section_bits=section_service.section_bits(product.section_id for product in products.values()),
         )
         db.add(db_order)
         db.flush() # Flush to get the db_order.id for OrderItems
 
-        for item_data in order_items_to_create:
-            db_order_item = models.OrderItem(**item_data, order_id=db_order.id)
-            db.add(db_order_item)
-
-        # 4. Update Product Stock
-        for stock_update in product_stock_updates:
-            # Use the adjust_stock function (or similar logic)
-            # Ensure product is fetched again within the session if needed, or pass db_product
-            product_to_update = product_service.get_product(db, stock_update["product_id"])
-            if product_to_update: # Should always exist based on earlier check
-                product_to_update.current_stock += stock_update["change"]
-                db.add(product_to_update)
-            else:
-                 # This case should ideally not happen due to prior checks
-                 raise Exception(f"Product {stock_update['product_id']} not found during stock update.")
+        db.add_all(models.OrderItem(**item_data, order_id=db_order.id) for item_data in order_items_to_create)
+        db.flush()
+        if report_service.counts_in_reports(db_order.status):
+            report_service.apply_order(db, db_order) # Aggregates commit with the order
+        if idempotency_key is not None:
+            idempotency_service.record_order(db, *idempotency_key, db_order.id)
 
         db.commit()
-        db.refresh(db_order)
-        # Eager load relationships if needed for the response schema
-        # db.refresh(db_order, relationship_names=["items", "client"]) # Check attribute names
-        return db_order
+        metrics.orders_created.inc("success")
+        response_cache.invalidate(catalog_tags(*quantities, membership=sold_out))
+        # Reload with the response graph instead of a bare refresh (avoids lazy loads)
+        return _reload_order(db, db_order.id)
 
+    except HTTPException:
+        db.rollback()
+        metrics.orders_created.inc("error")
+        raise
     except Exception as e:
         db.rollback()
+        metrics.orders_created.inc("error")
         # Log the exception e
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Failed to create order: {str(e)}")
 
+BATCH_ABORTED = "Not created: another order in the batch failed"
+
+def create_orders_batch(db: Session, batch: schemas.OrderBatchCreate) -> schemas.OrderBatchResult:
+    """
+    Create many orders with a fixed number of statements, whatever the batch size.
+
+    Clients and products are validated with one IN query each (products locked in
+    id order, as in create_order). Each order is checked in request order against
+    the stock left by the orders before it. The stock of every product is then
+    decremented by one conditional UPDATE, and orders and items are written with
+    one multi-row INSERT each, all in a single transaction.
+
+    mode "partial" creates the valid orders and reports the others; mode
+    "all_or_nothing" creates nothing when any order fails.
+    """
+    if len(batch.orders) > settings.ORDER_BATCH_MAX_SIZE:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"A batch accepts at most {settings.ORDER_BATCH_MAX_SIZE} orders")
+    result = schemas.OrderBatchResult(results=[schemas.OrderBatchItemResult(index=index) for index in range(len(batch.orders))])
+    if not batch.orders:
+        return result
+
+    # 1. Validate every client and product with one query each
+    client_ids = {order_in.client_id for order_in in batch.orders}
+    known_clients = set(db.scalars(select(models.Client.id).where(models.Client.id.in_(client_ids))))
+    order_quantities = [_order_quantities(order_in) for order_in in batch.orders]
+    products = product_service.lock_products(db, (product_id for quantities in order_quantities for product_id in quantities))
+
+    # 2. Check each order against the stock left by the orders accepted before it
+    remaining = {product_id: product.current_stock for product_id, product in products.items()}
+    accepted = []
+    outcomes = [] # orders_created_total outcome of each failed order
+    for index, (order_in, quantities) in enumerate(zip(batch.orders, order_quantities)):
+        error = None
+        if order_in.client_id not in known_clients:
+            error = "missing_client", f"Client with id {order_in.client_id} not found"
+        for product_id, quantity in quantities.items():
+            if error:
+                break
+            if product_id not in products:
+                error = "missing_product", f"Product with id {product_id} not found"
+            elif quantity <= 0:
+                error = "invalid", f"Quantity must be positive for product id {product_id}"
+            elif remaining[product_id] < quantity:
+                error = "insufficient_stock", f"Insufficient stock for product id {product_id}. Available: {remaining[product_id]}, Requested: {quantity}"
+        if error:
+            outcome, result.results[index].error = error
+            outcomes.append(outcome)
+            continue
+        for product_id, quantity in quantities.items():
+            remaining[product_id] -= quantity
+        accepted.append(index)
+
+    failed = len(batch.orders) - len(accepted)
+    if failed and batch.mode == "all_or_nothing":
+        for index in accepted:
+            result.results[index].error = BATCH_ABORTED
+        outcomes += ["aborted"] * len(accepted)
+        accepted = []
+    for outcome in outcomes:
+        metrics.orders_created.inc(outcome)
+    if not accepted:
+        db.rollback() # Release the product locks
+        result.failed = len(batch.orders)
+        return result
+
+    try:
+        # 3. Decrement the stock of every product in one conditional UPDATE. The
+        # rows are already locked (lock_products, FOR UPDATE) since step 1, so
+        # the current_stock >= qty guard re-checks the stock validated there
+        # against the locked rows: if any product falls short, nothing is written.
+        totals = {}
+        for index in accepted:
+            for product_id, quantity in order_quantities[index].items():
+                totals[product_id] = totals.get(product_id, 0) + quantity
+        requested = case(totals, value=models.Product.id)
+        reserved = db.execute(
+            update(models.Product)
+            .where(models.Product.id.in_(totals), models.Product.current_stock >= requested)
+            .values(current_stock=models.Product.current_stock - requested)
+            .execution_options(synchronize_session=False)
+        )
+        if reserved.rowcount != len(totals):
+            # Safety net: the locked rows can't change under us, so a short product
+            # here means the lock didn't hold (e.g. a database ignoring FOR UPDATE)
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Stock changed while the batch was processed; retry")
+
+        # 4. Orders, then items, with one multi-row INSERT each (ids come back in row order)
+        order_rows = []
+        for index in accepted:
+            order_in, quantities = batch.orders[index], order_quantities[index]
+            order_rows.append({
+                "client_id": order_in.client_id,
+                "status": order_in.status or models.OrderStatus.PENDING,
+                "total_value": sum((products[item_in.product_id].sale_value * item_in.quantity for item_in in order_in.items), Decimal("0.00")),
+                "section_bits": section_service.section_bits(products[product_id].section_id for product_id in quantities),
+            })
+        order_ids = db.scalars(insert(models.Order).returning(models.Order.id, sort_by_parameter_order=True), order_rows).all()
+        item_rows = [
+            {"order_id": order_id, "product_id": item_in.product_id, "quantity": item_in.quantity, "unit_price": products[item_in.product_id].sale_value}
+            for order_id, index in zip(order_ids, accepted)
+            for item_in in batch.orders[index].items
+        ]
+        if item_rows:
+            db.execute(insert(models.OrderItem), item_rows)
+        report_service.apply_orders(db, [
+            order_id for order_id, row in zip(order_ids, order_rows) if report_service.counts_in_reports(row["status"])
+        ])
+        db.commit()
+
+    except HTTPException:
+        db.rollback()
+        metrics.orders_created.inc("error", amount=len(accepted))
+        raise
+    except Exception as e:
+        db.rollback()
+        metrics.orders_created.inc("error", amount=len(accepted))
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Failed to create orders: {str(e)}")
+
+    metrics.orders_created.inc("success", amount=len(accepted))
+
+    sold_out = any(remaining[product_id] <= 0 for product_id in totals)
+    response_cache.invalidate(catalog_tags(*totals, membership=sold_out))
+    for order_id, index in zip(order_ids, accepted):
+        result.results[index].order_id = order_id
+    result.created = len(accepted)
+    result.failed = len(batch.orders) - len(accepted)
+    return result
+
 def update_order(db: Session, order_id: int, order_update: schemas.OrderUpdate) -> models.Order | None:
     db_order = get_order(db, order_id)
     if not db_order:
@@ -125,17 +525,25 @@ def update_order(db: Session, order_id: int, order_update: schemas.OrderUpdate)
     update_data = order_update.model_dump(exclude_unset=True)
 
     # Primarily handle status updates
-    if "status" in update_data:
-        # Add validation for allowed status transitions if needed
-        db_order.status = update_data["status"]
+    if "status" in update_data and update_data["status"] is not None:
+        new_status = update_data["status"]
+        if new_status != db_order.status and new_status not in models.ORDER_STATUS_TRANSITIONS[db_order.status]:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Cannot change order status from '{db_order.status}' to '{new_status}'",
+            )
+        was_counted = report_service.counts_in_reports(db_order.status)
+        db_order.status = new_status
+        is_counted = report_service.counts_in_reports(db_order.status)
+        if was_counted != is_counted: # e.g. cancelled / reopened
+            report_service.apply_order(db, db_order, sign=1 if is_counted else -1)
 
     # Updating items or client_id is generally complex and might be disallowed
     # If allowed, ensure stock adjustments and total value recalculations are handled
 
     db.add(db_order)
     db.commit()
-    db.refresh(db_order)
-    return db_order
+    return _reload_order(db, db_order.id)
 
 def delete_order(db: Session, order_id: int) -> int | None:
     db_order = get_order(db, order_id)
@@ -153,6 +561,8 @@ def delete_order(db: Session, order_id: int) -> int | None:
     #         product_service.adjust_stock(db, item.product_id, item.quantity)
 
     deleted_order_id = db_order.id # Store ID before deleting
+    if report_service.counts_in_reports(db_order.status):
+        report_service.apply_order(db, db_order, sign=-1)
     db.delete(db_order)
     db.commit()
     # No need to refresh a deleted object
@@ -1,9 +1,49 @@
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from fastapi import HTTPException, status
+from pydantic import ValidationError
 from app import models, schemas
-from typing import List, Optional
+from app import database
+from app.core import pagination
+from app.core.bulk_import import ParsedRow
+from app.core.catalog_index import IndexedProduct, catalog_index
+from app.core.config import settings
+from app.core.response_cache import catalog_tags, response_cache
+from app.services import report as report_service
+from app.services import section as section_service
+from typing import Dict, Iterable, List, Optional, Tuple
 from decimal import Decimal
 
+def _indexed(product) -> IndexedProduct:
+    return IndexedProduct(
+        id=product.id, description=product.description, section=product.section,
+        barcode=product.barcode, sale_value=product.sale_value,
+    )
+
+def _iter_catalog(db: Session) -> Iterable[IndexedProduct]:
+    # Column-only scan of the whole catalog for (re)building the search index
+    columns = (models.Product.id, models.Product.description, models.Section.name.label("section"), models.Product.barcode, models.Product.sale_value)
+    statement = select(*columns).outerjoin(models.Section, models.Product.section_id == models.Section.id)
+    for row in db.execute(statement.execution_options(yield_per=10_000)):
+        yield _indexed(row)
+
+def _load_catalog() -> Iterable[IndexedProduct]:
+    # Runs on the index's build thread, with its own session on the primary
+    with database.SessionLocal() as db:
+        yield from _iter_catalog(db)
+
+def _ensure_catalog_index() -> None:
+    catalog_index.ensure_built(_load_catalog)
+    if not catalog_index.wait(settings.CATALOG_INDEX_BUILD_TIMEOUT_SECONDS):
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="The catalog search index is being built; retry shortly")
+
+async def wait_for_catalog_index() -> None:
+    """Start the catalog index build if needed and wait for it without blocking the event loop."""
+    catalog_index.ensure_built(_load_catalog)
+    if not await catalog_index.wait_async(settings.CATALOG_INDEX_BUILD_TIMEOUT_SECONDS):
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="The catalog search index is being built; retry shortly")
+
 def get_product(db: Session, product_id: int) -> models.Product | None:
     return db.query(models.Product).filter(models.Product.id == product_id).first()
 
@@ -19,11 +59,12 @@ def get_products(
     category: Optional[str] = None, # Assuming 'section' is the category
     min_price: Optional[Decimal] = None,
     max_price: Optional[Decimal] = None,
-    available: Optional[bool] = None
+    available: Optional[bool] = None,
+    cursor: Optional[str] = None
 ) -> List[models.Product]:
     query = db.query(models.Product)
     if category:
-        query = query.filter(models.Product.section.ilike(f"%{category}%"))
+        query = query.filter(models.Product.section_id.in_(section_service.matching_section_ids(db, category)))
     if min_price is not None:
         query = query.filter(models.Product.sale_value >= min_price)
     if max_price is not None:
@@ -34,7 +75,42 @@ def get_products(
         else:
             query = query.filter(models.Product.current_stock <= 0)
 
-    return query.offset(skip).limit(limit).all()
+    return pagination.paginate(query, models.Product.id, skip=skip, limit=limit, cursor=cursor).all()
+
+def search_products(
+    db: Session,
+    q: str,
+    section: Optional[str] = None,
+    price_band: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 20
+) -> dict:
+    """
+    Ranked catalog search over description, section and barcode, with facet counts.
+
+    Matching and ranking come from the in-process catalog index; only the
+    returned page is read from the database (one IN query), so stock and
+    prices in the response are always current.
+    """
+    _ensure_catalog_index()
+    result = catalog_index.search(q, section=section, band=price_band, skip=skip, limit=limit)
+    products = {}
+    if result.ids:
+        products = {p.id: p for p in db.query(models.Product).filter(models.Product.id.in_(result.ids))}
+    return {
+        "total": result.total,
+        # Products another worker deleted since the last refresh simply drop out
+        "items": [products[product_id] for product_id in result.ids if product_id in products],
+        "facets": {
+            "sections": [{"value": value, "count": count} for value, count in result.sections],
+            "price_bands": [{"value": value, "count": count} for value, count in result.price_bands],
+        },
+    }
+
+def autocomplete_products(db: Session, q: str, limit: int = 10) -> List[dict]:
+    """Catalog terms completing the last word of q, most frequent first."""
+    _ensure_catalog_index()
+    return [{"term": term, "count": count} for term, count in catalog_index.autocomplete(q, limit)]
 
 def create_product(db: Session, product: schemas.ProductCreate) -> models.Product:
     # Validate unique barcode if provided
@@ -44,12 +120,90 @@ def create_product(db: Session, product: schemas.ProductCreate) -> models.Produc
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Barcode already registered")
 
     # Set current_stock equal to initial_stock on creation
-    db_product = models.Product(**product.model_dump(), current_stock=product.initial_stock)
+    data = product.model_dump()
+    section_id = section_service.resolve_section_id(db, data.pop("section"))
+    db_product = models.Product(**data, section_id=section_id, current_stock=product.initial_stock)
     db.add(db_product)
     db.commit()
     db.refresh(db_product)
+    catalog_index.add(_indexed(db_product))
+    response_cache.invalidate(catalog_tags())
     return db_product
 
+def bulk_create_products(db: Session, rows: List[ParsedRow]) -> Tuple[int, List[schemas.ProductBulkError]]:
+    """
+    Import one chunk of parsed rows; returns (rows created, per-row errors).
+
+    Rows are validated with ProductCreate, barcodes are checked against the
+    database with a single IN (...) query (and against the rest of the chunk),
+    and the valid rows are inserted with one executemany and committed
+    (RETURNING the new ids for the catalog search index).
+    Earlier chunks are already committed, so duplicates across chunks show up
+    as "already registered".
+    """
+    errors: List[schemas.ProductBulkError] = []
+    valid = []
+    for line, data in rows:
+        if isinstance(data, str):
+            errors.append(schemas.ProductBulkError(line=line, errors=[data]))
+            continue
+        try:
+            valid.append((line, schemas.ProductCreate.model_validate(data)))
+        except ValidationError as e:
+            barcode = data.get("barcode")
+            errors.append(schemas.ProductBulkError(
+                line=line,
+                barcode=barcode if isinstance(barcode, str) else None,
+                errors=[f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in e.errors()],
+            ))
+
+    barcodes = {product.barcode for _, product in valid if product.barcode}
+    taken = set(db.scalars(select(models.Product.barcode).where(models.Product.barcode.in_(barcodes)))) if barcodes else set()
+
+    seen = set()
+    values = []
+    sections = []
+    inserted_lines = []
+    for line, product in valid:
+        if product.barcode:
+            if product.barcode in taken:
+                errors.append(schemas.ProductBulkError(line=line, barcode=product.barcode, errors=["Barcode already registered"]))
+                continue
+            if product.barcode in seen:
+                errors.append(schemas.ProductBulkError(line=line, barcode=product.barcode, errors=["Barcode repeated in the import"]))
+                continue
+            seen.add(product.barcode)
+        # Set current_stock equal to initial_stock on creation
+        values.append({**product.model_dump(exclude={"section"}), "current_stock": product.initial_stock})
+        sections.append(product.section or None)
+        inserted_lines.append((line, product.barcode))
+
+    if values:
+        try:
+            # One lookup (and one insert of the new names) for the whole chunk
+            section_ids = section_service.resolve_section_ids(db, sections)
+            for row, section in zip(values, sections):
+                row["section_id"] = section_ids.get(section)
+            ids = db.scalars(insert(models.Product).returning(models.Product.id, sort_by_parameter_order=True), values).all()
+            db.commit()
+            response_cache.invalidate(catalog_tags())
+            for product_id, row, section in zip(ids, values, sections):
+                catalog_index.add(IndexedProduct(
+                    id=product_id, description=row["description"], section=section,
+                    barcode=row["barcode"], sale_value=row["sale_value"],
+                ))
+        except IntegrityError:
+            # A barcode was registered concurrently after the check; the chunk is not imported
+            db.rollback()
+            errors.extend(
+                schemas.ProductBulkError(line=line, barcode=barcode, errors=["Barcode registered concurrently; chunk not imported"])
+                for line, barcode in inserted_lines
+            )
+            values = []
+
+    errors.sort(key=lambda error: error.line)
+    return len(values), errors
+
 def update_product(db: Session, product_id: int, product_update: schemas.ProductUpdate) -> models.Product | None:
     db_product = get_product(db, product_id)
     if not db_product:
@@ -68,12 +222,27 @@ def update_product(db: Session, product_id: int, product_update: schemas.Product
     if "current_stock" in update_data and update_data["current_stock"] < 0:
          raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Current stock cannot be negative")
 
+    section_changed = False
+    if "section" in update_data:
+        new_section = update_data.pop("section") or None
+        section_changed = new_section != db_product.section
+        # Past sales move with the product in the section report
+        report_service.move_product_section(db, product_id, db_product.section, new_section)
+        db_product.section_id = section_service.resolve_section_id(db, new_section)
+
     for key, value in update_data.items():
         setattr(db_product, key, value)
 
     db.add(db_product)
+    if section_changed:
+        db.flush()
+        # Orders containing the product now match its new section
+        section_service.refresh_product_orders(db, product_id)
     db.commit()
     db.refresh(db_product)
+    catalog_index.add(_indexed(db_product))
+    # Price, section or stock may move the product in or out of filtered lists
+    response_cache.invalidate(catalog_tags(product_id))
     return db_product
 
 def delete_product(db: Session, product_id: int) -> models.Product | None:
@@ -86,6 +255,8 @@ def delete_product(db: Session, product_id: int) -> models.Product | None:
     # Current implementation: Hard delete.
     db.delete(db_product)
     db.commit()
+    catalog_index.remove(product_id)
+    response_cache.invalidate(catalog_tags(product_id))
     return db_product
 
 # Function to adjust stock (example - could be more complex)
@@ -105,3 +276,53 @@ def adjust_stock(db: Session, product_id: int, quantity_change: int) -> models.P
     # db.refresh(db_product)
     return db_product
 
+
+def lock_products(db: Session, product_ids: Iterable[int]) -> Dict[int, models.Product]:
+    # Load every product in one IN (...) query, locking rows in id order so two
+    # orders touching the same products always lock them in the same sequence
+    # (no deadlocks). FOR UPDATE is a no-op on SQLite, which serializes writers.
+    ids = sorted(set(product_ids))
+    if not ids:
+        return {}
+    query = (
+        db.query(models.Product)
+        .filter(models.Product.id.in_(ids))
+        .order_by(models.Product.id)
+        .with_for_update(of=models.Product) # Not the eagerly joined section
+    )
+    return {product.id: product for product in query}
+
+def reserve_stock(db: Session, quantities: Dict[int, int]) -> Dict[int, models.Product]:
+    """
+    Validate and decrement stock for a set of products as one reservation.
+
+    `quantities` maps product_id -> total quantity requested. Products are checked
+    in the given order (so errors point at the first offending item) and
+    decremented with a conditional UPDATE per product, in id order. The
+    `current_stock >= qty` guard makes overselling impossible even without row
+    locks. Rolls back and raises HTTPException on any failure; the caller commits.
+    """
+    products = lock_products(db, quantities.keys())
+
+    for product_id, quantity in quantities.items():
+        db_product = products.get(product_id)
+        if not db_product:
+            db.rollback()
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Product with id {product_id} not found")
+        if db_product.current_stock < quantity:
+            db.rollback()
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Insufficient stock for product id {product_id}. Available: {db_product.current_stock}, Requested: {quantity}")
+
+    for product_id in sorted(quantities):
+        quantity = quantities[product_id]
+        result = db.execute(
+            update(models.Product)
+            .where(models.Product.id == product_id, models.Product.current_stock >= quantity)
+            .values(current_stock=models.Product.current_stock - quantity)
+        )
+        if result.rowcount != 1:
+            # Stock was taken by a concurrent order between the check and the update
+            db.rollback()
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Insufficient stock for product id {product_id}. Requested: {quantity}")
+
+    return products
@@ -0,0 +1,166 @@
+from sqlalchemy import Date, delete, func, insert, select, text, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from app import models
+from typing import Dict, List, Optional, Tuple
+from datetime import date
+from decimal import Decimal
+
+# Orders in these statuses are left out of every aggregate
+REPORT_EXCLUDED_STATUSES = (models.OrderStatus.CANCELLED,)
+
+# Day an order is reported under (the database's own date of created_at, so
+# incremental updates and rebuilds always agree)
+def _order_day():
+    return func.date(models.Order.created_at, type_=Date)
+
+def counts_in_reports(order_status: Optional[str]) -> bool:
+    return order_status not in REPORT_EXCLUDED_STATUSES
+
+def _upsert(db: Session, model, key: dict, deltas: dict) -> None:
+    # Add deltas to the aggregate row identified by key, creating it if needed.
+    # A single atomic statement, so concurrent order writes never lose updates.
+    dialect = db.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        dialect_insert = sqlite.insert if dialect == "sqlite" else postgresql.insert
+        statement = dialect_insert(model).values(**key, **deltas)
+        statement = statement.on_conflict_do_update(
+            index_elements=list(key),
+            set_={column: getattr(model, column) + statement.excluded[column] for column in deltas},
+        )
+        db.execute(statement)
+        return
+    conditions = [getattr(model, column) == value for column, value in key.items()]
+    updated = db.execute(update(model).where(*conditions).values({column: getattr(model, column) + value for column, value in deltas.items()}))
+    if updated.rowcount == 0:
+        db.execute(insert(model).values(**key, **deltas))
+
+def apply_order(db: Session, order: models.Order, sign: int = 1) -> None:
+    """
+    Add (sign=1) or subtract (sign=-1) an order's contribution to the aggregates.
+
+    Runs in the caller's transaction; the caller commits together with the
+    order write itself.
+    """
+    apply_orders(db, [order.id], sign)
+
+def apply_orders(db: Session, order_ids: List[int], sign: int = 1) -> None:
+    """apply_order for many orders at once: two reads, then one upsert per day, product and section touched."""
+    if not order_ids:
+        return
+    orders = db.execute(
+        select(models.Order.id, _order_day(), models.Order.total_value).where(models.Order.id.in_(order_ids))
+    ).all()
+    items = db.execute(
+        select(models.OrderItem.order_id, models.OrderItem.product_id, models.Section.name, models.OrderItem.quantity, models.OrderItem.unit_price)
+        .join(models.Product, models.OrderItem.product_id == models.Product.id)
+        .outerjoin(models.Section, models.Product.section_id == models.Section.id)
+        .where(models.OrderItem.order_id.in_(order_ids))
+    ).all()
+    day_of = {order_id: day for order_id, day, _ in orders}
+    per_day: Dict[date, Tuple[int, int, Decimal]] = {}
+    for _, day, total_value in orders:
+        count, units, revenue = per_day.get(day, (0, 0, Decimal("0")))
+        per_day[day] = (count + 1, units, revenue + Decimal(total_value))
+    per_product: Dict[int, Tuple[int, Decimal]] = {}
+    per_section: Dict[str, Tuple[int, Decimal]] = {}
+    for order_id, product_id, section, quantity, unit_price in items:
+        revenue = Decimal(unit_price) * quantity
+        for totals, key in ((per_product, product_id), (per_section, section or "")):
+            units, amount = totals.get(key, (0, Decimal("0")))
+            totals[key] = (units + quantity, amount + revenue)
+        count, units, day_revenue = per_day[day_of[order_id]]
+        per_day[day_of[order_id]] = (count, units + quantity, day_revenue)
+
+    for day, (count, units, revenue) in per_day.items():
+        _upsert(db, models.DailyRevenue, {"day": day}, {"orders_count": sign * count, "units": sign * units, "revenue": sign * revenue})
+    for product_id, (units, revenue) in per_product.items():
+        _upsert(db, models.ProductSales, {"product_id": product_id}, {"units": sign * units, "revenue": sign * revenue})
+    for section, (units, revenue) in per_section.items():
+        _upsert(db, models.SectionRevenue, {"section": section}, {"units": sign * units, "revenue": sign * revenue})
+
+def move_product_section(db: Session, product_id: int, old_section: Optional[str], new_section: Optional[str]) -> None:
+    """Move a product's sales between section aggregates when its section changes (caller commits)."""
+    if (old_section or "") == (new_section or ""):
+        return
+    sales = db.get(models.ProductSales, product_id)
+    if sales is None or not sales.units:
+        return
+    _upsert(db, models.SectionRevenue, {"section": old_section or ""}, {"units": -sales.units, "revenue": -sales.revenue})
+    _upsert(db, models.SectionRevenue, {"section": new_section or ""}, {"units": sales.units, "revenue": sales.revenue})
+
+def rebuild_reports(db: Session) -> Dict[str, int]:
+    """
+    Recompute every aggregate from orders/order_items with GROUP BY queries and commit.
+
+    On PostgreSQL the orders tables are locked against writes for the
+    duration, so no order is counted twice or missed.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text("LOCK TABLE orders, order_items, products, sections IN SHARE MODE"))
+    counted = models.Order.status.not_in(REPORT_EXCLUDED_STATUSES)
+    for model in (models.DailyRevenue, models.ProductSales, models.SectionRevenue):
+        db.execute(delete(model))
+
+    order_units = (
+        select(models.OrderItem.order_id, func.sum(models.OrderItem.quantity).label("units"))
+        .group_by(models.OrderItem.order_id)
+        .subquery()
+    )
+    db.execute(insert(models.DailyRevenue).from_select(
+        ["day", "orders_count", "units", "revenue"],
+        select(_order_day(), func.count(models.Order.id), func.coalesce(func.sum(order_units.c.units), 0), func.sum(models.Order.total_value))
+        .outerjoin(order_units, order_units.c.order_id == models.Order.id)
+        .where(counted)
+        .group_by(_order_day()),
+    ))
+    item_revenue = func.sum(models.OrderItem.quantity * models.OrderItem.unit_price)
+    db.execute(insert(models.ProductSales).from_select(
+        ["product_id", "units", "revenue"],
+        select(models.OrderItem.product_id, func.sum(models.OrderItem.quantity), item_revenue)
+        .join(models.Order, models.OrderItem.order_id == models.Order.id)
+        .where(counted)
+        .group_by(models.OrderItem.product_id),
+    ))
+    section = func.coalesce(models.Section.name, "")
+    db.execute(insert(models.SectionRevenue).from_select(
+        ["section", "units", "revenue"],
+        select(section, func.sum(models.OrderItem.quantity), item_revenue)
+        .join(models.Order, models.OrderItem.order_id == models.Order.id)
+        .join(models.Product, models.OrderItem.product_id == models.Product.id)
+        .outerjoin(models.Section, models.Product.section_id == models.Section.id)
+        .where(counted)
+        .group_by(section),
+    ))
+    db.commit()
+    return {
+        model.__tablename__: db.scalar(select(func.count()).select_from(model))
+        for model in (models.DailyRevenue, models.ProductSales, models.SectionRevenue)
+    }
+
+def get_daily_revenue(db: Session, start_date: Optional[date] = None, end_date: Optional[date] = None) -> List[models.DailyRevenue]:
+    query = db.query(models.DailyRevenue).filter(models.DailyRevenue.orders_count > 0)
+    if start_date:
+        query = query.filter(models.DailyRevenue.day >= start_date)
+    if end_date:
+        query = query.filter(models.DailyRevenue.day <= end_date)
+    return query.order_by(models.DailyRevenue.day).all()
+
+def get_product_sales(db: Session, skip: int = 0, limit: int = 100) -> List[models.ProductSales]:
+    # Best sellers first
+    return (
+        db.query(models.ProductSales)
+        .filter(models.ProductSales.units > 0)
+        .order_by(models.ProductSales.revenue.desc(), models.ProductSales.product_id)
+        .offset(skip)
+        .limit(limit)
+        .all()
+    )
+
+def get_section_revenue(db: Session) -> List[models.SectionRevenue]:
+    return (
+        db.query(models.SectionRevenue)
+        .filter(models.SectionRevenue.units > 0)
+        .order_by(models.SectionRevenue.revenue.desc(), models.SectionRevenue.section)
+        .all()
+    )
@@ -0,0 +1,108 @@
+from sqlalchemy import BigInteger, and_, case, cast, distinct, false, func, insert, literal, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.elements import ColumnElement
+from app import models
+from app.core.config import settings
+from typing import Dict, Iterable, List, Optional
+
+# orders.section_bits holds bit (id - 1) for sections 1..62; sections with
+# larger ids share the overflow bit, which then only narrows the search (the
+# EXISTS semi-join confirms). 63 bits, so the value fits a signed BIGINT.
+SECTION_BITMAP_SIZE = 62
+OVERFLOW_BIT = 1 << SECTION_BITMAP_SIZE
+
+def section_bit(section_id: Optional[int]) -> int:
+    if section_id is None:
+        return 0
+    return 1 << (section_id - 1) if section_id <= SECTION_BITMAP_SIZE else OVERFLOW_BIT
+
+def section_bits(section_ids: Iterable[Optional[int]]) -> int:
+    bits = 0
+    for section_id in section_ids:
+        bits |= section_bit(section_id)
+    return bits
+
+def resolve_section_ids(db: Session, names: Iterable[Optional[str]]) -> Dict[str, int]:
+    """
+    Map section names to their ids, creating the sections that don't exist yet.
+
+    Runs in the caller's transaction (the caller commits). Creation is an
+    INSERT ... ON CONFLICT DO NOTHING, so concurrent writers naming the same new
+    section end up with the same row.
+    """
+    wanted = {name for name in names if name}
+    if not wanted:
+        return {}
+    by_name = select(models.Section.name, models.Section.id)
+    ids = dict(db.execute(by_name.where(models.Section.name.in_(wanted))).all())
+    missing = wanted - ids.keys()
+    if missing:
+        dialect = db.get_bind().dialect.name
+        if dialect in ("sqlite", "postgresql"):
+            dialect_insert = sqlite.insert if dialect == "sqlite" else postgresql.insert
+            statement = dialect_insert(models.Section).on_conflict_do_nothing(index_elements=["name"])
+        else:
+            statement = insert(models.Section)
+        db.execute(statement, [{"name": name} for name in sorted(missing)])
+        ids.update(db.execute(by_name.where(models.Section.name.in_(missing))).all())
+    return ids
+
+def resolve_section_id(db: Session, name: Optional[str]) -> Optional[int]:
+    # Products without a section (None or "") have no section row
+    return resolve_section_ids(db, [name]).get(name) if name else None
+
+def matching_section_ids(db: Session, pattern: str) -> List[int]:
+    # Case-insensitive partial match, evaluated on the small sections table only
+    return list(db.scalars(select(models.Section.id).where(models.Section.name.ilike(f"%{pattern}%")).order_by(models.Section.id)))
+
+def order_has_sections(section_ids: List[int]) -> ColumnElement[bool]:
+    """
+    WHERE clause for orders with at least one product in any of section_ids.
+
+    A correlated EXISTS semi-join (each order probed once through its items, no
+    JOIN + DISTINCT over every matching item). With ORDER_SECTION_BITMAP_FILTER
+    the denormalized orders.section_bits answers without touching the items.
+    """
+    if not section_ids:
+        return false()
+    has_item = (
+        select(models.OrderItem.id)
+        .join(models.Product, models.OrderItem.product_id == models.Product.id)
+        .where(models.OrderItem.order_id == models.Order.id, models.Product.section_id.in_(section_ids))
+        .exists()
+    )
+    if not settings.ORDER_SECTION_BITMAP_FILTER:
+        return has_item
+    mask = section_bits(section_ids)
+    in_bitmap = models.Order.section_bits.op("&")(mask) != 0
+    if mask & OVERFLOW_BIT:
+        # The overflow bit is shared by many sections: confirm with the semi-join
+        return and_(in_bitmap, has_item)
+    return in_bitmap
+
+def order_section_bits_expression():
+    # orders.section_bits recomputed from the order's items (correlated to orders).
+    # The bits are distinct powers of two, so SUM(DISTINCT) is their bitwise OR
+    # on every database.
+    bit = case(
+        (models.Product.section_id <= SECTION_BITMAP_SIZE, cast(literal(1), BigInteger).op("<<", return_type=BigInteger)(models.Product.section_id - 1)),
+        else_=cast(literal(OVERFLOW_BIT), BigInteger),
+    )
+    return func.coalesce(
+        select(func.sum(distinct(bit)))
+        .select_from(models.OrderItem)
+        .join(models.Product, models.OrderItem.product_id == models.Product.id)
+        .where(models.OrderItem.order_id == models.Order.id, models.Product.section_id.is_not(None))
+        .scalar_subquery(),
+        0,
+    )
+
+def refresh_product_orders(db: Session, product_id: int) -> None:
+    """Recompute section_bits of every order containing the product, after a section change (caller commits)."""
+    db.execute(
+        update(models.Order)
+        .where(models.Order.id.in_(select(models.OrderItem.order_id).where(models.OrderItem.product_id == product_id)))
+        .values(section_bits=order_section_bits_expression())
+        .execution_options(synchronize_session=False)
+    )
@@ -0,0 +1,80 @@
+"""
+Concurrent request throughput: sync sessions vs DATABASE_ASYNC_MODE.
+
+Each mode runs in its own interpreter (the mode is fixed at import time) against
+the same seeded SQLite file, issuing GET /products and GET /orders with N
+concurrent in-process clients over httpx's ASGI transport.
+
+    python -m benchmarks.bench_async_mode --requests 2000 --concurrency 50
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+def worker(n_requests: int, concurrency: int):
+    import httpx
+    from app.main import app
+    from app.core.config import settings
+    api = settings.API_V1_STR
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            credentials = {"email": "bench.async@example.com", "password": "benchpassword", "is_superuser": True}
+            await client.post(f"{api}/auth/register", json=credentials)
+            login = await client.post(f"{api}/auth/login", data={"username": credentials["email"], "password": credentials["password"]})
+            headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+            if not (await client.get(f"{api}/products/?limit=1", headers=headers)).json():
+                await client.post(f"{api}/clients/", headers=headers, json={"name": "Bench", "email": "bench.client@example.com", "cpf": "12345678900"})
+                for i in range(50):
+                    await client.post(f"{api}/products/", headers=headers, json={"description": f"Bench {i}", "sale_value": "9.90", "initial_stock": 10_000, "section": "Bench"})
+                for i in range(100):
+                    await client.post(f"{api}/orders/", headers=headers, json={"client_id": 1, "items": [{"product_id": i % 50 + 1, "quantity": 1}]})
+
+            paths = [f"{api}/products/", f"{api}/orders/?limit=20"]
+            queue = asyncio.Queue()
+            for i in range(n_requests):
+                queue.put_nowait(paths[i % len(paths)])
+
+            async def consume():
+                while not queue.empty():
+                    response = await client.get(queue.get_nowait(), headers=headers)
+                    assert response.status_code == 200
+
+            start = time.perf_counter()
+            await asyncio.gather(*(consume() for _ in range(concurrency)))
+            return n_requests / (time.perf_counter() - start)
+
+    print(json.dumps({"rps": asyncio.run(run())}))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        return worker(args.requests, args.concurrency)
+
+    database_url = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_async.db')}"
+    results = {}
+    for mode in ("false", "true"):
+        env = dict(os.environ, DATABASE_URL=database_url, DATABASE_ASYNC_MODE=mode)
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_async_mode", "--worker",
+             "--requests", str(args.requests), "--concurrency", str(args.concurrency)],
+            env=env, check=True, capture_output=True, text=True,
+        ).stdout
+        results[mode] = json.loads(output.strip().splitlines()[-1])["rps"]
+
+    print(f"{args.requests} requests, concurrency {args.concurrency}")
+    print(f"  sync sessions  {results['false']:9.1f} req/s")
+    print(f"  async mode     {results['true']:9.1f} req/s  ({results['true'] / results['false']:.2f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Authenticated request throughput with and without the principal cache.
+
+Drives GET /api/v1/auth/users/me through TestClient against a throwaway SQLite
+database, first with the cache disabled (one user SELECT per request) and then
+enabled.
+
+    python -m benchmarks.bench_auth --requests 2000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_auth.db')}")
+
+from fastapi.testclient import TestClient  # noqa: E402
+from app.main import app  # noqa: E402
+from app.core.config import settings  # noqa: E402
+from app.core.principal_cache import principal_cache  # noqa: E402
+
+def run(client: TestClient, headers: dict, n_requests: int) -> float:
+    start = time.perf_counter()
+    for _ in range(n_requests):
+        response = client.get(f"{settings.API_V1_STR}/auth/users/me", headers=headers)
+        assert response.status_code == 200
+    return n_requests / (time.perf_counter() - start)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    with TestClient(app) as client:
+        credentials = {"email": "bench.auth@example.com", "password": "benchpassword"}
+        client.post(f"{settings.API_V1_STR}/auth/register", json=credentials)
+        login = client.post(f"{settings.API_V1_STR}/auth/login", data={"username": credentials["email"], "password": credentials["password"]})
+        headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+
+        ttl = principal_cache.ttl_seconds
+        principal_cache.ttl_seconds = 0
+        uncached = run(client, headers, args.requests)
+        principal_cache.ttl_seconds = ttl or 60
+        principal_cache.clear()
+        cached = run(client, headers, args.requests)
+
+    print(f"{args.requests} authenticated requests")
+    print(f"  cache disabled {uncached:10.1f} req/s")
+    print(f"  cache enabled  {cached:10.1f} req/s  ({cached / uncached:.2f}x)")
+    print(f"  cache stats    {principal_cache.stats()}")
+
+if __name__ == "__main__":
+    main()
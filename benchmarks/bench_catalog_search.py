@@ -0,0 +1,148 @@
+"""
+Catalog search latency over a large catalog.
+
+Seeds a throwaway SQLite database with --products products, builds the
+catalog search index (timed) and runs a mix of queries through
+services.product.search_products and autocomplete_products (index lookup plus
+the page read from the database, as the endpoints do), reporting
+p50/p95/p99 per query kind. Then --threads threads, each with its own
+session (as the threadpool serves requests), share an offered load of --rate
+searches per second for --seconds while a product is updated every
+--write-ms; latency counts from each search's scheduled start, so time spent
+queued behind the other threads is included. The target is p99 under 20 ms.
+
+    python -m benchmarks.bench_catalog_search --products 500000 --threads 4
+"""
+import argparse
+import os
+import random
+import resource
+import statistics
+import tempfile
+import threading
+import time
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_catalog.db')}")
+
+from sqlalchemy import insert  # noqa: E402
+from app import models, schemas  # noqa: E402
+from app.core.catalog_index import PRICE_BANDS, catalog_index  # noqa: E402
+from app.database import Base, SessionLocal, engine  # noqa: E402
+from app.services import product as product_service  # noqa: E402
+
+KINDS = ["Camisa", "Camiseta", "Calça", "Bermuda", "Vestido", "Saia", "Jaqueta", "Moletom", "Blusa", "Regata",
+         "Tênis", "Sandália", "Bota", "Meia", "Boné", "Cinto", "Bolsa", "Mochila", "Pijama", "Casaco"]
+ADJECTIVES = ["Básica", "Slim", "Oversized", "Estampada", "Listrada", "Lisa", "Jeans", "Linho", "Algodão", "Couro",
+              "Infantil", "Masculina", "Feminina", "Esportiva", "Social", "Casual", "Térmica", "Bordada", "Vintage", "Premium"]
+COLORS = ["Azul", "Preta", "Branca", "Vermelha", "Verde", "Amarela", "Rosa", "Cinza", "Bege", "Marrom"]
+SECTIONS = ["Masculino", "Feminino", "Infantil", "Calçados", "Acessórios", "Esportes", "Praia", "Inverno"]
+
+def seed(n_products: int):
+    Base.metadata.create_all(bind=engine)
+    with engine.connect() as conn:
+        # Readers don't wait on the writer's commit, as on the Postgres primary
+        conn.exec_driver_sql("PRAGMA journal_mode=WAL")
+    rng = random.Random(42)
+    with engine.begin() as conn:
+        conn.execute(insert(models.Section), [{"id": i + 1, "name": name} for i, name in enumerate(SECTIONS)])
+        for start in range(0, n_products, 20_000):
+            conn.execute(insert(models.Product), [
+                {"description": f"{rng.choice(KINDS)} {rng.choice(ADJECTIVES)} {rng.choice(COLORS)} {i}",
+                 "sale_value": round(rng.uniform(10, 800), 2), "barcode": f"CAT{i:09d}", "section_id": rng.randrange(len(SECTIONS)) + 1,
+                 "initial_stock": 10, "current_stock": 10}
+                for i in range(start, min(start + 20_000, n_products))
+            ])
+
+def percentiles(samples):
+    cuts = statistics.quantiles(samples, n=100, method="inclusive")
+    return cuts[49], cuts[94], cuts[98]
+
+def mixed_query(rng: random.Random, n_products: int) -> dict:
+    kind = rng.randrange(4)
+    if kind == 0:
+        return {"q": rng.choice(KINDS)}
+    if kind == 1:
+        return {"q": f"{rng.choice(KINDS)} {rng.choice(COLORS)}"}
+    if kind == 2:
+        return {"q": rng.choice(ADJECTIVES), "section": rng.choice(SECTIONS), "price_band": rng.choice(PRICE_BANDS)[0]}
+    return {"q": f"CAT{rng.randrange(n_products):09d}"}
+
+def concurrent(n_products: int, threads: int, rate: float, seconds: float, write_ms: float):
+    # Open loop: search k is due at start + k / rate whether or not earlier ones finished
+    samples, stop = [], threading.Event()
+    start = time.perf_counter() + 0.1
+    def searcher(seed: int):
+        rng, own = random.Random(seed), []
+        with SessionLocal() as db:
+            for k in range(seed, int(rate * seconds), threads):
+                due = start + k / rate
+                time.sleep(max(0.0, due - time.perf_counter()))
+                product_service.search_products(db, limit=20, **mixed_query(rng, n_products))
+                own.append((time.perf_counter() - due) * 1000)
+        samples.extend(own)
+    def writer():
+        rng = random.Random(99)
+        with SessionLocal() as db:
+            while not stop.wait(write_ms / 1000):
+                product_id = rng.randrange(n_products) + 1
+                product_service.update_product(db, product_id, schemas.ProductUpdate(description=f"{rng.choice(KINDS)} {rng.choice(COLORS)} {product_id}"))
+    workers = [threading.Thread(target=searcher, args=(i,)) for i in range(threads)] + [threading.Thread(target=writer)]
+    for worker in workers:
+        worker.start()
+    for worker in workers[:-1]:
+        worker.join()
+    stop.set()
+    workers[-1].join()
+    p50, p95, p99 = percentiles(samples)
+    print(f"{f'{rate:.0f}/s on {threads} threads':<24}{p50:>10.2f}{p95:>10.2f}{p99:>10.2f}   (with a write every {write_ms:.0f} ms)")
+
+def main(n_products: int, runs: int, threads: int, rate: float, seconds: float, write_ms: float):
+    start = time.perf_counter()
+    seed(n_products)
+    print(f"seeded {n_products} products in {time.perf_counter() - start:.1f}s")
+    rng = random.Random(7)
+    queries = {
+        "one common word": lambda: {"q": rng.choice(KINDS)},
+        "two words": lambda: {"q": f"{rng.choice(KINDS)} {rng.choice(COLORS)}"},
+        "three words + prefix": lambda: {"q": f"{rng.choice(KINDS)} {rng.choice(ADJECTIVES)} {rng.choice(COLORS)[:3]}"},
+        "word + facets": lambda: {"q": rng.choice(ADJECTIVES), "section": rng.choice(SECTIONS), "price_band": rng.choice(PRICE_BANDS)[0]},
+        "exact barcode": lambda: {"q": f"CAT{rng.randrange(n_products):09d}"},
+        "deep page": lambda: {"q": rng.choice(COLORS), "skip": 2000},
+    }
+    with SessionLocal() as db:
+        start = time.perf_counter()
+        product_service.search_products(db, q="warmup")
+        print(f"index built in {time.perf_counter() - start:.1f}s, RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MiB")
+        print(f"{'query':<24}{'p50':>10}{'p95':>10}{'p99':>10}   (ms, {runs} runs, limit 20)")
+        overall = []
+        for name, make in queries.items():
+            samples = []
+            for _ in range(runs):
+                params = make()
+                t0 = time.perf_counter()
+                product_service.search_products(db, limit=20, **params)
+                samples.append((time.perf_counter() - t0) * 1000)
+            overall += samples
+            print(f"{name:<24}" + "".join(f"{value:>10.2f}" for value in percentiles(samples)))
+        samples = []
+        for _ in range(runs):
+            q = f"{rng.choice(KINDS)} {rng.choice(ADJECTIVES)[:rng.randint(2, 4)]}"
+            t0 = time.perf_counter()
+            product_service.autocomplete_products(db, q=q)
+            samples.append((time.perf_counter() - t0) * 1000)
+        print(f"{'autocomplete':<24}" + "".join(f"{value:>10.2f}" for value in percentiles(samples)))
+        print(f"{'all searches':<24}" + "".join(f"{value:>10.2f}" for value in percentiles(overall)))
+    if threads:
+        concurrent(n_products, threads, rate, seconds, write_ms)
+    catalog_index.clear()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=500_000)
+    parser.add_argument("--runs", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=4, help="Concurrent searchers (0 skips the concurrent run)")
+    parser.add_argument("--rate", type=float, default=150.0, help="Searches per second offered across the threads")
+    parser.add_argument("--seconds", type=float, default=20.0)
+    parser.add_argument("--write-ms", type=float, default=50.0, help="Interval between product updates during the concurrent run")
+    args = parser.parse_args()
+    main(args.products, args.runs, args.threads, args.rate, args.seconds, args.write_ms)
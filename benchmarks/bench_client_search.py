@@ -0,0 +1,82 @@
+"""
+Client search: ILIKE scan vs the search index.
+
+Seeds a throwaway SQLite database with --clients clients (the FTS5 trigram
+index is maintained by its triggers while seeding) and times
+services.client.get_clients for a few terms, once with the `name` or
+`email` filter (ILIKE '%term%', a full scan) and once with the ranked `q` search.
+
+    python -m benchmarks.bench_client_search --clients 2000000
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from app import models
+from app.database import Base
+from app.services import client as client_service
+
+FIRST_NAMES = ["Ana", "Bruno", "Carla", "Diego", "Elisa", "Fábio", "Gabriela", "Heitor", "Isabela", "João",
+               "Karina", "Lucas", "Mariana", "Nicolas", "Olívia", "Paulo", "Rafaela", "Samuel", "Tatiane", "Yasmin"]
+LAST_NAMES = ["Silva", "Santos", "Oliveira", "Souza", "Rodrigues", "Ferreira", "Alves", "Pereira", "Lima", "Gomes",
+              "Costa", "Ribeiro", "Martins", "Carvalho", "Almeida", "Lopes", "Soares", "Fernandes", "Vieira", "Barbosa"]
+DOMAINS = ["example.com", "mail.com", "lojas.com.br", "empresa.com.br"]
+
+def seed(engine, n_clients: int):
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        batch = []
+        for i in range(n_clients):
+            first, last = FIRST_NAMES[i % 20], LAST_NAMES[(i // 20) % 20]
+            batch.append({
+                "name": f"{first} {last} {i}",
+                "email": f"{first.lower()}.{last.lower()}{i}@{DOMAINS[i % 4]}",
+                "cpf": f"{i:011d}",
+            })
+            if len(batch) == 20_000:
+                conn.execute(insert(models.Client), batch)
+                batch = []
+        if batch:
+            conn.execute(insert(models.Client), batch)
+
+def timed(fn, runs: int):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), len(result)
+
+def main(n_clients: int, runs: int):
+    path = os.path.join(tempfile.mkdtemp(), "bench_search.db")
+    engine = create_engine(f"sqlite:///{path}")
+    start = time.perf_counter()
+    seed(engine, n_clients)
+    print(f"seeded {n_clients} clients in {time.perf_counter() - start:.1f}s")
+    Session = sessionmaker(bind=engine)
+
+    email_id = n_clients // 3
+    # (label, filter the scan uses, term)
+    terms = [
+        ("rare (unique id)", "name", str(n_clients // 2 + 7)),
+        ("selective email", "email", f"{LAST_NAMES[(email_id // 20) % 20].lower()}{email_id}@"),
+        ("common name", "name", "yasmin barbosa"),
+        ("very common", "name", "silva"),
+    ]
+    print(f"{'term':<28}{'ILIKE scan':>14}{'q search':>14}{'speedup':>10}   (median ms, limit 100)")
+    with Session() as db:
+        for label, field, term in terms:
+            scan_ms, scan_rows = timed(lambda: client_service.get_clients(db, limit=100, **{field: term}), runs)
+            search_ms, search_rows = timed(lambda: client_service.get_clients(db, q=term, limit=100), runs)
+            name = f"{label}: {term}"[:27]
+            print(f"{name:<28}{scan_ms:>11.2f} ms{search_ms:>11.2f} ms{scan_ms / search_ms:>9.1f}x   ({scan_rows}/{search_rows} rows)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=2_000_000)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+    main(args.clients, args.runs)
@@ -0,0 +1,66 @@
+"""
+Catalog read latency during a login storm.
+
+Fires a burst of concurrent logins (bcrypt on the password hashing pool) while
+a reader keeps calling GET /products, and compares the reader's latency with an
+idle baseline. Runs fully in-process over httpx's ASGI transport.
+
+    python -m benchmarks.bench_login_storm --logins 200 --reads 200
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_login.db')}")
+
+import httpx  # noqa: E402
+from app.main import app  # noqa: E402
+from app.core import security  # noqa: E402
+from app.core.config import settings  # noqa: E402
+
+API = settings.API_V1_STR
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+async def read_catalog(client, headers, n_reads):
+    samples = []
+    for _ in range(n_reads):
+        start = time.perf_counter()
+        response = await client.get(f"{API}/products/", headers=headers)
+        assert response.status_code == 200
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+async def main(n_logins: int, n_reads: int):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        credentials = {"email": "bench.storm@example.com", "password": "benchpassword"}
+        await client.post(f"{API}/auth/register", json=credentials)
+        login_form = {"username": credentials["email"], "password": credentials["password"]}
+        login = await client.post(f"{API}/auth/login", data=login_form)
+        headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+
+        idle = await read_catalog(client, headers, n_reads)
+
+        storm = [client.post(f"{API}/auth/login", data=login_form) for _ in range(n_logins)]
+        storm_task = asyncio.gather(*storm)
+        busy = await read_catalog(client, headers, n_reads)
+        statuses = [r.status_code for r in await storm_task]
+
+    print(f"GET /products latency (ms), {n_reads} reads")
+    for name, samples in (("idle", idle), ("login storm", busy)):
+        print(f"  {name:<12} p50 {statistics.median(samples):7.2f}  p95 {percentile(samples, 95):7.2f}  p99 {percentile(samples, 99):7.2f}")
+    print(f"logins: {statuses.count(200)} ok, {statuses.count(503)} rejected (503)")
+    print(f"hasher: {security.password_hasher.stats()}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--reads", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.logins, args.reads))
@@ -0,0 +1,75 @@
+"""
+Overhead of the /metrics instrumentation on GET /products.
+
+Seeds a throwaway SQLite database with --products products, then requests
+the first page of GET /products (cache disabled, so every request queries
+and serializes) over httpx's ASGI transport, in rounds with METRICS_ENABLED
+off and on (which goes first alternates) so drift affects both sides
+equally. Prints the median latency of each and the relative overhead.
+
+    python -m benchmarks.bench_metrics_overhead --rounds 20 --requests 200
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_metrics_overhead.db')}")
+os.environ.setdefault("RESPONSE_CACHE_TTL_SECONDS", "0")
+
+import httpx  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+from app import models  # noqa: E402
+from app.core.config import settings  # noqa: E402
+from app.database import Base, engine  # noqa: E402
+from app.main import app  # noqa: E402
+
+def seed(n_products: int):
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(insert(models.Section), [{"id": i + 1, "name": f"Section {i}"} for i in range(10)])
+        conn.execute(insert(models.Product), [
+            {"description": f"Bench Product {i}", "sale_value": 9.99, "section_id": i % 10 + 1, "initial_stock": 100, "current_stock": 100}
+            for i in range(n_products)
+        ])
+
+async def run(rounds: int, requests: int):
+    api = settings.API_V1_STR
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        credentials = {"email": "bench.metrics@example.com", "password": "benchpassword"}
+        await client.post(f"{api}/auth/register", json=credentials)
+        login = await client.post(f"{api}/auth/login", data={"username": credentials["email"], "password": credentials["password"]})
+        headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+
+        async def timed_round() -> list:
+            latencies = []
+            for _ in range(requests):
+                start = time.perf_counter()
+                response = await client.get(f"{api}/products/?limit=20", headers=headers)
+                latencies.append(time.perf_counter() - start)
+                assert response.status_code == 200, response.text
+            return latencies
+
+        settings.METRICS_ENABLED = True
+        await timed_round() # Warm up (and create the metric series)
+        samples = {False: [], True: []}
+        for round_number in range(rounds):
+            for enabled in ((False, True) if round_number % 2 else (True, False)):
+                settings.METRICS_ENABLED = enabled
+                samples[enabled].extend(await timed_round())
+
+    off, on = statistics.median(samples[False]), statistics.median(samples[True])
+    print(f"GET /products, {rounds} x {requests} requests per setting")
+    print(f"  metrics off   median {off * 1000:7.3f} ms")
+    print(f"  metrics on    median {on * 1000:7.3f} ms  ({(on - off) / off:+.2%})")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+    seed(args.products)
+    asyncio.run(run(args.rounds, args.requests))
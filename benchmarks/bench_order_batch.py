@@ -0,0 +1,87 @@
+"""
+Order creation throughput: one POST /orders per order vs POST /orders/batch.
+
+Seeds a throwaway SQLite database with 200 products and 100 clients, then
+creates --orders orders (3 items each, random products and clients) through
+the API over httpx's ASGI transport: first one request per order, then in
+batches of --batch-size orders. Prints orders per second for each and checks
+that both paths charged the stock identically.
+
+    python -m benchmarks.bench_order_batch --orders 2000 --batch-size 500
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_order_batch.db')}")
+
+import httpx  # noqa: E402
+from sqlalchemy import func, insert, select  # noqa: E402
+from app import models  # noqa: E402
+from app.core.config import settings  # noqa: E402
+from app.database import Base, SessionLocal, engine  # noqa: E402
+from app.main import app  # noqa: E402
+
+N_PRODUCTS = 200
+N_CLIENTS = 100
+
+def seed():
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(insert(models.Section), [{"id": i + 1, "name": f"Section {i}"} for i in range(10)])
+        conn.execute(insert(models.Client), [{"name": f"Bench Client {i}", "email": f"bench{i}@example.com", "cpf": f"{i:011d}"} for i in range(N_CLIENTS)])
+        conn.execute(insert(models.Product), [
+            {"description": f"Bench Product {i}", "sale_value": 9.99, "section_id": i % 10 + 1, "initial_stock": 1_000_000, "current_stock": 1_000_000}
+            for i in range(N_PRODUCTS)
+        ])
+
+def make_orders(n_orders: int, rng: random.Random):
+    return [
+        {"client_id": rng.randrange(N_CLIENTS) + 1, "items": [{"product_id": rng.randrange(N_PRODUCTS) + 1, "quantity": rng.randint(1, 3)} for _ in range(3)]}
+        for _ in range(n_orders)
+    ]
+
+def units_sold() -> int:
+    with SessionLocal() as db:
+        return db.scalar(select(func.sum(models.Product.initial_stock - models.Product.current_stock)))
+
+async def run(n_orders: int, batch_size: int):
+    api = settings.API_V1_STR
+    rng = random.Random(42)
+    singles, batched = make_orders(n_orders, rng), make_orders(n_orders, rng)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        credentials = {"email": "bench.batch@example.com", "password": "benchpassword"}
+        await client.post(f"{api}/auth/register", json=credentials)
+        login = await client.post(f"{api}/auth/login", data={"username": credentials["email"], "password": credentials["password"]})
+        headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+
+        start = time.perf_counter()
+        for order in singles:
+            response = await client.post(f"{api}/orders/", headers=headers, json=order)
+            assert response.status_code == 201, response.text
+        single_seconds = time.perf_counter() - start
+        single_units = units_sold()
+
+        start = time.perf_counter()
+        for offset in range(0, n_orders, batch_size):
+            response = await client.post(f"{api}/orders/batch", headers=headers, json={"orders": batched[offset:offset + batch_size]})
+            assert response.status_code == 200 and response.json()["failed"] == 0, response.text
+        batch_seconds = time.perf_counter() - start
+        batch_units = units_sold() - single_units
+
+    expected = [sum(item["quantity"] for order in orders for item in order["items"]) for orders in (singles, batched)]
+    assert [single_units, batch_units] == expected, "stock charged differently"
+    print(f"{n_orders} orders, 3 items each")
+    print(f"  one request per order      {n_orders / single_seconds:9.1f} orders/s")
+    print(f"  batches of {batch_size:<5}          {n_orders / batch_seconds:9.1f} orders/s  ({single_seconds / batch_seconds:.1f}x)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+    seed()
+    asyncio.run(run(args.orders, args.batch_size))
@@ -0,0 +1,131 @@
+"""
+Streaming order export with a large date range.
+
+Seeds a throwaway SQLite database with --items order items (5 per order,
+spread over a year) and downloads GET /orders/export for the whole range, then
+for the first month, reporting time, rows/s, bytes and peak RSS. With
+--trace-memory it also reports the peak Python memory traced during each
+export, which stays flat regardless of the range (tracing slows the export
+down, so time it separately). Runs fully in-process: setup goes through httpx's
+ASGI transport, the export itself is driven as raw ASGI so the body chunks are
+counted and dropped as they are sent (httpx's transport buffers whole bodies).
+
+    python -m benchmarks.bench_order_export --items 1000000 --format csv
+"""
+import argparse
+import asyncio
+import os
+import resource
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from urllib.parse import urlencode
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_export.db')}")
+
+import httpx  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+from app.main import app  # noqa: E402
+from app import models  # noqa: E402
+from app.core.config import settings  # noqa: E402
+from app.database import engine  # noqa: E402
+
+API = settings.API_V1_STR
+ITEMS_PER_ORDER = 5
+START = datetime(2024, 1, 1)
+
+def seed(n_items: int):
+    n_orders = n_items // ITEMS_PER_ORDER
+    with engine.begin() as conn:
+        conn.execute(insert(models.Client), [
+            {"name": f"Bench Client {i}", "email": f"bench{i}@example.com", "cpf": f"{i:011d}"} for i in range(100)
+        ])
+        conn.execute(insert(models.Section), [{"id": i + 1, "name": f"Section {i}"} for i in range(10)])
+        conn.execute(insert(models.Product), [
+            {"description": f"Bench Product {i}", "sale_value": 9.99, "barcode": f"EXPORT{i:07d}", "section_id": i % 10 + 1,
+             "initial_stock": 0, "current_stock": 0} for i in range(1000)
+        ])
+        for start in range(0, n_orders, 10_000):
+            ids = range(start + 1, min(start + 10_000, n_orders) + 1)
+            conn.execute(insert(models.Order), [
+                {"id": i, "client_id": i % 100 + 1, "status": "delivered", "total_value": 49.95,
+                 "created_at": START + timedelta(seconds=i * 365 * 86400 // n_orders)} for i in ids
+            ])
+            conn.execute(insert(models.OrderItem), [
+                {"order_id": i, "product_id": (i * ITEMS_PER_ORDER + k) % 1000 + 1, "quantity": 1, "unit_price": 9.99}
+                for i in ids for k in range(ITEMS_PER_ORDER)
+            ])
+
+async def export(headers, params, trace_memory: bool):
+    totals = {"status": None, "bytes": 0, "lines": 0}
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": f"{API}/orders/export", "raw_path": f"{API}/orders/export".encode(), "root_path": "",
+        "query_string": urlencode(params).encode(),
+        "headers": [(name.lower().encode(), value.encode()) for name, value in headers.items()],
+        "server": ("bench", 80), "client": ("127.0.0.1", 1234),
+    }
+
+    request_sent = asyncio.Event()
+    response_done = asyncio.Event()
+
+    async def receive():
+        # The request body once, then block until the response is done (no client disconnect)
+        if not request_sent.is_set():
+            request_sent.set()
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await response_done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            totals["status"] = message["status"]
+        elif message["type"] == "http.response.body":
+            totals["bytes"] += len(message.get("body", b""))
+            totals["lines"] += message.get("body", b"").count(b"\n")
+            if not message.get("more_body", False):
+                response_done.set()
+
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    await app(scope, receive, send)
+    elapsed = time.perf_counter() - start
+    assert totals["status"] == 200
+    n_bytes, n_lines = totals["bytes"], totals["lines"]
+    peak = None
+    if trace_memory:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return elapsed, n_lines, n_bytes, peak
+
+async def main(n_items: int, fmt: str, trace_memory: bool):
+    seed(n_items)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        credentials = {"email": "bench.export@example.com", "password": "benchpassword"}
+        await client.post(f"{API}/auth/register", json=credentials)
+        login = await client.post(f"{API}/auth/login", data={"username": credentials["email"], "password": credentials["password"]})
+        headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+
+        print(f"GET /orders/export?format={fmt}, {n_items} order items, batch size {settings.ORDER_EXPORT_BATCH_SIZE}")
+        ranges = (
+            ("full year", {"periodo_inicio": START.isoformat(), "periodo_fim": (START + timedelta(days=366)).isoformat()}),
+            ("one month", {"periodo_inicio": START.isoformat(), "periodo_fim": (START + timedelta(days=31)).isoformat()}),
+        )
+        for name, params in ranges:
+            elapsed, n_lines, n_bytes, peak = await export(headers, {**params, "format": fmt}, trace_memory)
+            line = f"  {name:<10} {n_lines:>9} lines  {n_bytes / 1024 / 1024:7.1f} MiB  {elapsed:6.2f}s  {n_lines / elapsed:>9,.0f} rows/s"
+            if peak is not None:
+                line += f"  peak traced {peak / 1024 / 1024:.1f} MiB"
+            print(line)
+    print(f"peak RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MiB")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=1_000_000)
+    parser.add_argument("--format", choices=("csv", "ndjson"), default="csv")
+    parser.add_argument("--trace-memory", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(main(args.items, args.format, args.trace_memory))
@@ -0,0 +1,61 @@
+"""
+GET /orders payload size and latency with ?fields=, ?expand= and compact mode.
+
+Seeds a throwaway SQLite database like bench_order_serialization (--orders
+orders of --items items, 200 products, 100 clients), then requests pages of
+--limit orders over httpx's ASGI transport in each variant below and prints
+the body size and median latency, relative to the full response.
+
+    python -m benchmarks.bench_order_projection --limit 20 --limit 100
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from benchmarks.bench_order_serialization import seed  # Sets up the throwaway database first
+import httpx  # noqa: E402
+from app.core.config import settings  # noqa: E402
+from app.main import app  # noqa: E402
+
+VARIANTS = {
+    "full (default)": {},
+    "compact": {"compact": "true"},
+    "no expansion": {"expand": ""},
+    "list screen": {"fields": "id,status,total_value,created_at,client.name"},
+    "items, no products": {"fields": "id,status,items.product_id,items.quantity"},
+    "compact, 2 product fields": {"compact": "true", "fields": "id,status,items.quantity,items.product.description,items.product.sale_value"},
+}
+
+async def run(limits, repeat: int):
+    api = settings.API_V1_STR
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        credentials = {"email": "bench.projection@example.com", "password": "benchpassword"}
+        await client.post(f"{api}/auth/register", json=credentials)
+        login = await client.post(f"{api}/auth/login", data={"username": credentials["email"], "password": credentials["password"]})
+        headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+
+        for limit in limits:
+            print(f"page of {limit} orders")
+            baseline = None
+            for name, params in VARIANTS.items():
+                params = {**params, "limit": limit}
+                times = []
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    response = await client.get(f"{api}/orders/", params=params, headers=headers)
+                    times.append(time.perf_counter() - start)
+                    assert response.status_code == 200, response.text
+                size, median = len(response.content), statistics.median(times)
+                baseline = baseline or (size, median)
+                print(f"  {name:28} {size:9d} bytes ({size / baseline[0]:6.1%})  {median * 1000:7.2f} ms ({median / baseline[1]:6.1%})")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=2000)
+    parser.add_argument("--items", type=int, default=5)
+    parser.add_argument("--limit", type=int, action="append", help="Page size (repeatable; default 20 and 100)")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+    seed(args.orders, args.items)
+    asyncio.run(run(args.limit or [20, 100], args.repeat))
@@ -0,0 +1,146 @@
+"""
+Order section filter (secao_produto): JOIN + DISTINCT vs EXISTS vs bitmap.
+
+Seeds a throwaway SQLite database with --orders orders (3 items each) over
+products spread across 40 sections with a skewed popularity (the first
+sections are in most orders, the last ones in a handful), then runs one page
+(limit 20) of GET /orders filters three ways:
+
+  join+distinct  the previous statement: orders JOIN order_items JOIN products
+                 (JOIN sections here, as products only hold section_id now)
+                 filtered by name, then DISTINCT
+  exists         services.order.get_orders: section ids resolved on the
+                 sections table, then a correlated EXISTS per order
+  bitmap         get_orders with ORDER_SECTION_BITMAP_FILTER (orders.section_bits)
+
+printing the query plan of each and the median latency.
+
+    python -m benchmarks.bench_order_section_filter --orders 200000
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_sections.db')}")
+
+from sqlalchemy import insert, select  # noqa: E402
+from app import models  # noqa: E402
+from app.core.config import settings  # noqa: E402
+from app.database import Base, SessionLocal, engine  # noqa: E402
+from app.services import order as order_service  # noqa: E402
+from app.services import section as section_service  # noqa: E402
+
+N_SECTIONS = 40
+N_PRODUCTS = 4000
+START = datetime(2024, 1, 1)
+
+def seed(n_orders: int):
+    Base.metadata.create_all(bind=engine)
+    rng = random.Random(42)
+    # Zipf-like popularity: section k is picked with weight 1 / k^2
+    weights = [1 / (k + 1) ** 2 for k in range(N_SECTIONS)]
+    product_sections = [rng.choices(range(1, N_SECTIONS + 1), weights)[0] for _ in range(N_PRODUCTS)]
+    with engine.begin() as conn:
+        conn.execute(insert(models.Section), [{"id": i + 1, "name": f"Section {i:02d}"} for i in range(N_SECTIONS)])
+        conn.execute(insert(models.Client), [{"name": f"Bench Client {i}", "email": f"bench{i}@example.com", "cpf": f"{i:011d}"} for i in range(1000)])
+        conn.execute(insert(models.Product), [
+            {"id": i + 1, "description": f"Bench Product {i}", "sale_value": 9.99, "section_id": section_id, "initial_stock": 0, "current_stock": 0}
+            for i, section_id in enumerate(product_sections)
+        ])
+        for start in range(0, n_orders, 10_000):
+            orders, items = [], []
+            for order_id in range(start + 1, min(start + 10_000, n_orders) + 1):
+                product_ids = [rng.randrange(N_PRODUCTS) + 1 for _ in range(3)]
+                orders.append({
+                    "id": order_id, "client_id": order_id % 1000 + 1, "status": "delivered", "total_value": 29.97,
+                    "created_at": START + timedelta(seconds=order_id * 365 * 86400 // n_orders),
+                    "section_bits": section_service.section_bits(product_sections[p - 1] for p in product_ids),
+                })
+                items += [{"order_id": order_id, "product_id": p, "quantity": 1, "unit_price": 9.99} for p in product_ids]
+            conn.execute(insert(models.Order), orders)
+            conn.execute(insert(models.OrderItem), items)
+        conn.exec_driver_sql("ANALYZE")
+
+def join_distinct(db, product_section, client_id=None, start_date=None, end_date=None, limit=20):
+    query = (
+        db.query(models.Order).options(*order_service.ORDER_LOAD_OPTIONS)
+        .join(models.OrderItem).join(models.Product).join(models.Section)
+        .filter(models.Section.name.ilike(f"%{product_section}%"))
+    )
+    if client_id is not None:
+        query = query.filter(models.Order.client_id == client_id)
+    if start_date:
+        query = query.filter(models.Order.created_at >= start_date)
+    if end_date:
+        query = query.filter(models.Order.created_at <= end_date)
+    return query.distinct().order_by(models.Order.id).limit(limit).all()
+
+def with_exists(db, limit=20, **filters):
+    settings.ORDER_SECTION_BITMAP_FILTER = False
+    return order_service.get_orders(db, limit=limit, **filters)
+
+def with_bitmap(db, limit=20, **filters):
+    settings.ORDER_SECTION_BITMAP_FILTER = True
+    try:
+        return order_service.get_orders(db, limit=limit, **filters)
+    finally:
+        settings.ORDER_SECTION_BITMAP_FILTER = False
+
+def main(n_orders: int, runs: int):
+    start = time.perf_counter()
+    seed(n_orders)
+    print(f"seeded {n_orders} orders ({3 * n_orders} items, {N_SECTIONS} sections) in {time.perf_counter() - start:.1f}s")
+    cases = {
+        "common section": dict(product_section="Section 00"),
+        "mid section": dict(product_section="Section 05"),
+        "rare section": dict(product_section="Section 39"),
+        "partial match (3x)": dict(product_section="Section 1"),
+        "client + section": dict(client_id=7, product_section="Section 03"),
+        "one week + section": dict(product_section="Section 02", start_date=START + timedelta(days=100), end_date=START + timedelta(days=107)),
+    }
+    variants = {"join+distinct": join_distinct, "exists": with_exists, "bitmap": with_bitmap}
+    with SessionLocal() as db:
+        print(f"{'filter':<22}" + "".join(f"{name:>16}" for name in variants) + "   (median ms, limit 20)")
+        for case, filters in cases.items():
+            results = {}
+            row = f"{case:<22}"
+            for name, run in variants.items():
+                samples = []
+                for _ in range(runs):
+                    db.expunge_all()
+                    t0 = time.perf_counter()
+                    orders = run(db, **filters)
+                    samples.append((time.perf_counter() - t0) * 1000)
+                results[name] = [order.id for order in orders]
+                row += f"{statistics.median(samples):>16.2f}"
+            assert results["exists"] == results["join+distinct"] == results["bitmap"], f"{case}: variants disagree"
+            print(row)
+
+        # Plans of the main statement (first one get_orders runs after the section lookup)
+        statements = {
+            "join+distinct": db.query(models.Order).join(models.OrderItem).join(models.Product).join(models.Section)
+                .filter(models.Section.name.ilike("%Section 05%")).distinct().order_by(models.Order.id).limit(20),
+        }
+        section_ids = section_service.matching_section_ids(db, "Section 05")
+        for name, bitmap in (("exists", False), ("bitmap", True)):
+            settings.ORDER_SECTION_BITMAP_FILTER = bitmap
+            statements[name] = select(models.Order).where(section_service.order_has_sections(section_ids)).order_by(models.Order.id).limit(20)
+        settings.ORDER_SECTION_BITMAP_FILTER = False
+        for name, statement in statements.items():
+            if hasattr(statement, "statement"):
+                statement = statement.statement
+            compiled = statement.compile(engine, compile_kwargs={"literal_binds": True})
+            print(f"\n{name}:")
+            for row in db.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}"):
+                print(f"  {row[-1]}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=200_000)
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+    main(args.orders, args.runs)
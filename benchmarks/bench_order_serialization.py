@@ -0,0 +1,130 @@
+"""
+GET /orders serialization: ORM objects through response_model vs the row fast path.
+
+Seeds a throwaway SQLite database with --orders orders of --items items each
+(200 products, 100 clients), then, for a page of --limit orders:
+
+  response_model  services.order.get_orders (ORM, selectinload), then what
+                  FastAPI does for response_model=List[schemas.Order]:
+                  validate every object (from_attributes) and dump it to JSON
+  fast path       services.order.get_order_dicts (row tuples to dicts), then
+                  fast_json.encode
+
+Prints the median time of the query and serialization halves of each. Before
+timing, checks that GET /orders returns exactly the bytes of a plain FastAPI
+route declared with response_model=List[schemas.Order].
+
+    python -m benchmarks.bench_order_serialization --orders 2000 --items 5 --limit 100
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+from typing import List
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_order_serialization.db')}")
+
+import httpx  # noqa: E402
+from fastapi import Depends, FastAPI  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+from app import models, schemas  # noqa: E402
+from app.core import fast_json  # noqa: E402
+from app.core.config import settings  # noqa: E402
+from app.database import Base, SessionLocal, engine, get_db  # noqa: E402
+from app.main import app  # noqa: E402
+from app.services import order as order_service  # noqa: E402
+
+N_PRODUCTS = 200
+N_CLIENTS = 100
+
+def seed(n_orders: int, n_items: int):
+    rng = random.Random(42)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(insert(models.Section), [{"id": i + 1, "name": f"Section {i}"} for i in range(10)])
+        conn.execute(insert(models.Client), [
+            {"name": f"Bench Client {i}", "email": f"bench{i}@example.com", "cpf": f"{i:011d}", "phone": "11999990000", "address": f"Rua Bench, {i}"}
+            for i in range(N_CLIENTS)
+        ])
+        conn.execute(insert(models.Product), [
+            {"description": f"Bench Product {i}", "sale_value": 9.99, "barcode": f"789{i:010d}", "section_id": i % 10 + 1,
+             "initial_stock": 1_000_000, "current_stock": 1_000_000, "image_urls": f"https://img.example.com/{i}.jpg"}
+            for i in range(N_PRODUCTS)
+        ])
+        conn.execute(insert(models.Order), [
+            {"id": i + 1, "client_id": rng.randrange(N_CLIENTS) + 1, "status": models.OrderStatus.PENDING, "total_value": 9.99 * n_items}
+            for i in range(n_orders)
+        ])
+        conn.execute(insert(models.OrderItem), [
+            {"order_id": i + 1, "product_id": product_id, "quantity": 1, "unit_price": 9.99}
+            for i in range(n_orders) for product_id in rng.sample(range(1, N_PRODUCTS + 1), n_items)
+        ])
+
+# What GET /orders used to be: FastAPI validating and serializing ORM objects
+legacy = FastAPI()
+
+@legacy.get("/orders", response_model=List[schemas.Order])
+def legacy_orders(limit: int = 100, db=Depends(get_db)):
+    return order_service.get_orders(db, limit=limit)
+
+async def check_bytes(limit: int):
+    api = settings.API_V1_STR
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        credentials = {"email": "bench.serialization@example.com", "password": "benchpassword"}
+        await client.post(f"{api}/auth/register", json=credentials)
+        login = await client.post(f"{api}/auth/login", data={"username": credentials["email"], "password": credentials["password"]})
+        headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+        fast = await client.get(f"{api}/orders/", params={"limit": limit}, headers=headers)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=legacy), base_url="http://bench") as client:
+        reference = await client.get("/orders", params={"limit": limit})
+    assert fast.status_code == reference.status_code == 200
+    assert fast.content == reference.content, "GET /orders differs from the response_model output"
+    return len(fast.content)
+
+def median_ms(fn, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+def run(limit: int, repeat: int):
+    adapter = TypeAdapter(List[schemas.Order])
+    with SessionLocal() as db:
+        def orm_query():
+            db.expunge_all() # Each request starts with an empty identity map
+            return order_service.get_orders(db, limit=limit)
+        orm_orders = orm_query()
+        rows = order_service.get_order_dicts(db, limit=limit)
+        results = {
+            "response_model": (
+                median_ms(orm_query, repeat),
+                median_ms(lambda: adapter.dump_json(adapter.validate_python(orm_orders)), repeat),
+            ),
+            "fast path": (
+                median_ms(lambda: order_service.get_order_dicts(db, limit=limit), repeat),
+                median_ms(lambda: fast_json.encode(rows), repeat),
+            ),
+        }
+    base_total = sum(results["response_model"])
+    print(f"{'':16} {'query':>9} {'serialize':>10} {'total':>9}")
+    for name, (query_ms, serialize_ms) in results.items():
+        total = query_ms + serialize_ms
+        print(f"{name:16} {query_ms:7.2f}ms {serialize_ms:8.2f}ms {total:7.2f}ms  ({base_total / total:.1f}x)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=2000)
+    parser.add_argument("--items", type=int, default=5)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+    seed(args.orders, args.items)
+    size = asyncio.run(check_bytes(args.limit))
+    print(f"page of {args.limit} orders x {args.items} items: {size} bytes, identical to the response_model output")
+    run(args.limit, args.repeat)
@@ -0,0 +1,71 @@
+"""
+Offset vs keyset pagination on GET /orders.
+
+Seeds a throwaway SQLite database and times services.order.get_orders for the
+first and a deep page, once with skip/limit and once with a cursor.
+
+    python -m benchmarks.bench_pagination --orders 200000 --page 1000
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from app import models
+from app.core import pagination
+from app.database import Base
+from app.services import order as order_service
+
+def seed(engine, n_orders: int):
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(insert(models.Client), [{"name": "Bench Client", "email": "bench@example.com", "cpf": "00000000000"}])
+        batch = []
+        for _ in range(n_orders):
+            batch.append({"client_id": 1, "status": "pending", "total_value": 10})
+            if len(batch) == 10_000:
+                conn.execute(insert(models.Order), batch)
+                batch = []
+        if batch:
+            conn.execute(insert(models.Order), batch)
+
+def timed(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=200_000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--page", type=int, default=1000, help="Deep page number to compare against page 1")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "bench_pagination.db")
+    engine = create_engine(f"sqlite:///{path}")
+    seed(engine, args.orders)
+    db = sessionmaker(bind=engine)()
+
+    deep_skip = (args.page - 1) * args.limit
+    # The cursor a client would hold after walking to the deep page
+    deep_cursor = pagination.encode_cursor(deep_skip) if deep_skip else None
+
+    results = {
+        "offset page 1": timed(lambda: order_service.get_orders(db, skip=0, limit=args.limit), args.repeat),
+        f"offset page {args.page}": timed(lambda: order_service.get_orders(db, skip=deep_skip, limit=args.limit), args.repeat),
+        "cursor page 1": timed(lambda: order_service.get_orders(db, limit=args.limit), args.repeat),
+        f"cursor page {args.page}": timed(lambda: order_service.get_orders(db, limit=args.limit, cursor=deep_cursor), args.repeat),
+    }
+    print(f"{args.orders} orders, limit={args.limit}, median of {args.repeat} runs")
+    for name, ms in results.items():
+        print(f"  {name:<20} {ms:8.2f} ms")
+    db.close()
+
+if __name__ == "__main__":
+    main()
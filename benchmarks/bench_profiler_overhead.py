@@ -0,0 +1,94 @@
+"""
+Overhead of the sampling profiler (GET /admin/profile) on live traffic.
+
+Seeds a throwaway SQLite database with --products products, then requests
+the first page of GET /products (cache disabled) over httpx's ASGI
+transport, in rounds with the profiler stopped and sampling every
+--interval-ms (which goes first alternates). Prints the median latency of
+each, the measured slowdown and the overhead the profiler reported for
+itself, then the hottest leaf frames.
+
+    python -m benchmarks.bench_profiler_overhead --rounds 20 --interval-ms 5
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from collections import Counter
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_profiler_overhead.db')}")
+os.environ.setdefault("RESPONSE_CACHE_TTL_SECONDS", "0")
+
+import httpx  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+from app import models  # noqa: E402
+from app.core import profiler  # noqa: E402
+from app.core.config import settings  # noqa: E402
+from app.database import Base, engine  # noqa: E402
+from app.main import app  # noqa: E402
+
+def seed(n_products: int):
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(insert(models.Section), [{"id": i + 1, "name": f"Section {i}"} for i in range(10)])
+        conn.execute(insert(models.Product), [
+            {"description": f"Bench Product {i}", "sale_value": 9.99, "section_id": i % 10 + 1, "initial_stock": 100, "current_stock": 100}
+            for i in range(n_products)
+        ])
+
+async def run(rounds: int, requests: int, interval: float):
+    api = settings.API_V1_STR
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        credentials = {"email": "bench.profiler@example.com", "password": "benchpassword"}
+        await client.post(f"{api}/auth/register", json=credentials)
+        login = await client.post(f"{api}/auth/login", data={"username": credentials["email"], "password": credentials["password"]})
+        headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+
+        async def timed_round() -> list:
+            latencies = []
+            for _ in range(requests):
+                start = time.perf_counter()
+                response = await client.get(f"{api}/products/?limit=20", headers=headers)
+                latencies.append(time.perf_counter() - start)
+                assert response.status_code == 200, response.text
+            return latencies
+
+        await timed_round() # Warm up
+        samples = {False: [], True: []}
+        samplers = []
+        for round_number in range(rounds):
+            for profiled in ((False, True) if round_number % 2 else (True, False)):
+                sampler = profiler.SamplingProfiler(interval, max_overhead=settings.PROFILER_MAX_OVERHEAD)
+                if profiled:
+                    sampler.start()
+                    samplers.append(sampler)
+                samples[profiled].extend(await timed_round())
+                if profiled:
+                    sampler.stop()
+
+    off, on = statistics.median(samples[False]), statistics.median(samples[True])
+    ticks = sum(sampler.ticks for sampler in samplers)
+    sampling_seconds = sum(sampler.sampling_seconds for sampler in samplers)
+    stacks = sum((sampler.stacks for sampler in samplers), Counter())
+    print(f"GET /products, {rounds} x {requests} requests per setting, sampling every {interval * 1000:g} ms")
+    print(f"  profiler off  median {off * 1000:7.3f} ms")
+    print(f"  profiler on   median {on * 1000:7.3f} ms  ({(on - off) / off:+.2%})")
+    print(f"  self-reported overhead {sampling_seconds / sum(sampler.duration for sampler in samplers):.2%} ({ticks} ticks, {sampling_seconds * 1e6 / max(1, ticks):.1f} us per tick)")
+    print("hottest leaf frames:")
+    leaves = Counter()
+    for stack, count in stacks.items():
+        leaves[stack[-1][0]] += count
+    for name, count in leaves.most_common(5):
+        print(f"  {count:6d}  {name}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--interval-ms", type=float, default=5.0)
+    args = parser.parse_args()
+    seed(args.products)
+    asyncio.run(run(args.rounds, args.requests, args.interval_ms / 1000))
@@ -0,0 +1,187 @@
+"""
+Synthetic data for the load tests: users, clients, products and orders with a
+realistic skew.
+
+- products: sections of skewed sizes, log-normal prices, descriptions built
+  from a small clothing vocabulary (so search and autocomplete have hits);
+- orders: 1-5 items; product popularity and client activity follow Zipf-like
+  laws (a few best sellers and regulars account for most orders); dates cover
+  the last year with growing volume; older orders are mostly delivered, recent
+  ones still pending or processing;
+- users: all with USER_PASSWORD (hashed once), the first one a superuser.
+
+Rows are inserted with multi-row INSERTs in chunks, then the sales report
+aggregates are rebuilt. Ids are assigned in popularity order: product 1 and
+client 1 are the most frequent ones.
+
+    DATABASE_URL=sqlite:///./loadtest.db python -m benchmarks.datagen --scale medium
+"""
+import argparse
+import itertools
+import math
+import random
+import time
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Dict, List
+
+from sqlalchemy import bindparam, func, insert, select, text, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from app import models
+from app.core import security
+from app.services import report as report_service
+from app.services import section as section_service
+
+@dataclass(frozen=True)
+class Scale:
+    users: int
+    clients: int
+    products: int
+    orders: int
+
+SCALES: Dict[str, Scale] = {
+    "tiny": Scale(users=10, clients=200, products=100, orders=1_000),
+    "small": Scale(users=50, clients=1_000, products=500, orders=10_000),
+    "medium": Scale(users=200, clients=10_000, products=5_000, orders=100_000),
+    "large": Scale(users=1_000, clients=100_000, products=20_000, orders=1_000_000),
+}
+
+USER_PASSWORD = "loadtest-password"
+DAYS = 365
+CHUNK_SIZE = 10_000
+
+SECTIONS = [
+    "Vestidos", "Blusas", "Calças", "Saias", "Camisetas", "Jaquetas", "Casacos", "Shorts",
+    "Macacões", "Lingerie", "Moda Praia", "Calçados", "Bolsas", "Acessórios", "Bijuterias",
+    "Cintos", "Lenços", "Óculos", "Infantil", "Plus Size",
+]
+ADJECTIVES = ["Floral", "Listrado", "Liso", "Estampado", "Básico", "Longo", "Curto", "Slim", "Oversize", "Bordado", "Plissado", "Jeans"]
+COLORS = ["Preto", "Branco", "Azul", "Vermelho", "Verde", "Rosa", "Bege", "Amarelo", "Cinza", "Marrom", "Vinho", "Lilás"]
+
+def zipf_weights(n: int, s: float = 1.1) -> List[float]:
+    # Cumulative weights of a Zipf law over ranks 1..n (for random.choices)
+    return list(itertools.accumulate(1 / (rank ** s) for rank in range(1, n + 1)))
+
+def _order_status(rng: random.Random, age_days: float) -> models.OrderStatus:
+    if rng.random() < 0.05:
+        return models.OrderStatus.CANCELLED
+    if age_days > 14:
+        return models.OrderStatus.DELIVERED if rng.random() < 0.95 else models.OrderStatus.SHIPPED
+    return rng.choice((models.OrderStatus.PENDING, models.OrderStatus.PROCESSING, models.OrderStatus.SHIPPED))
+
+def seed(engine: Engine, scale: Scale, seed: int = 42) -> None:
+    """Insert scale's rows into an empty database (tables must exist) and rebuild the reports."""
+    rng = random.Random(seed)
+    now = datetime.now().replace(microsecond=0)
+    hashed_password = security.get_password_hash(USER_PASSWORD)
+    with engine.begin() as conn:
+        conn.execute(insert(models.User), [
+            {"email": f"loadtest{i}@example.com", "hashed_password": hashed_password, "is_active": True, "is_superuser": i == 0}
+            for i in range(scale.users)
+        ])
+        conn.execute(insert(models.Section), [{"id": i + 1, "name": name} for i, name in enumerate(SECTIONS)])
+        for start in range(0, scale.clients, CHUNK_SIZE):
+            conn.execute(insert(models.Client), [
+                {"id": i + 1, "name": f"Cliente {i + 1}", "email": f"cliente{i + 1}@example.com", "cpf": f"{i + 1:011d}", "phone": f"1199{i:07d}"}
+                for i in range(start, min(start + CHUNK_SIZE, scale.clients))
+            ])
+
+        section_weights = zipf_weights(len(SECTIONS), s=0.8)
+        products = []
+        for i in range(scale.products):
+            section_id = rng.choices(range(1, len(SECTIONS) + 1), cum_weights=section_weights)[0]
+            price = Decimal(str(round(min(2000.0, math.exp(rng.gauss(4.3, 0.7))), 2))) # Median ~R$ 75
+            description = f"{SECTIONS[section_id - 1].rstrip('s')} {rng.choice(ADJECTIVES)} {rng.choice(COLORS)} {i + 1}"
+            products.append({
+                "id": i + 1, "description": description, "sale_value": price, "barcode": f"789{i + 1:010d}",
+                "section_id": section_id, "initial_stock": 1_000_000, "current_stock": 1_000_000,
+            })
+        for start in range(0, scale.products, CHUNK_SIZE):
+            conn.execute(insert(models.Product), products[start:start + CHUNK_SIZE])
+
+        product_weights = zipf_weights(scale.products)
+        client_weights = zipf_weights(scale.clients, s=0.8)
+        sold = [0] * (scale.products + 1)
+        item_id = 0
+        for start in range(0, scale.orders, CHUNK_SIZE):
+            orders, items = [], []
+            for order_id in range(start + 1, min(start + CHUNK_SIZE, scale.orders) + 1):
+                age_days = DAYS * (1 - math.sqrt(rng.random())) # Volume grows towards today
+                product_ids = set(rng.choices(range(1, scale.products + 1), cum_weights=product_weights, k=min(5, 1 + int(rng.expovariate(0.8)))))
+                total = Decimal("0.00")
+                for product_id in product_ids:
+                    quantity = 1 if rng.random() < 0.8 else rng.randint(2, 4)
+                    unit_price = products[product_id - 1]["sale_value"]
+                    total += unit_price * quantity
+                    sold[product_id] += quantity
+                    item_id += 1
+                    items.append({"id": item_id, "order_id": order_id, "product_id": product_id, "quantity": quantity, "unit_price": unit_price})
+                orders.append({
+                    "id": order_id,
+                    "client_id": rng.choices(range(1, scale.clients + 1), cum_weights=client_weights)[0],
+                    "status": _order_status(rng, age_days),
+                    "total_value": total,
+                    "section_bits": section_service.section_bits(products[product_id - 1]["section_id"] for product_id in product_ids),
+                    "created_at": now - timedelta(days=age_days),
+                })
+            conn.execute(insert(models.Order), orders)
+            conn.execute(insert(models.OrderItem), items)
+
+        # Stock left after the seeded sales
+        products_table = models.Product.__table__
+        decrement = update(products_table).where(products_table.c.id == bindparam("product_id")).values(current_stock=bindparam("stock"))
+        conn.execute(decrement, [{"product_id": product_id, "stock": 1_000_000 - sold[product_id]} for product_id in range(1, scale.products + 1) if sold[product_id]])
+
+        if conn.dialect.name == "postgresql":
+            # Explicit ids were inserted: move the sequences past them
+            for table in ("users", "clients", "sections", "products", "orders", "order_items"):
+                conn.execute(text(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT MAX(id) FROM {table}))"))
+        if conn.dialect.name == "sqlite":
+            conn.exec_driver_sql("ANALYZE")
+
+    with Session(engine) as db:
+        report_service.rebuild_reports(db)
+
+@dataclass(frozen=True)
+class Dataset:
+    # What the load test scenarios pick from (read back from the database)
+    user_emails: List[str]
+    client_ids: List[int] # Most active first
+    product_ids: List[int] # Best sellers first
+    sections: List[str]
+    first_day: date
+    last_day: date
+
+    @property
+    def search_terms(self) -> List[str]:
+        return [word.lower() for word in ADJECTIVES + COLORS] + [section.lower() for section in self.sections]
+
+def load_dataset(engine: Engine) -> Dataset:
+    with engine.connect() as conn:
+        first, last = conn.execute(select(func.min(models.Order.created_at), func.max(models.Order.created_at))).one()
+        return Dataset(
+            user_emails=list(conn.scalars(select(models.User.email).where(models.User.email.like("loadtest%")).order_by(models.User.id))),
+            client_ids=list(conn.scalars(select(models.Client.id).order_by(models.Client.id))),
+            product_ids=list(conn.scalars(select(models.Product.id).order_by(models.Product.id))),
+            sections=list(conn.scalars(select(models.Section.name).order_by(models.Section.id))),
+            first_day=(first or datetime.now()).date(),
+            last_day=(last or datetime.now()).date(),
+        )
+
+def is_seeded(engine: Engine) -> bool:
+    with engine.connect() as conn:
+        return conn.scalar(select(func.count()).select_from(models.User).where(models.User.email.like("loadtest%"))) > 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=SCALES, default="small")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    from app.database import Base, engine
+    Base.metadata.create_all(bind=engine)
+    start = time.perf_counter()
+    seed(engine, SCALES[args.scale], args.seed)
+    print(f"seeded {args.scale} ({SCALES[args.scale]}) into {engine.url} in {time.perf_counter() - start:.1f}s")
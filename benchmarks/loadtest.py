@@ -0,0 +1,309 @@
+"""
+Load-testing suite: scenario scripts against the whole API, with latency
+percentiles and throughput per endpoint, saved as a baseline to compare later runs.
+
+Seeds a throwaway SQLite database with benchmarks.datagen (or uses DATABASE_URL
+as is when it already holds the generated data), then runs each scenario with
+--concurrency virtual users for --iterations iterations (after --warmup
+unrecorded ones):
+
+  login      POST /auth/login with a random user, then GET /auth/users/me
+  catalog    product list pages and section filter, product detail (popular
+             products more often), search, autocomplete
+  orders     POST /orders (1-3 popular products), then GET /orders/{id}
+  reporting  sales reports, order listing filters, one week of CSV export
+
+Requests run in-process over httpx's ASGI transport (--driver asgi, default) or
+over HTTP to a uvicorn server started in a background thread (--driver uvicorn).
+No external services are needed.
+
+    python -m benchmarks.loadtest --scale small --save baseline.json
+    python -m benchmarks.loadtest --scale small --compare baseline.json
+
+--compare prints the change per endpoint and exits with status 1 when an
+endpoint's p95 latency grew, or its throughput dropped, by more than --tolerance.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, List, Optional
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'loadtest.db')}")
+
+import httpx  # noqa: E402
+from app.core.config import settings  # noqa: E402
+from app.database import Base, engine  # noqa: E402
+from app.main import app  # noqa: E402
+from benchmarks import datagen  # noqa: E402
+
+API = settings.API_V1_STR
+
+def percentile(samples: List[float], pct: float) -> float:
+    # Linear interpolation between the closest ranks
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    position = (len(ordered) - 1) * pct / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+class Recorder:
+    """Latency samples (ms) and error counts per endpoint label."""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+
+    async def request(self, client: httpx.AsyncClient, method: str, label: str, url: str, **kwargs) -> httpx.Response:
+        start = time.perf_counter()
+        response = await client.request(method, url, **kwargs)
+        await response.aread() # Streaming responses (export) count until the last byte
+        self.samples.setdefault(label, []).append((time.perf_counter() - start) * 1000)
+        if response.status_code >= 400:
+            self.errors[label] = self.errors.get(label, 0) + 1
+        return response
+
+    def summary(self, seconds: float) -> Dict[str, dict]:
+        return {
+            label: {
+                "requests": len(samples),
+                "errors": self.errors.get(label, 0),
+                "rps": round(len(samples) / seconds, 2),
+                "mean_ms": round(sum(samples) / len(samples), 3),
+                "p50_ms": round(percentile(samples, 50), 3),
+                "p95_ms": round(percentile(samples, 95), 3),
+                "p99_ms": round(percentile(samples, 99), 3),
+            }
+            for label, samples in self.samples.items()
+        }
+
+@dataclass
+class Context:
+    # Shared by the virtual users of a run
+    dataset: datagen.Dataset
+    headers: Dict[str, str]
+    rng: random.Random = field(default_factory=lambda: random.Random(7))
+    created_orders: List[int] = field(default_factory=list)
+
+    def popular_product(self) -> int:
+        return self.rng.choices(self.dataset.product_ids, cum_weights=self.product_weights)[0]
+
+    def active_client(self) -> int:
+        return self.rng.choices(self.dataset.client_ids, cum_weights=self.client_weights)[0]
+
+    def __post_init__(self):
+        self.product_weights = datagen.zipf_weights(len(self.dataset.product_ids))
+        self.client_weights = datagen.zipf_weights(len(self.dataset.client_ids), s=0.8)
+
+Scenario = Callable[[httpx.AsyncClient, Recorder, Context], Awaitable[None]]
+
+async def login_scenario(client: httpx.AsyncClient, recorder: Recorder, ctx: Context) -> None:
+    form = {"username": ctx.rng.choice(ctx.dataset.user_emails), "password": datagen.USER_PASSWORD}
+    response = await recorder.request(client, "POST", "POST /auth/login", f"{API}/auth/login", data=form)
+    if response.status_code == 200:
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        await recorder.request(client, "GET", "GET /auth/users/me", f"{API}/auth/users/me", headers=headers)
+
+async def catalog_scenario(client: httpx.AsyncClient, recorder: Recorder, ctx: Context) -> None:
+    rng, headers = ctx.rng, ctx.headers
+    page = min(int(rng.expovariate(0.5)), 20) # First pages far more often
+    await recorder.request(client, "GET", "GET /products/", f"{API}/products/", headers=headers, params={"skip": page * 20, "limit": 20})
+    await recorder.request(client, "GET", "GET /products/?categoria", f"{API}/products/", headers=headers,
+                           params={"categoria": rng.choice(ctx.dataset.sections), "disponibilidade": "true", "limit": 20})
+    for _ in range(3):
+        await recorder.request(client, "GET", "GET /products/{id}", f"{API}/products/{ctx.popular_product()}", headers=headers)
+    term = rng.choice(ctx.dataset.search_terms)
+    await recorder.request(client, "GET", "GET /products/search", f"{API}/products/search", headers=headers, params={"q": term})
+    await recorder.request(client, "GET", "GET /products/autocomplete", f"{API}/products/autocomplete", headers=headers, params={"q": term[:3]})
+
+async def orders_scenario(client: httpx.AsyncClient, recorder: Recorder, ctx: Context) -> None:
+    items = {}
+    for _ in range(ctx.rng.randint(1, 3)):
+        items[ctx.popular_product()] = ctx.rng.randint(1, 2)
+    payload = {"client_id": ctx.active_client(), "items": [{"product_id": p, "quantity": q} for p, q in items.items()]}
+    response = await recorder.request(client, "POST", "POST /orders/", f"{API}/orders/", headers=ctx.headers, json=payload)
+    if response.status_code == 201:
+        order_id = response.json()["id"]
+        ctx.created_orders.append(order_id)
+        await recorder.request(client, "GET", "GET /orders/{id}", f"{API}/orders/{order_id}", headers=ctx.headers)
+
+async def reporting_scenario(client: httpx.AsyncClient, recorder: Recorder, ctx: Context) -> None:
+    rng, headers, dataset = ctx.rng, ctx.headers, ctx.dataset
+    month_start = dataset.last_day - timedelta(days=30)
+    await recorder.request(client, "GET", "GET /reports/daily-revenue", f"{API}/reports/daily-revenue", headers=headers,
+                           params={"periodo_inicio": month_start.isoformat(), "periodo_fim": dataset.last_day.isoformat()})
+    await recorder.request(client, "GET", "GET /reports/products", f"{API}/reports/products", headers=headers, params={"limit": 50})
+    await recorder.request(client, "GET", "GET /reports/sections", f"{API}/reports/sections", headers=headers)
+    await recorder.request(client, "GET", "GET /orders/?cliente_id", f"{API}/orders/", headers=headers, params={"cliente_id": ctx.active_client(), "limit": 20})
+    await recorder.request(client, "GET", "GET /orders/?status", f"{API}/orders/", headers=headers, params={"status": "pending,processing", "limit": 50})
+    await recorder.request(client, "GET", "GET /orders/?secao_produto", f"{API}/orders/", headers=headers,
+                           params={"secao_produto": rng.choice(dataset.sections), "limit": 20})
+    week_start = dataset.first_day + timedelta(days=rng.randrange(max(1, (dataset.last_day - dataset.first_day).days - 7)))
+    await recorder.request(client, "GET", "GET /orders/export", f"{API}/orders/export", headers=headers,
+                           params={"periodo_inicio": week_start.isoformat(), "periodo_fim": (week_start + timedelta(days=7)).isoformat()})
+
+SCENARIOS: Dict[str, Scenario] = {
+    "login": login_scenario,
+    "catalog": catalog_scenario,
+    "orders": orders_scenario,
+    "reporting": reporting_scenario,
+}
+
+async def run_scenario(client: httpx.AsyncClient, scenario: Scenario, ctx: Context, iterations: int, concurrency: int, warmup: int) -> Dict[str, dict]:
+    """Run `iterations` scenario iterations spread over `concurrency` virtual users."""
+    warmup_recorder = Recorder()
+    for _ in range(warmup):
+        await scenario(client, warmup_recorder, ctx)
+
+    recorder = Recorder()
+    remaining = iterations
+
+    async def virtual_user():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            await scenario(client, recorder, ctx)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(virtual_user() for _ in range(concurrency)))
+    return recorder.summary(time.perf_counter() - start)
+
+@asynccontextmanager
+async def asgi_client():
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://loadtest", timeout=60) as client:
+        yield client
+
+@asynccontextmanager
+async def uvicorn_client():
+    # A real server (HTTP parsing, lifespan, socket I/O) on a free local port,
+    # in its own thread and event loop
+    import uvicorn
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, log_level="warning", access_log=False))
+    thread = threading.Thread(target=server.run, kwargs={"sockets": [sock]}, daemon=True)
+    thread.start()
+    while not server.started:
+        if not thread.is_alive():
+            raise RuntimeError("uvicorn failed to start")
+        await asyncio.sleep(0.01)
+    try:
+        limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=60, limits=limits) as client:
+            yield client
+    finally:
+        server.should_exit = True
+        thread.join()
+        sock.close()
+
+DRIVERS = {"asgi": asgi_client, "uvicorn": uvicorn_client}
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+async def run(args) -> dict:
+    dataset = datagen.load_dataset(engine)
+    results = {}
+    async with DRIVERS[args.driver]() as client:
+        login = await client.post(f"{API}/auth/login", data={"username": dataset.user_emails[0], "password": datagen.USER_PASSWORD})
+        ctx = Context(dataset=dataset, headers={"Authorization": f"Bearer {login.json()['access_token']}"})
+        for name in args.scenarios:
+            results[name] = await run_scenario(client, SCENARIOS[name], ctx, args.iterations, args.concurrency, args.warmup)
+            print_scenario(name, results[name])
+    return {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "git_revision": _git_revision(),
+            "scale": args.scale,
+            "driver": args.driver,
+            "database": engine.dialect.name,
+            "async_mode": settings.DATABASE_ASYNC_MODE,
+            "iterations": args.iterations,
+            "concurrency": args.concurrency,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "results": results,
+    }
+
+def print_scenario(name: str, endpoints: Dict[str, dict]) -> None:
+    print(f"\n[{name}]")
+    print(f"  {'endpoint':<30}{'requests':>9}{'errors':>8}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for label, stats in endpoints.items():
+        print(f"  {label:<30}{stats['requests']:>9}{stats['errors']:>8}{stats['rps']:>9.1f}"
+              f"{stats['p50_ms']:>9.2f}{stats['p95_ms']:>9.2f}{stats['p99_ms']:>9.2f}")
+
+def compare(baseline: dict, current: dict, tolerance: float) -> List[str]:
+    """Print the change per endpoint against the baseline; returns the regressions."""
+    regressions = []
+    print(f"\nCompared with the baseline from {baseline['meta'].get('created_at')} (revision {baseline['meta'].get('git_revision')}):")
+    for key in ("scale", "driver", "database", "async_mode", "iterations", "concurrency", "platform"):
+        if baseline["meta"].get(key) != current["meta"][key]:
+            print(f"  warning: {key} differs ({baseline['meta'].get(key)} -> {current['meta'][key]}), numbers may not be comparable")
+    print(f"  {'endpoint':<40}{'p50':>17}{'p95':>17}{'req/s':>17}")
+    for scenario, endpoints in current["results"].items():
+        for label, stats in endpoints.items():
+            before = baseline["results"].get(scenario, {}).get(label)
+            if before is None:
+                continue
+            changes = {metric: (stats[metric] - before[metric]) / before[metric] if before[metric] else 0.0 for metric in ("p50_ms", "p95_ms", "rps")}
+            flag = ""
+            if changes["p95_ms"] > tolerance or changes["rps"] < -tolerance:
+                flag = "  REGRESSION"
+                regressions.append(f"{scenario}: {label}")
+            print(f"  {scenario + ': ' + label:<40}"
+                  + "".join(f"{stats[metric]:>9.2f} ({changes[metric]:+.0%})" for metric in ("p50_ms", "p95_ms", "rps")) + flag)
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=datagen.SCALES, default="small", help="Data volume seeded into an empty database")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--driver", choices=DRIVERS, default="asgi")
+    parser.add_argument("--iterations", type=int, default=200, help="Scenario iterations measured, per scenario")
+    parser.add_argument("--concurrency", type=int, default=10, help="Virtual users")
+    parser.add_argument("--warmup", type=int, default=5, help="Unmeasured iterations before each scenario")
+    parser.add_argument("--save", metavar="JSON", help="Write the results as a baseline file")
+    parser.add_argument("--compare", metavar="JSON", help="Compare with a baseline file")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed p95 growth / throughput drop (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    if "sqlite" in str(engine.url):
+        Base.metadata.create_all(bind=engine)
+    if not datagen.is_seeded(engine):
+        start = time.perf_counter()
+        datagen.seed(engine, datagen.SCALES[args.scale])
+        print(f"seeded {args.scale} ({datagen.SCALES[args.scale]}) in {time.perf_counter() - start:.1f}s")
+    report = asyncio.run(run(args))
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nbaseline written to {args.save}")
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), report, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}: " + ", ".join(regressions))
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,13 @@
 import pytest
+from contextlib import contextmanager
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, Session # Import Session here
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.pool import NullPool, StaticPool
 from app.main import app
-from app.database import Base, get_db
+from app.database import Base, get_async_db, get_async_read_db, get_db, get_read_db
+from app.core import request_timing
 from app.core.config import settings
 import os
 from decimal import Decimal # Added Decimal import
@@ -19,7 +22,8 @@ engine = create_engine(
 )
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-# Create tables before tests run
+# Create tables before tests run (recreated so a stale test DB never lags the models)
+Base.metadata.drop_all(bind=engine)
 Base.metadata.create_all(bind=engine)
 
 # Dependency override for test database session
@@ -31,6 +35,25 @@ def override_get_db():
         db.close()
 
 app.dependency_overrides[get_db] = override_get_db
+app.dependency_overrides[get_read_db] = override_get_db # No replicas in tests: reads use the same DB
+
+# Async mode (DATABASE_ASYNC_MODE=true pytest): the same suite runs through
+# AsyncSession on the same SQLite file. NullPool because every TestClient runs
+# its own event loop and aiosqlite connections shouldn't outlive it.
+async_engine = None
+if settings.DATABASE_ASYNC_MODE:
+    async_engine = create_async_engine("sqlite+aiosqlite:///./test_db.db", poolclass=NullPool)
+    TestingAsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+    async def override_get_async_db():
+        async with TestingAsyncSessionLocal() as db:
+            yield db
+
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    app.dependency_overrides[get_async_read_db] = override_get_async_db
+
+# Engine whose statements the API actually runs in the current mode
+api_engine = async_engine.sync_engine if async_engine is not None else engine
 
 @pytest.fixture(scope="session", autouse=True)
 def cleanup_db():
@@ -62,6 +85,35 @@ def db() -> Session:
     transaction.rollback()
     connection.close()
 
+@pytest.fixture
+def count_queries():
+    """Context manager that counts SQL statements executed on the test engine."""
+    @contextmanager
+    def _count():
+        statements = []
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+        event.listen(api_engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(api_engine, "before_cursor_execute", before_cursor_execute)
+    return _count
+
+@pytest.fixture
+def timed_queries():
+    """Request timing hooks on the engine the API uses in tests (app.database only instruments its own)."""
+    listeners = {
+        "before_cursor_execute": request_timing._before_cursor_execute,
+        "after_cursor_execute": request_timing._after_cursor_execute,
+        "handle_error": request_timing._handle_error,
+    }
+    for name, listener in listeners.items():
+        event.listen(api_engine, name, listener)
+    yield
+    for name, listener in listeners.items():
+        event.remove(api_engine, name, listener)
+
 # You might want fixtures to create test users (regular and superuser)
 @pytest.fixture(scope="module")
 def test_user_password() -> str:
@@ -78,10 +130,11 @@ def test_user(client: TestClient, test_user_password) -> dict:
     response = client.post(f"{settings.API_V1_STR}/auth/register", json=user_data)
     # Handle potential conflict if user already exists from previous runs
     if response.status_code == 400 and "Email already registered" in response.text:
-        # If user already exists, just return its email for login
-        # Tests depending on the full user object might need adjustment
+        # If user already exists (e.g. created by another test module), log in to fetch its data
         print(f"Test user {user_data['email']} already exists, proceeding...") # Corrected f-string
-        return {"email": user_data["email"], "id": -1} # Return dummy ID or fetch actual ID if needed
+        login = client.post(f"{settings.API_V1_STR}/auth/login", data={"username": user_data["email"], "password": test_user_password})
+        me = client.get(f"{settings.API_V1_STR}/auth/users/me", headers={"Authorization": f"Bearer {login.json()['access_token']}"})
+        return me.json()
     assert response.status_code == 201, f"Failed to create test user: {response.text}"
     return response.json() # Returns the created user data (excluding password)
 
@@ -0,0 +1,253 @@
+import json
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event, exc, text
+from sqlalchemy.orm import sessionmaker
+from app.core import metrics, profiler, request_timing
+from app.core.config import settings
+from app.core.pool_metrics import InstrumentedQueuePool, PoolMetrics, instrument_engine
+from app.core.replicas import Replica, ReplicaRouter
+import logging
+import pytest
+import threading
+
+# Test pool metrics endpoint
+def test_read_pool_metrics(client: TestClient, superuser_token_headers):
+    response = client.get(f"{settings.API_V1_STR}/admin/db/pool", headers=superuser_token_headers)
+    assert response.status_code == 200
+    primary = response.json()["primary"]
+    assert primary["pool_class"] == "InstrumentedQueuePool"
+    for key in ("size", "checked_out", "idle", "checkouts", "timeouts", "connection_errors", "avg_checkout_wait_ms"):
+        assert key in primary
+
+def test_read_pool_metrics_forbidden(client: TestClient, user_token_headers):
+    response = client.get(f"{settings.API_V1_STR}/admin/db/pool", headers=user_token_headers)
+    assert response.status_code == 403
+
+def test_pool_exhaustion_is_detected(tmp_path, caplog):
+    pool_engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=InstrumentedQueuePool, pool_size=1, max_overflow=0, pool_timeout=0.1,
+    )
+    metrics = instrument_engine(pool_engine, PoolMetrics("test"))
+
+    held = pool_engine.connect()
+    assert metrics.snapshot()["checked_out"] == 1
+    with caplog.at_level(logging.WARNING, logger="app.core.pool_metrics"):
+        with pytest.raises(exc.TimeoutError):
+            pool_engine.connect()
+    held.close()
+
+    snapshot = metrics.snapshot()
+    assert snapshot["timeouts"] == 1
+    assert snapshot["checkouts"] == 1
+    assert snapshot["checked_out"] == 0
+    assert snapshot["idle"] == 1
+    assert snapshot["last_exhausted_at"] is not None
+    assert any("exhausted" in record.message for record in caplog.records)
+    assert any("saturated" in record.message for record in caplog.records)
+    pool_engine.dispose()
+
+def _replica(name, url):
+    replica_engine = create_engine(url, connect_args={"check_same_thread": False})
+    return Replica(name=name, engine=replica_engine, session_factory=sessionmaker(bind=replica_engine))
+
+def _marker(session):
+    return session.execute(text("SELECT name FROM marker")).scalar()
+
+def _make_marker_db(path, name):
+    marker_engine = create_engine(f"sqlite:///{path}")
+    with marker_engine.begin() as conn:
+        conn.execute(text("CREATE TABLE marker (name TEXT)"))
+        conn.execute(text("INSERT INTO marker VALUES (:name)"), {"name": name})
+    marker_engine.dispose()
+    return f"sqlite:///{path}"
+
+# Test read routing with SQLite files standing in for primary and replicas
+def test_replica_router_round_robin(tmp_path):
+    primary_url = _make_marker_db(tmp_path / "primary.db", "primary")
+    router = ReplicaRouter(
+        sessionmaker(bind=create_engine(primary_url)),
+        [_replica(name, _make_marker_db(tmp_path / f"{name}.db", name)) for name in ("replica_0", "replica_1")],
+    )
+    served = []
+    for _ in range(4):
+        with router.read_session_factory()() as session:
+            served.append(_marker(session))
+    assert served == ["replica_0", "replica_1", "replica_0", "replica_1"]
+    assert router.status()["primary_fallbacks"] == 0
+
+def test_replica_router_falls_back_and_recovers(tmp_path):
+    primary_url = _make_marker_db(tmp_path / "primary.db", "primary")
+    missing_dir = tmp_path / "replica"
+    broken = _replica("replica_0", f"sqlite:///{missing_dir / 'replica.db'}")
+    router = ReplicaRouter(sessionmaker(bind=create_engine(primary_url)), [broken], retry_interval=3600)
+
+    # The first read fails on the replica and marks it unhealthy
+    with pytest.raises(exc.OperationalError):
+        with router.read_session_factory()() as session:
+            _marker(session)
+    assert not broken.healthy
+    assert router.status()["replicas"][0]["last_error"]
+
+    # Further reads go to the primary without touching the replica
+    with router.read_session_factory()() as session:
+        assert _marker(session) == "primary"
+    assert router.status()["primary_fallbacks"] == 1
+
+    # Once the replica is reachable and the retry interval has passed, a probe brings it back
+    missing_dir.mkdir()
+    _make_marker_db(missing_dir / "replica.db", "replica_0")
+    router.retry_interval = 0
+    with router.read_session_factory()() as session:
+        assert _marker(session) == "replica_0"
+    assert broken.healthy
+
+def test_read_replica_status(client: TestClient, superuser_token_headers):
+    response = client.get(f"{settings.API_V1_STR}/admin/db/replicas", headers=superuser_token_headers)
+    assert response.status_code == 200
+    assert response.json() == {"primary_fallbacks": 0, "replicas": []}
+
+def test_request_timing(client: TestClient, user_token_headers, timed_queries, caplog, monkeypatch):
+    monkeypatch.setattr(settings, "SLOW_QUERY_MS", 0.000001) # Every statement is "slow"
+    with caplog.at_level(logging.INFO, logger="app.core.request_timing"):
+        response = client.get(f"{settings.API_V1_STR}/clients/?limit=5", headers=user_token_headers)
+    assert response.status_code == 200
+
+    metrics = {}
+    for entry in response.headers["server-timing"].split(", "):
+        name, *params = entry.split(";")
+        metrics[name] = dict(param.split("=", 1) for param in params)
+    assert set(metrics) == {"db", "serialize", "handler", "total"}
+    queries = int(metrics["db"]["desc"].strip('"').split()[0])
+    assert queries >= 1 # The clients page (the current user may come from the principal cache)
+
+    records = [json.loads(record.getMessage()) for record in caplog.records if record.name == "app.core.request_timing"]
+    [request] = [record for record in records if record["event"] == "request"]
+    assert request["endpoint"] == "read_clients" and request["status"] == 200
+    assert request["db_queries"] == queries
+    assert request["db_ms"] + request["serialize_ms"] <= request["duration_ms"]
+    slow = [record for record in records if record["event"] == "slow_query"]
+    assert len(slow) == queries
+    assert all(record["request"] == f"GET {settings.API_V1_STR}/clients/" for record in slow)
+
+def test_normalize_sql():
+    statement = "SELECT a.id, t.col_1 FROM t\n  WHERE a.id IN (?, ?, ?) AND name = 'o''k' AND v > 10.5 AND c = :param_1 AND d::text = %(p)s LIMIT 20"
+    assert request_timing.normalize_sql(statement) == (
+        "SELECT a.id, t.col_1 FROM t WHERE a.id IN (?, ...) AND name = ? AND v > ? AND c = ? AND d::text = ? LIMIT ?"
+    )
+
+def _sample(text: str, name: str, **labels) -> float:
+    # Value of one series in the exposition text (0 when absent)
+    label_string = ",".join(f'{key}="{value}"' for key, value in labels.items())
+    series = f"{name}{{{label_string}}}" if labels else name
+    for line in text.splitlines():
+        if line.startswith(series + " "):
+            return float(line.rsplit(" ", 1)[1])
+    return 0.0
+
+def test_metrics(client: TestClient, user_token_headers, test_client_data, test_product_data):
+    api = settings.API_V1_STR
+    product_id = test_product_data["id"]
+    orders = lambda outcome: metrics.orders_created.value(outcome)
+    before = {outcome: orders(outcome) for outcome in ("success", "insufficient_stock", "missing_product", "missing_client")}
+    bad_credentials = metrics.auth_failures.value("bad_credentials")
+
+    assert client.get(f"{api}/products/{product_id}", headers=user_token_headers).status_code == 200
+    assert client.get("/no/such/path").status_code == 404
+    order = lambda client_id, product, quantity: {"client_id": client_id, "items": [{"product_id": product, "quantity": quantity}]}
+    assert client.post(f"{api}/orders/", headers=user_token_headers, json=order(test_client_data["id"], product_id, 1)).status_code == 201
+    assert client.post(f"{api}/orders/", headers=user_token_headers, json=order(test_client_data["id"], product_id, 10**6)).status_code == 400
+    assert client.post(f"{api}/orders/", headers=user_token_headers, json=order(test_client_data["id"], 999999, 1)).status_code == 404
+    assert client.post(f"{api}/orders/", headers=user_token_headers, json=order(999999, product_id, 1)).status_code == 404
+    assert client.post(f"{api}/auth/login", data={"username": "nobody@example.com", "password": "wrong"}).status_code == 401
+
+    assert {outcome: orders(outcome) - count for outcome, count in before.items()} == {
+        "success": 1, "insufficient_stock": 1, "missing_product": 1, "missing_client": 1,
+    }
+    assert metrics.auth_failures.value("bad_credentials") == bad_credentials + 1
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = response.text
+    assert "# TYPE http_request_duration_seconds histogram" in text
+    # Labelled by route template, never by the raw path
+    route = f"{api}/products/{{product_id}}"
+    count = _sample(text, "http_request_duration_seconds_count", method="GET", route=route, status="200")
+    assert count >= 1
+    assert _sample(text, "http_request_duration_seconds_bucket", method="GET", route=route, status="200", le="+Inf") == count
+    assert f'route="{api}/products/{product_id}"' not in text
+    assert _sample(text, "http_request_duration_seconds_count", method="GET", route="unmatched", status="404") >= 1
+    assert _sample(text, "http_requests_in_flight") == 1 # The scrape itself
+    assert _sample(text, "orders_created_total", outcome="success") == orders("success")
+    assert _sample(text, "auth_failures_total", reason="bad_credentials") >= 1
+    assert _sample(text, "db_pool_size", pool="primary") > 0
+
+def test_metrics_token(client: TestClient, monkeypatch):
+    monkeypatch.setattr(settings, "METRICS_TOKEN", "scrape-secret")
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer scrape-secret"}).status_code == 200
+
+def test_metrics_shards_of_exited_threads():
+    counter = metrics.Counter("test_thread_churn_total", "Test counter", ("outcome",))
+    def work():
+        for _ in range(100):
+            counter.inc("ok")
+    for _ in range(5):
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    counter.inc("ok") # This thread's shard stays live
+    # 40 threads came and went: their shards are folded into the base total, not kept
+    assert len(counter._shards(("ok",))._shards) == 1
+    assert counter.value("ok") == 40 * 100 + 1
+
+def test_sampling_profiler():
+    stop = threading.Event()
+    def busy():
+        while not stop.is_set():
+            request_timing.normalize_sql("SELECT * FROM t WHERE id IN (1, 2, 3) AND name = 'x'")
+    worker = threading.Thread(target=busy)
+    worker.start()
+    sampler = profiler.SamplingProfiler(interval=0.001, max_overhead=0.02)
+    sampler.start()
+    try:
+        stop.wait(0.3)
+    finally:
+        sampler.stop()
+        stop.set()
+        worker.join()
+
+    assert sampler.ticks > 0
+    # Stacks are trimmed to app code: the test frames above the call are gone
+    roots = {stack[0][0] for stack in sampler.stacks}
+    assert "app.core.request_timing:normalize_sql" in roots
+    assert all(name.startswith("app.") for name in roots)
+    # The cap holds (the last sample may run past it)
+    assert sampler.overhead <= 0.02 * 1.5
+
+    lines = sampler.collapsed().splitlines()
+    assert lines and all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+    assert sum(int(line.rsplit(" ", 1)[1]) for line in lines) == sum(sampler.stacks.values())
+    document = sampler.speedscope()
+    [sampled] = document["profiles"]
+    frames = document["shared"]["frames"]
+    assert len(sampled["samples"]) == len(sampled["weights"]) == len(sampler.stacks)
+    assert all(0 <= index < len(frames) for sample in sampled["samples"] for index in sample)
+
+def test_read_profile(client: TestClient, superuser_token_headers, user_token_headers):
+    url = f"{settings.API_V1_STR}/admin/profile"
+    assert client.get(url, params={"segundos": 0.1}, headers=user_token_headers).status_code == 403
+    response = client.get(url, params={"segundos": 0.2, "format": "speedscope"}, headers=superuser_token_headers)
+    assert response.status_code == 200
+    assert response.json()["profiles"][0]["type"] == "sampled"
+    assert int(response.headers["X-Profile-Ticks"]) > 0
+    assert float(response.headers["X-Profile-Overhead"]) <= settings.PROFILER_MAX_OVERHEAD * 1.5
+    assert client.get(url, params={"segundos": settings.PROFILER_MAX_SECONDS + 1}, headers=superuser_token_headers).status_code == 422
+
+    # One profile at a time per worker
+    with profiler._running:
+        assert client.get(url, params={"segundos": 0.1}, headers=superuser_token_headers).status_code == 409
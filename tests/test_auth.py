@@ -56,3 +56,82 @@ def test_read_users_me_unauthenticated(client: TestClient):
 # Add tests for inactive users if implemented
 # Add tests for refresh token if fully implemented
 
+
+# Test the in-memory principal cache
+def test_authenticated_request_served_from_cache(client: TestClient, user_token_headers, count_queries):
+    from app.core.principal_cache import principal_cache
+    # First call may populate the cache; the next one must not touch the database
+    client.get(f"{settings.API_V1_STR}/auth/users/me", headers=user_token_headers)
+    hits_before = principal_cache.stats()["hits"]
+    with count_queries() as statements:
+        response = client.get(f"{settings.API_V1_STR}/auth/users/me", headers=user_token_headers)
+    assert response.status_code == 200
+    assert statements == []
+    assert principal_cache.stats()["hits"] == hits_before + 1
+
+def test_deactivated_user_token_is_revoked(client: TestClient, superuser_token_headers):
+    user_data = {"email": "tobedeactivated@example.com", "password": "password123"}
+    created = client.post(f"{settings.API_V1_STR}/auth/register", json=user_data)
+    assert created.status_code == 201
+    login = client.post(f"{settings.API_V1_STR}/auth/login", data={"username": user_data["email"], "password": user_data["password"]})
+    headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+    assert client.get(f"{settings.API_V1_STR}/auth/users/me", headers=headers).status_code == 200 # Now cached
+
+    response = client.put(f"{settings.API_V1_STR}/auth/users/{created.json()['id']}", headers=superuser_token_headers, json={"is_active": False})
+    assert response.status_code == 200
+    assert response.json()["is_active"] is False
+
+    assert client.get(f"{settings.API_V1_STR}/auth/users/me", headers=headers).status_code == 401
+
+def test_demoted_superuser_loses_privileges(client: TestClient, superuser_token_headers):
+    user_data = {"email": "tobedemoted@example.com", "password": "password123", "is_superuser": True}
+    created = client.post(f"{settings.API_V1_STR}/auth/register", json=user_data)
+    assert created.status_code == 201
+    login_data = {"username": user_data["email"], "password": user_data["password"]}
+    login = client.post(f"{settings.API_V1_STR}/auth/login", data=login_data)
+    headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+    update_url = f"{settings.API_V1_STR}/auth/users/{created.json()['id']}"
+    assert client.put(update_url, headers=headers, json={"is_active": True}).status_code == 200 # Superuser-only endpoint
+
+    response = client.put(update_url, headers=superuser_token_headers, json={"is_superuser": False})
+    assert response.status_code == 200
+
+    # The old token is revoked; a fresh one no longer grants superuser access
+    assert client.get(f"{settings.API_V1_STR}/auth/users/me", headers=headers).status_code == 401
+    login = client.post(f"{settings.API_V1_STR}/auth/login", data=login_data)
+    headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+    assert client.put(update_url, headers=headers, json={"is_active": True}).status_code == 403
+
+# Test the bounded password hashing pool
+def test_password_hasher_rejects_when_saturated():
+    import asyncio
+    import threading
+    from app.core.hashing import HasherSaturated, PasswordHasher
+
+    release = threading.Event()
+    def slow_hash(password: str) -> str:
+        release.wait(5)
+        return f"hashed:{password}"
+
+    hasher = PasswordHasher(hash_fn=slow_hash, verify_fn=lambda p, h: h == f"hashed:{p}", max_workers=1, max_queue=1)
+
+    async def scenario():
+        running = asyncio.ensure_future(hasher.hash("one"))
+        queued = asyncio.ensure_future(hasher.hash("two"))
+        await asyncio.sleep(0.05)
+        assert hasher.stats()["pending"] == 2
+        assert hasher.stats()["queue_depth"] == 1
+        try:
+            await hasher.hash("three")
+            raise AssertionError("expected the pool to be saturated")
+        except HasherSaturated:
+            pass
+        release.set()
+        return await running, await queued, await hasher.verify("one", "hashed:one")
+
+    assert asyncio.run(scenario()) == ("hashed:one", "hashed:two", True)
+    stats = hasher.stats()
+    assert stats["rejected"] == 1
+    assert stats["completed"] == 3
+    assert stats["pending"] == 0
+    hasher.shutdown()
@@ -1,6 +1,13 @@
 from fastapi.testclient import TestClient
 from app.core.config import settings
-from app import schemas
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+from sqlalchemy import create_engine, insert, inspect
+from app import models, schemas
+from app.core import pagination
+from app.database import Base
+from app.models import search
+from app.services import client as client_service
 import pytest
 
 # Fixture to create a client for use in other tests
@@ -94,6 +101,34 @@ def test_read_clients_filtered(client: TestClient, user_token_headers, test_clie
     assert len(response_email.json()) == 1
     assert response_email.json()[0]["email"] == test_client_data["email"]
 
+def test_read_clients_cursor_pagination(client: TestClient, superuser_token_headers, user_token_headers):
+    for i in range(5):
+        client_data = {"name": f"Cursor Client {i}", "email": f"cursor.{i}@example.com", "cpf": f"7000000000{i}"}
+        response = client.post(f"{settings.API_V1_STR}/clients/", headers=superuser_token_headers, json=client_data)
+        assert response.status_code == 201
+
+    # Walk the filtered listing two at a time following X-Next-Cursor
+    seen = []
+    url = f"{settings.API_V1_STR}/clients/?name=Cursor Client&limit=2"
+    response = client.get(url, headers=user_token_headers)
+    while True:
+        assert response.status_code == 200
+        seen.extend(c["id"] for c in response.json())
+        next_cursor = response.headers.get("X-Next-Cursor")
+        if not next_cursor:
+            break
+        response = client.get(f"{url}&cursor={next_cursor}", headers=user_token_headers)
+
+    offset_page = client.get(f"{settings.API_V1_STR}/clients/?name=Cursor Client&limit=10", headers=user_token_headers).json()
+    assert seen == [c["id"] for c in offset_page]
+    assert len(seen) == 5
+    assert seen == sorted(seen)
+
+def test_read_clients_invalid_cursor(client: TestClient, user_token_headers):
+    response = client.get(f"{settings.API_V1_STR}/clients/?cursor=not-a-cursor", headers=user_token_headers)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
+
 def test_read_client(client: TestClient, user_token_headers, test_client_data):
     client_id = test_client_data["id"]
     response = client.get(f"{settings.API_V1_STR}/clients/{client_id}", headers=user_token_headers)
@@ -162,3 +197,68 @@ def test_delete_nonexistent_client(client: TestClient, superuser_token_headers):
     response = client.delete(f"{settings.API_V1_STR}/clients/99999", headers=superuser_token_headers)
     assert response.status_code == 404
 
+
+# Test ranked search (FTS5 on SQLite)
+def test_search_clients(client: TestClient, superuser_token_headers, user_token_headers):
+    created = {}
+    for name, email, cpf in (
+        ("Joana Pereira", "joana.pereira@example.com", "71000000001"),
+        ("Pedro Joanes", "pedro.j@example.com", "71000000002"),
+        ("Carla Souza", "carla@joanamail.com", "71000000003"),
+        ("Marcos 100% Silva", "marcos@example.com", "71000000004"),
+    ):
+        response = client.post(f"{settings.API_V1_STR}/clients/", headers=superuser_token_headers, json={"name": name, "email": email, "cpf": cpf})
+        assert response.status_code == 201
+        created[name] = response.json()["id"]
+
+    def search(q, **params):
+        response = client.get(f"{settings.API_V1_STR}/clients/", headers=user_token_headers, params={"q": q, **params})
+        assert response.status_code == 200
+        assert "X-Next-Cursor" not in response.headers
+        return [c["name"] for c in response.json()]
+
+    # Case-insensitive substring on name or email
+    assert set(search("JOAN")) == {"Joana Pereira", "Pedro Joanes", "Carla Souza"}
+    assert search("joanes") == ["Pedro Joanes"]
+    assert search("JOAN", limit=1, skip=3) == []
+    # Too short for trigrams: falls back to a scan, prefix matches first
+    assert search("jo")[0] == "Joana Pereira"
+    # LIKE wildcards are literal
+    assert search("100%") == ["Marcos 100% Silva"]
+    assert search("%") == ["Marcos 100% Silva"]
+    # Combined with the existing filters
+    assert search("joan", email="pedro") == ["Pedro Joanes"]
+
+    # The index follows updates and deletes
+    response = client.put(f"{settings.API_V1_STR}/clients/{created['Pedro Joanes']}", headers=superuser_token_headers, json={"name": "Pedro Alves"})
+    assert response.status_code == 200
+    assert "Pedro Joanes" not in search("joan")
+    assert search("alves") == ["Pedro Alves"]
+    response = client.delete(f"{settings.API_V1_STR}/clients/{created['Carla Souza']}", headers=superuser_token_headers)
+    assert response.status_code == 200
+    assert search("joanamail") == []
+
+def test_search_ranks_every_match(db):
+    # More matches than a page: the best one has the highest id and must still come first
+    db.execute(insert(models.Client), [
+        {"name": f"Cliente Zyxwvu de nome bem comprido {i}", "email": f"rank{i}@example.com", "cpf": f"72{i:09d}"} for i in range(1500)
+    ])
+    db.execute(insert(models.Client), [{"name": "Zyxwvu", "email": "best@example.com", "cpf": "73000000000"}])
+    assert [c.name for c in client_service.get_clients(db, q="zyxwvu", limit=1)] == ["Zyxwvu"]
+    page = client_service.get_clients(db, q="zyxwvu", skip=1490, limit=20)
+    assert len(page) == 11 and "Zyxwvu" not in [c.name for c in page]
+
+def test_autogenerate_ignores_search_index():
+    # The FTS5 table and its shadow tables are not in the metadata; Alembic must not drop them
+    search_engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=search_engine)
+    with search_engine.connect() as conn:
+        assert any(name.startswith("clients_fts") for name in inspect(conn).get_table_names())
+        context = MigrationContext.configure(conn, opts={"include_object": search.include_object})
+        assert compare_metadata(context, Base.metadata) == []
+    search_engine.dispose()
+
+def test_search_clients_with_cursor(client: TestClient, user_token_headers):
+    cursor = pagination.encode_cursor(1)
+    response = client.get(f"{settings.API_V1_STR}/clients/?q=joan&cursor={cursor}", headers=user_token_headers)
+    assert response.status_code == 400
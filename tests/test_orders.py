@@ -1,7 +1,25 @@
+import csv
+import io
+import json
+import re
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import HTTPException
 from fastapi.testclient import TestClient
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 from app.core.config import settings
-from app import schemas
+from app import models, schemas
+from app.core import pagination
+from app.database import Base, get_async_db, get_async_read_db, get_db, get_read_db
+from app.main import app
+from app.services import order as order_service
+from app.services import section as section_service
 import pytest
+from datetime import datetime, timedelta
+from typing import List
 from decimal import Decimal
 
 # Fixture to create an order for use in other tests
@@ -145,6 +163,95 @@ def test_read_orders_filtered(client: TestClient, user_token_headers, test_order
     # Check if the specific order is in the results (might be others with same section)
     assert any(o["id"] == test_order_data["id"] for o in response_section.json())
 
+def test_read_orders_matches_response_model(client: TestClient, superuser_token_headers, user_token_headers, test_client_data, test_product_data):
+    # The row-based fast path must produce exactly the bytes of List[schemas.Order]
+    api = settings.API_V1_STR
+    unsectioned = client.post(f"{api}/products/", headers=superuser_token_headers, json={
+        "description": "Saia Plissada Ção", "sale_value": "120.50", "initial_stock": 20, "image_urls": "https://img.example.com/saia.png",
+    }).json()
+    for quantities in ((1, 2), (3, 1), (1, 1)):
+        items = [{"product_id": test_product_data["id"], "quantity": quantities[0]}, {"product_id": unsectioned["id"], "quantity": quantities[1]}]
+        response = client.post(f"{api}/orders/", headers=user_token_headers, json={"client_id": test_client_data["id"], "items": items})
+        assert response.status_code == 201, response.text
+
+    adapter = TypeAdapter(List[schemas.Order])
+    session = next(app.dependency_overrides[get_read_db]())
+    try:
+        first_page = client.get(f"{api}/orders/?limit=2", headers=user_token_headers)
+        cursor = first_page.headers[pagination.NEXT_CURSOR_HEADER]
+        cases = [
+            ("", {}),
+            ("?limit=2", {"limit": 2}),
+            (f"?limit=2&cursor={cursor}", {"limit": 2, "cursor": cursor}),
+            (f"?cliente_id={test_client_data['id']}&status=pending", {"client_id": test_client_data["id"], "status": "pending"}),
+            ("?secao_produto=Test", {"product_section": "Test"}),
+        ]
+        for query, filters in cases:
+            response = client.get(f"{api}/orders/{query}", headers=user_token_headers)
+            assert response.status_code == 200
+            session.expire_all()
+            expected = adapter.dump_json(adapter.validate_python(order_service.get_orders(session, **filters)))
+            assert response.content == expected, query
+            assert response.headers["content-type"] == "application/json"
+    finally:
+        session.close()
+
+def test_read_orders_sparse_fields(client: TestClient, user_token_headers, test_order_data, count_queries):
+    url = f"{settings.API_V1_STR}/orders/?id_pedido={test_order_data['id']}"
+    [full] = client.get(url, headers=user_token_headers).json()
+
+    # Keys keep the schema order whatever order they are asked in
+    [order] = client.get(f"{url}&fields=items.quantity,client.name,status", headers=user_token_headers).json()
+    assert list(order) == ["status", "id", "client", "items"]
+    assert order["client"] == {"name": full["client"]["name"]}
+    assert [list(item) for item in order["items"]] == [["quantity"]] * len(full["items"]) # Products not named
+    [order] = client.get(f"{url}&fields=id,items.quantity&expand=items.product", headers=user_token_headers).json()
+    assert list(order) == ["id", "items"]
+    assert [item["product"] for item in order["items"]] == [item["product"] for item in full["items"]]
+
+    # No expansion: references only, and neither clients nor products are read
+    with count_queries() as statements:
+        [order] = client.get(f"{url}&expand=", headers=user_token_headers).json()
+    assert "client" not in order and order["client_id"] == full["client_id"]
+    assert all("product" not in item for item in order["items"])
+    assert not any(" clients" in statement or " products" in statement for statement in statements)
+    [order] = client.get(f"{url}&fields=id,total_value&expand=", headers=user_token_headers).json()
+    assert order == {"id": full["id"], "total_value": full["total_value"]}
+
+    for query in ("fields=bogus", "fields=client.bogus", "expand=bogus", "fields=client.name&expand=items.product"):
+        assert client.get(f"{url}&{query}", headers=user_token_headers).status_code == 400, query
+
+def test_read_orders_compact(client: TestClient, user_token_headers, test_order_data):
+    url = f"{settings.API_V1_STR}/orders/?cliente_id={test_order_data['_test_client_id']}"
+    full = client.get(url, headers=user_token_headers).json()
+    response = client.get(f"{url}&compact=true", headers=user_token_headers)
+    assert response.status_code == 200
+    compact = response.json()
+    assert set(compact) == {"data", "included"}
+    schemas.OrderCompactPage.model_validate(compact) # The shape documented in OpenAPI
+    clients, products = compact["included"]["clients"], compact["included"]["products"]
+    assert len(clients) == 1 # Every order of the page has the same client, sent once
+    for order, expanded in zip(compact["data"], full):
+        assert "client" not in order and clients[str(order["client_id"])] == expanded["client"]
+        for item, expanded_item in zip(order["items"], expanded["items"]):
+            assert "product" not in item and products[str(item["product_id"])] == expanded_item["product"]
+    assert len(response.content) < len(client.get(url, headers=user_token_headers).content)
+
+    # References survive sparse fields; only the expanded parts are included
+    compact = client.get(f"{url}&compact=true&fields=status,items.product.description&expand=items.product", headers=user_token_headers).json()
+    assert set(compact["included"]) == {"products"}
+    assert all(list(product) == ["description"] for product in compact["included"]["products"].values())
+    assert all(set(order) == {"status", "id", "items"} for order in compact["data"])
+    assert all("product_id" in item for order in compact["data"] for item in order["items"])
+
+def test_read_orders_openapi_documents_both_shapes(client: TestClient):
+    operation = client.get(app.openapi_url).json()["paths"][f"{settings.API_V1_STR}/orders/"]["get"]
+    shapes = operation["responses"]["200"]["content"]["application/json"]["schema"]["anyOf"]
+    assert {"type": "array", "items": {"$ref": "#/components/schemas/Order"}} in shapes
+    assert {"$ref": "#/components/schemas/OrderCompactPage"} in shapes
+    # Sparse and compact shapes come with examples
+    assert {"sparse", "no_expansion", "compact"} <= set(operation["responses"]["200"]["content"]["application/json"]["examples"])
+
 def test_read_order(client: TestClient, user_token_headers, test_order_data):
     order_id = test_order_data["id"]
     response = client.get(f"{settings.API_V1_STR}/orders/{order_id}", headers=user_token_headers)
@@ -169,6 +276,91 @@ def test_update_order_status(client: TestClient, user_token_headers, test_order_
     assert updated_order["id"] == order_id
     assert updated_order["status"] == update_data["status"]
 
+def test_update_order_status_transitions(client: TestClient, user_token_headers, test_client_data, test_product_data):
+    order_payload = {"client_id": test_client_data["id"], "items": [{"product_id": test_product_data["id"], "quantity": 1}]}
+    response = client.post(f"{settings.API_V1_STR}/orders/", headers=user_token_headers, json=order_payload)
+    assert response.status_code == 201
+    order_id = response.json()["id"]
+    url = f"{settings.API_V1_STR}/orders/{order_id}"
+
+    # pending -> shipped skips processing
+    response = client.put(url, headers=user_token_headers, json={"status": "shipped"})
+    assert response.status_code == 400
+    assert "from 'pending' to 'shipped'" in response.json()["detail"]
+    for new_status in ("processing", "shipped", "delivered"):
+        response = client.put(url, headers=user_token_headers, json={"status": new_status})
+        assert response.status_code == 200
+        assert response.json()["status"] == new_status
+    # Delivered is final
+    assert client.put(url, headers=user_token_headers, json={"status": "cancelled"}).status_code == 400
+    # Unknown values are rejected by the schema
+    assert client.put(url, headers=user_token_headers, json={"status": "lost"}).status_code == 422
+
+def test_read_orders_status_filter(client: TestClient, user_token_headers, test_client_data, test_product_data):
+    order_payload = {"client_id": test_client_data["id"], "status": "cancelled", "items": [{"product_id": test_product_data["id"], "quantity": 1}]}
+    response = client.post(f"{settings.API_V1_STR}/orders/", headers=user_token_headers, json=order_payload)
+    assert response.status_code == 201
+    cancelled_id = response.json()["id"]
+
+    response = client.get(f"{settings.API_V1_STR}/orders/?status=pending,cancelled&limit=1000", headers=user_token_headers)
+    assert response.status_code == 200
+    statuses = {o["status"] for o in response.json()}
+    assert "cancelled" in statuses and statuses <= {"pending", "cancelled"}
+    assert cancelled_id in {o["id"] for o in response.json()}
+    # Exact match only: a substring no longer matches
+    response = client.get(f"{settings.API_V1_STR}/orders/?status=cancel", headers=user_token_headers)
+    assert response.status_code == 400
+    response = client.get(f"{settings.API_V1_STR}/orders/export?status=cancel", headers=user_token_headers)
+    assert response.status_code == 400
+
+@pytest.mark.parametrize("use_bitmap", [False, True], ids=["exists", "bitmap"])
+def test_read_orders_section_filter(client: TestClient, superuser_token_headers, user_token_headers, test_client_data, monkeypatch, use_bitmap):
+    monkeypatch.setattr(settings, "ORDER_SECTION_BITMAP_FILTER", use_bitmap)
+    suffix = "Bitmap" if use_bitmap else "Exists"
+    product_ids = []
+    for i, section in enumerate((f"Filter {suffix} Shoes", f"Filter {suffix} Hats", None)):
+        payload = {"description": f"Section Filter {suffix} {i}", "sale_value": "5.00", "section": section, "initial_stock": 50}
+        response = client.post(f"{settings.API_V1_STR}/products/", headers=superuser_token_headers, json=payload)
+        assert response.status_code == 201
+        assert response.json()["section"] == section
+        product_ids.append(response.json()["id"])
+
+    def create(*indexes):
+        items = [{"product_id": product_ids[i], "quantity": 1} for i in indexes]
+        response = client.post(f"{settings.API_V1_STR}/orders/", headers=user_token_headers, json={"client_id": test_client_data["id"], "items": items})
+        assert response.status_code == 201
+        return response.json()["id"]
+
+    def matching(section):
+        response = client.get(f"{settings.API_V1_STR}/orders/?secao_produto={section}&limit=1000", headers=user_token_headers)
+        assert response.status_code == 200
+        ids = [o["id"] for o in response.json()]
+        assert len(ids) == len(set(ids)) # One row per order, however many items match
+        return set(ids)
+
+    shoes = create(0, 0, 2)
+    both = create(0, 1)
+    hats = create(1, 2)
+    unsectioned = create(2)
+    assert matching(f"filter {suffix.lower()} shoes") == {shoes, both} # Case-insensitive partial match
+    assert matching(f"Filter {suffix}") == {shoes, both, hats}
+    assert matching("No Such Section") == set()
+
+    # Moving a product to another section moves its orders too
+    response = client.put(f"{settings.API_V1_STR}/products/{product_ids[2]}", headers=superuser_token_headers, json={"section": f"Filter {suffix} Hats"})
+    assert response.status_code == 200
+    assert matching(f"Filter {suffix} Hats") == {both, hats, shoes, unsectioned}
+    response = client.put(f"{settings.API_V1_STR}/products/{product_ids[1]}", headers=superuser_token_headers, json={"section": None})
+    assert response.status_code == 200
+    assert response.json()["section"] is None
+    assert matching(f"Filter {suffix} Hats") == {hats, shoes, unsectioned}
+
+def test_section_bits_overflow():
+    assert section_service.section_bits([1, 3, None, 3]) == 0b101
+    assert section_service.section_bits([62]) == 1 << 61
+    # Sections past the bitmap share the overflow bit, still a positive BIGINT
+    assert section_service.section_bits([63, 500]) == section_service.OVERFLOW_BIT < 2 ** 63
+
 def test_update_order_forbidden(client: TestClient, superuser_token_headers, test_order_data):
     # Example: Test if a superuser *can* update (adjust based on actual permissions)
     order_id = test_order_data["id"]
@@ -204,3 +396,344 @@ def test_delete_nonexistent_order(client: TestClient, superuser_token_headers):
     response = client.delete(f"{settings.API_V1_STR}/orders/99999", headers=superuser_token_headers)
     assert response.status_code == 404
 
+
+# Test that listing orders does not issue queries per order/item (N+1)
+def test_read_orders_query_count_is_constant(client: TestClient, superuser_token_headers, user_token_headers, test_client_data, count_queries):
+    product_ids = []
+    for i in range(2):
+        product_payload = {
+            "description": f"Query Count Product {i}",
+            "sale_value": "3.50",
+            "barcode": f"QC-{i}-0001",
+            "section": "Query Count",
+            "initial_stock": 100,
+        }
+        response = client.post(f"{settings.API_V1_STR}/products/", headers=superuser_token_headers, json=product_payload)
+        assert response.status_code == 201
+        product_ids.append(response.json()["id"])
+
+    for _ in range(6):
+        order_payload = {
+            "client_id": test_client_data["id"],
+            "items": [{"product_id": pid, "quantity": 1} for pid in product_ids]
+        }
+        response = client.post(f"{settings.API_V1_STR}/orders/", headers=user_token_headers, json=order_payload)
+        assert response.status_code == 201
+
+    counts = {}
+    for limit in (1, 6):
+        with count_queries() as statements:
+            response = client.get(f"{settings.API_V1_STR}/orders/?secao_produto=Query Count&limit={limit}", headers=user_token_headers)
+        assert response.status_code == 200
+        assert len(response.json()) == limit
+        assert all(len(o["items"]) == 2 for o in response.json())
+        counts[limit] = len(statements)
+
+    assert counts[1] == counts[6], f"Query count grew with page size: {counts}"
+
+# Stress test: many concurrent orders competing for the same stock must never oversell
+def test_create_order_concurrent_no_oversell(tmp_path):
+    stress_engine = create_engine(
+        f"sqlite:///{tmp_path / 'stress.db'}",
+        connect_args={"check_same_thread": False, "timeout": 60},
+    )
+    Base.metadata.create_all(bind=stress_engine)
+    StressSession = sessionmaker(autocommit=False, autoflush=False, bind=stress_engine)
+
+    initial_stock = 50
+    with StressSession() as setup:
+        setup.add(models.Client(name="Stress Client", email="stress@example.com", cpf="00011122233"))
+        setup.add(models.Product(description="Stress Product", sale_value=Decimal("1.00"), initial_stock=initial_stock, current_stock=initial_stock))
+        setup.commit()
+        client_id = setup.query(models.Client.id).scalar()
+        product_id = setup.query(models.Product.id).scalar()
+
+    def place_order(_):
+        db = StressSession()
+        try:
+            order_in = schemas.OrderCreate(client_id=client_id, items=[{"product_id": product_id, "quantity": 1}])
+            order_service.create_order(db, order_in)
+            return 201
+        except HTTPException as e:
+            return e.status_code
+        finally:
+            db.close()
+
+    with ThreadPoolExecutor(max_workers=32) as pool:
+        results = list(pool.map(place_order, range(300)))
+
+    with StressSession() as check:
+        final_stock = check.query(models.Product.current_stock).filter(models.Product.id == product_id).scalar()
+        ordered_units = check.query(models.OrderItem).count()
+
+    assert final_stock >= 0
+    assert ordered_units == results.count(201)
+    assert final_stock + ordered_units == initial_stock
+    assert results.count(201) == initial_stock
+    assert set(results) <= {201, 400}
+    stress_engine.dispose()
+
+# Idempotency-Key on POST /orders
+def test_create_order_idempotency_key(client: TestClient, superuser_token_headers, user_token_headers, test_client_data):
+    response = client.post(f"{settings.API_V1_STR}/products/", headers=superuser_token_headers, json={
+        "description": "Idempotent Product", "sale_value": "7.00", "barcode": "IDEMPOTENT-1", "initial_stock": 3,
+    })
+    assert response.status_code == 201
+    product_id = response.json()["id"]
+    url = f"{settings.API_V1_STR}/orders/"
+
+    def post(key, quantity):
+        payload = {"client_id": test_client_data["id"], "items": [{"product_id": product_id, "quantity": quantity}]}
+        return client.post(url, headers={**user_token_headers, "Idempotency-Key": key}, json=payload)
+
+    first = post("retry-1", 2)
+    assert first.status_code == 201 and "idempotent-replayed" not in first.headers
+    retry = post("retry-1", 2)
+    assert retry.status_code == 201 and retry.headers["idempotent-replayed"] == "true"
+    assert retry.json() == first.json()
+    assert post("retry-1", 1).status_code == 422 # Same key, different body
+    stock = client.get(f"{settings.API_V1_STR}/products/{product_id}", headers=user_token_headers).json()["current_stock"]
+    assert stock == 1 # Charged once
+
+    # A failed request frees its key: the retry runs again once stock is back
+    assert post("retry-2", 2).status_code == 400
+    response = client.put(f"{settings.API_V1_STR}/products/{product_id}", headers=superuser_token_headers, json={"current_stock": 5})
+    assert response.status_code == 200
+    assert post("retry-2", 2).status_code == 201
+    # Keys belong to their user
+    assert client.post(url, headers={**superuser_token_headers, "Idempotency-Key": "retry-1"}, json={
+        "client_id": test_client_data["id"], "items": [{"product_id": product_id, "quantity": 1}],
+    }).headers.get("idempotent-replayed") is None
+
+def test_create_orders_batch(client: TestClient, superuser_token_headers, user_token_headers, test_client_data):
+    product_ids = []
+    for i, stock in enumerate((5, 2)):
+        response = client.post(f"{settings.API_V1_STR}/products/", headers=superuser_token_headers, json={
+            "description": f"Batch Product {i}", "sale_value": "4.00", "barcode": f"BATCH-{i}", "section": f"Batch Section {i}", "initial_stock": stock,
+        })
+        assert response.status_code == 201
+        product_ids.append(response.json()["id"])
+    first, second = product_ids
+    client_id = test_client_data["id"]
+    orders = [
+        {"client_id": client_id, "items": [{"product_id": first, "quantity": 2}, {"product_id": second, "quantity": 1}]},
+        {"client_id": 999999, "items": [{"product_id": first, "quantity": 1}]},
+        {"client_id": client_id, "items": [{"product_id": second, "quantity": 1}, {"product_id": second, "quantity": 1}]}, # Only 1 left
+        {"client_id": client_id, "items": [{"product_id": 999999, "quantity": 1}]},
+        {"client_id": client_id, "status": "processing", "items": [{"product_id": first, "quantity": 3}]},
+    ]
+    url = f"{settings.API_V1_STR}/orders/batch"
+
+    def stock(product_id):
+        return client.get(f"{settings.API_V1_STR}/products/{product_id}", headers=user_token_headers).json()["current_stock"]
+
+    # all_or_nothing: one failure rejects every order, nothing is written
+    response = client.post(url, headers=user_token_headers, json={"orders": orders, "mode": "all_or_nothing"})
+    assert response.status_code == 200
+    result = response.json()
+    assert (result["created"], result["failed"]) == (0, 5)
+    assert all(item["order_id"] is None for item in result["results"])
+    assert result["results"][0]["error"] == order_service.BATCH_ABORTED
+    assert (stock(first), stock(second)) == (5, 2)
+
+    # partial: each order is checked against the stock left by the ones before it
+    response = client.post(url, headers=user_token_headers, json={"orders": orders})
+    assert response.status_code == 200
+    result = response.json()
+    assert (result["created"], result["failed"]) == (2, 3)
+    assert [item["index"] for item in result["results"]] == [0, 1, 2, 3, 4]
+    assert "Client with id 999999 not found" in result["results"][1]["error"]
+    assert "Insufficient stock for product id" in result["results"][2]["error"]
+    assert "Product with id 999999 not found" in result["results"][3]["error"]
+    assert (stock(first), stock(second)) == (0, 1)
+
+    created = [client.get(f"{settings.API_V1_STR}/orders/{result['results'][index]['order_id']}", headers=user_token_headers).json() for index in (0, 4)]
+    assert [len(order["items"]) for order in created] == [2, 1]
+    assert [Decimal(order["total_value"]) for order in created] == [Decimal("12.00"), Decimal("12.00")]
+    assert [order["status"] for order in created] == ["pending", "processing"]
+    # The section bitmap is maintained like for single orders
+    response = client.get(f"{settings.API_V1_STR}/orders/", headers=user_token_headers, params={"secao_produto": "Batch Section 1"})
+    assert [order["id"] for order in response.json()] == [created[0]["id"]]
+
+    response = client.post(url, headers=user_token_headers, json={"orders": orders, "mode": "whatever"})
+    assert response.status_code == 422
+
+def test_create_orders_batch_max_size(client: TestClient, user_token_headers, test_client_data, monkeypatch):
+    monkeypatch.setattr(settings, "ORDER_BATCH_MAX_SIZE", 2)
+    orders = [{"client_id": test_client_data["id"], "items": []}] * 3
+    response = client.post(f"{settings.API_V1_STR}/orders/batch", headers=user_token_headers, json={"orders": orders})
+    assert response.status_code == 400
+
+@pytest.fixture
+def isolated_client(tmp_path):
+    # The API on its own SQLite file with a real connection pool (the shared test
+    # engine has a single connection), so requests really run concurrently
+    url = f"sqlite:///{tmp_path / 'isolated.db'}"
+    sync_engine = create_engine(url, connect_args={"check_same_thread": False, "timeout": 60})
+    Base.metadata.create_all(bind=sync_engine)
+    IsolatedSession = sessionmaker(autocommit=False, autoflush=False, bind=sync_engine)
+
+    def get_isolated_db():
+        with IsolatedSession() as db:
+            yield db
+    overrides = {get_db: get_isolated_db, get_read_db: get_isolated_db}
+    if settings.DATABASE_ASYNC_MODE:
+        async_engine = create_async_engine(url.replace("sqlite:", "sqlite+aiosqlite:", 1), poolclass=NullPool, connect_args={"timeout": 60})
+        IsolatedAsyncSession = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+        async def get_isolated_async_db():
+            async with IsolatedAsyncSession() as db:
+                yield db
+        overrides.update({get_async_db: get_isolated_async_db, get_async_read_db: get_isolated_async_db})
+
+    saved = dict(app.dependency_overrides)
+    app.dependency_overrides.update(overrides)
+    try:
+        with TestClient(app) as test_client:
+            yield test_client, IsolatedSession
+    finally:
+        app.dependency_overrides.clear()
+        app.dependency_overrides.update(saved)
+        sync_engine.dispose()
+
+def test_create_order_idempotency_key_concurrent(isolated_client):
+    api, IsolatedSession = isolated_client
+    with IsolatedSession() as setup:
+        setup.add(models.Client(name="Idempotent Client", email="idempotent@example.com", cpf="00011122299"))
+        setup.add(models.Product(description="Idempotent Stress", sale_value=Decimal("1.00"), initial_stock=100, current_stock=100))
+        setup.commit()
+        client_id = setup.query(models.Client.id).scalar()
+        product_id = setup.query(models.Product.id).scalar()
+    credentials = {"email": "idempotent.user@example.com", "password": "idempotentpassword"}
+    assert api.post(f"{settings.API_V1_STR}/auth/register", json=credentials).status_code == 201
+    login = api.post(f"{settings.API_V1_STR}/auth/login", data={"username": credentials["email"], "password": credentials["password"]})
+    headers = {"Authorization": f"Bearer {login.json()['access_token']}", "Idempotency-Key": "pos-sync-42"}
+    payload = {"client_id": client_id, "items": [{"product_id": product_id, "quantity": 3}]}
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        responses = list(pool.map(lambda _: api.post(f"{settings.API_V1_STR}/orders/", headers=headers, json=payload), range(40)))
+
+    assert {response.status_code for response in responses} == {201}
+    assert len({response.json()["id"] for response in responses}) == 1
+    assert sum("idempotent-replayed" not in response.headers for response in responses) == 1
+    with IsolatedSession() as check:
+        assert check.query(models.Order).count() == 1
+        assert check.query(models.Product.current_stock).scalar() == 97
+
+# Test streaming export
+def test_export_orders(client: TestClient, superuser_token_headers, user_token_headers, monkeypatch):
+    client_payload = {"name": "Export Client", "email": "export.client@example.com", "cpf": "90817263540"}
+    response = client.post(f"{settings.API_V1_STR}/clients/", headers=superuser_token_headers, json=client_payload)
+    assert response.status_code == 201
+    export_client_id = response.json()["id"]
+    product_ids = []
+    for i in range(2):
+        product_payload = {"description": f"Export, Product {i}", "sale_value": "2.50", "barcode": f"EXP-{i}-0001", "initial_stock": 10}
+        response = client.post(f"{settings.API_V1_STR}/products/", headers=superuser_token_headers, json=product_payload)
+        assert response.status_code == 201
+        product_ids.append(response.json()["id"])
+    order_ids = []
+    for items in ([(product_ids[0], 1), (product_ids[1], 3)], [(product_ids[1], 2)]):
+        order_payload = {"client_id": export_client_id, "items": [{"product_id": pid, "quantity": qty} for pid, qty in items]}
+        response = client.post(f"{settings.API_V1_STR}/orders/", headers=user_token_headers, json=order_payload)
+        assert response.status_code == 201
+        order_ids.append(response.json()["id"])
+
+    # One row per cursor batch exercises the chunked streaming
+    monkeypatch.setattr(settings, "ORDER_EXPORT_BATCH_SIZE", 1)
+    response = client.get(f"{settings.API_V1_STR}/orders/export?cliente_id={export_client_id}", headers=user_token_headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    assert 'filename="orders.csv"' in response.headers["content-disposition"]
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert list(rows[0]) == list(order_service.ORDER_EXPORT_COLUMNS)
+    assert [(int(r["order_id"]), int(r["product_id"]), int(r["quantity"])) for r in rows] == [
+        (order_ids[0], product_ids[0], 1), (order_ids[0], product_ids[1], 3), (order_ids[1], product_ids[1], 2),
+    ]
+    assert rows[0]["client_name"] == "Export Client"
+    assert rows[0]["product_description"] == "Export, Product 0"
+    assert Decimal(rows[1]["order_total_value"]) == Decimal("10.00")
+
+    response = client.get(f"{settings.API_V1_STR}/orders/export?format=ndjson&cliente_id={export_client_id}&periodo_fim=2000-01-01T00:00:00", headers=user_token_headers)
+    assert response.status_code == 200
+    assert response.text == ""
+    response = client.get(f"{settings.API_V1_STR}/orders/export?format=ndjson&cliente_id={export_client_id}", headers=user_token_headers)
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["item_id"] is not None for line in lines] == [True, True, True]
+    assert lines[2]["unit_price"] == "2.50"
+
+def test_export_orders_invalid_format(client: TestClient, user_token_headers):
+    response = client.get(f"{settings.API_V1_STR}/orders/export?format=xml", headers=user_token_headers)
+    assert response.status_code == 422
+
+# Query-plan regression: every get_orders filter combination must be served by
+# indexes over seeded data, never by a full scan of orders or order_items.
+# (A section filter alone walks orders in page order with a per-order EXISTS
+# probe, stopping after `limit` matches, so it is left out too.
+# Open-ended date ranges and several statuses alone are left out: they match a
+# large share of the orders (without histogram statistics SQLite assumes so),
+# and then walking orders in page order until `limit` matches is the cheaper
+# plan, which the planner rightly picks.)
+PLAN_FILTER_COMBINATIONS = {
+    "client": dict(client_id=7),
+    "date_range": dict(start_date=datetime(2024, 2, 1), end_date=datetime(2024, 2, 3)),
+    "client_date_range": dict(client_id=7, start_date=datetime(2024, 2, 1), end_date=datetime(2024, 2, 20)),
+    "order_id": dict(order_id=55),
+    "client_section": dict(client_id=7, product_section="Section 3"),
+    "section_date_range": dict(product_section="Section 3", start_date=datetime(2024, 2, 1), end_date=datetime(2024, 2, 3)),
+    "status": dict(status="shipped"),
+    "statuses_client": dict(status="delivered,cancelled", client_id=7),
+    "status_date_range": dict(status="shipped", start_date=datetime(2024, 2, 1), end_date=datetime(2024, 2, 3)),
+    "client_cursor": dict(client_id=7, cursor=pagination.encode_cursor(1000)),
+}
+
+@pytest.fixture(scope="module")
+def plan_db(tmp_path_factory):
+    plan_engine = create_engine(f"sqlite:///{tmp_path_factory.mktemp('plans') / 'plans.db'}")
+    Base.metadata.create_all(bind=plan_engine)
+    with plan_engine.begin() as conn:
+        conn.execute(insert(models.Client), [{"name": f"Plan Client {i}", "email": f"plan{i}@example.com", "cpf": f"{i:011d}"} for i in range(200)])
+        conn.execute(insert(models.Section), [{"id": i + 1, "name": f"Section {i}"} for i in range(20)])
+        conn.execute(insert(models.Product), [
+            {"description": f"Plan Product {i}", "sale_value": 1, "section_id": i % 20 + 1, "initial_stock": 0, "current_stock": 0}
+            for i in range(500)
+        ])
+        statuses = ["pending", "processing", "shipped", "delivered", "cancelled"]
+        conn.execute(insert(models.Order), [
+            {"id": i, "client_id": i * 7 % 200 + 1, "status": statuses[i % 5], "total_value": 1, "created_at": datetime(2024, 1, 1) + timedelta(minutes=5 * i)}
+            for i in range(1, 10_001)
+        ])
+        conn.execute(insert(models.OrderItem), [
+            {"order_id": i // 3 + 1, "product_id": i * 31 % 500 + 1, "quantity": 1, "unit_price": 1} for i in range(30_000)
+        ])
+        conn.exec_driver_sql("ANALYZE") # Real statistics, as a production database would have
+    with sessionmaker(bind=plan_engine)() as session:
+        yield session
+    plan_engine.dispose()
+
+# Both ways GET /orders has read orders: the ORM path, and the row fast path it
+# serves now (orders joined with clients, then items joined with products/sections)
+PLAN_FETCHES = {
+    "orm": lambda db, **filters: order_service.get_orders(db, limit=20, **filters),
+    "fast_path": lambda db, **filters: order_service.get_order_page(db, limit=20, **filters)[0],
+}
+
+@pytest.mark.parametrize("fetch", PLAN_FETCHES.values(), ids=PLAN_FETCHES.keys())
+@pytest.mark.parametrize("filters", PLAN_FILTER_COMBINATIONS.values(), ids=PLAN_FILTER_COMBINATIONS.keys())
+def test_get_orders_query_plans_use_indexes(plan_db, filters, fetch):
+    statements = []
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+    plan_engine = plan_db.get_bind()
+    event.listen(plan_engine, "before_cursor_execute", capture)
+    try:
+        orders = fetch(plan_db, **filters)
+    finally:
+        event.remove(plan_engine, "before_cursor_execute", capture)
+    assert orders
+
+    # Every statement the fetch ran: selectin loads of clients/items/products, or the joined queries
+    for statement, parameters in statements:
+        plan = [row[-1] for row in plan_db.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)]
+        scans = [step for step in plan if re.match(r"SCAN (orders|order_items)\b", step)]
+        assert not scans, f"Full scan in plan for {statement!r}: {plan}"
@@ -1,7 +1,17 @@
 from fastapi.testclient import TestClient
 from app.core.config import settings
 from app import schemas
+from app.core.catalog_index import CatalogIndex, IndexedProduct, catalog_index
+from app.core.response_cache import CachedResponse, ResponseCache, response_cache
+from app.database import Base, get_async_read_db, get_read_db
+from app.main import app
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 import pytest
+import threading
+import time
 from decimal import Decimal
 
 # Fixture to create a product for use in other tests
@@ -165,3 +175,298 @@ def test_delete_nonexistent_product(client: TestClient, superuser_token_headers)
     response = client.delete(f"{settings.API_V1_STR}/products/99999", headers=superuser_token_headers)
     assert response.status_code == 404
 
+
+# Test bulk import
+def test_bulk_import_csv(client: TestClient, superuser_token_headers, test_product_data):
+    body = (
+        "description,sale_value,barcode,section,initial_stock\n"
+        "Bulk CSV One,10.50,BULKCSV001,Bulk,5\n"
+        "\"Bulk, quoted\nmultiline\",3.00,BULKCSV002,Bulk,1\n"
+        "Bad Price,not-a-number,BULKCSV003,Bulk,1\n"
+        f"Taken Barcode,1.00,{test_product_data['barcode']},Bulk,1\n"
+        "Repeated,1.00,BULKCSV001,Bulk,1\n"
+        "Too,Few\n"
+        "No Barcode,2.00,,Bulk,7\n"
+    )
+    headers = {**superuser_token_headers, "Content-Type": "text/csv"}
+    response = client.post(f"{settings.API_V1_STR}/products/bulk", headers=headers, content=body.encode())
+    assert response.status_code == 200
+    result = response.json()
+    assert result["created"] == 3
+    assert result["failed"] == 4
+    errors = {error["line"]: error for error in result["errors"]}
+    assert set(errors) == {5, 6, 7, 8}
+    assert "sale_value" in errors[5]["errors"][0]
+    assert errors[6]["errors"] == ["Barcode already registered"]
+    assert errors[7]["errors"] == ["Barcode repeated in the import"]
+    assert errors[8]["errors"] == ["Expected 5 columns, got 2"]
+
+    response = client.get(f"{settings.API_V1_STR}/products/?categoria=Bulk", headers=superuser_token_headers)
+    descriptions = {product["description"]: product for product in response.json()}
+    assert descriptions["Bulk, quoted\nmultiline"]["current_stock"] == 1
+    assert descriptions["No Barcode"]["barcode"] is None
+
+def test_bulk_import_ndjson_in_chunks(client: TestClient, superuser_token_headers, monkeypatch):
+    monkeypatch.setattr(settings, "PRODUCT_BULK_CHUNK_SIZE", 2)
+    lines = [f'{{"description": "NDJSON {i}", "sale_value": "1.00", "barcode": "BULKND{i:03d}", "initial_stock": 1}}' for i in range(5)]
+    lines.insert(2, "{not json")
+    lines.append('{"description": "NDJSON dup", "sale_value": "1.00", "barcode": "BULKND000", "initial_stock": 1}')
+
+    def stream():
+        # Uneven byte chunks split lines (and a multi-byte character) across reads
+        data = ("\n".join(lines) + "\n{\"description\": \"Pão\", \"sale_value\": \"2.50\", \"initial_stock\": 3}").encode()
+        for i in range(0, len(data), 7):
+            yield data[i:i + 7]
+
+    headers = {**superuser_token_headers, "Content-Type": "application/x-ndjson"}
+    response = client.post(f"{settings.API_V1_STR}/products/bulk", headers=headers, content=stream())
+    assert response.status_code == 200
+    result = response.json()
+    assert result["created"] == 6
+    assert [(error["line"], error["errors"][0][:12]) for error in result["errors"]] == [(3, "Invalid JSON"), (7, "Barcode alre")]
+
+def test_bulk_import_rejects_unknown_content_type(client: TestClient, superuser_token_headers, user_token_headers):
+    response = client.post(f"{settings.API_V1_STR}/products/bulk", headers=superuser_token_headers, json=[{"description": "x"}])
+    assert response.status_code == 415
+    response = client.post(f"{settings.API_V1_STR}/products/bulk", headers={**user_token_headers, "Content-Type": "text/csv"}, content=b"description\n")
+    assert response.status_code == 403
+
+# Test catalog search
+def test_search_products(client: TestClient, superuser_token_headers, user_token_headers):
+    catalog_index.clear() # Rebuilt from the database on the next search
+    ids = {}
+    for description, section, price, barcode in (
+        ("Zephyr Camisa Polo Azul", "Roupas", "79.90", "ZEPHYR0001"),
+        ("Zephyr Camiseta Básica", "Roupas", "39.90", "ZEPHYR0002"),
+        ("Zephyr Calça Jeans Azul Escura Tradicional", "Roupas", "149.90", "ZEPHYR0003"),
+        ("Tênis Corrida", "Zephyr Calçados", "299.00", "ZEPHYR0004"),
+    ):
+        payload = {"description": description, "sale_value": price, "barcode": barcode, "section": section, "initial_stock": 5}
+        response = client.post(f"{settings.API_V1_STR}/products/", headers=superuser_token_headers, json=payload)
+        assert response.status_code == 201
+        ids[barcode] = response.json()["id"]
+
+    def search(**params):
+        response = client.get(f"{settings.API_V1_STR}/products/search", headers=user_token_headers, params=params)
+        assert response.status_code == 200
+        return response.json()
+
+    # Every word has to match; the last one also as a prefix; accents are ignored
+    result = search(q="zephyr cami")
+    assert [p["barcode"] for p in result["items"]] == ["ZEPHYR0001", "ZEPHYR0002"] or [p["barcode"] for p in result["items"]] == ["ZEPHYR0002", "ZEPHYR0001"]
+    assert search(q="CALCA azul")["items"][0]["barcode"] == "ZEPHYR0003"
+    # Description matches rank before section-only matches; shorter descriptions first
+    result = search(q="zephyr")
+    assert result["total"] == 4
+    assert [p["barcode"] for p in result["items"]] == ["ZEPHYR0002", "ZEPHYR0001", "ZEPHYR0003", "ZEPHYR0004"]
+    assert result["facets"]["sections"] == [{"value": "Roupas", "count": 3}, {"value": "Zephyr Calçados", "count": 1}]
+    assert result["facets"]["price_bands"] == [
+        {"value": "0-50", "count": 1}, {"value": "50-100", "count": 1}, {"value": "100-200", "count": 1}, {"value": "200-500", "count": 1},
+    ]
+    # Filters; each facet ignores its own filter
+    result = search(q="zephyr", secao="Roupas", faixa_preco="0-50")
+    assert [p["barcode"] for p in result["items"]] == ["ZEPHYR0002"]
+    assert result["facets"]["sections"] == [{"value": "Zephyr Calçados", "count": 0}] or {"value": "Roupas", "count": 1} in result["facets"]["sections"]
+    assert {"value": "50-100", "count": 1} in result["facets"]["price_bands"]
+    assert [p["barcode"] for p in search(q="zephyr", skip=1, limit=2)["items"]] == ["ZEPHYR0001", "ZEPHYR0003"]
+    # Exact barcode
+    assert [p["barcode"] for p in search(q="ZEPHYR0004")["items"]] == ["ZEPHYR0004"]
+
+    # The index follows writes
+    response = client.put(f"{settings.API_V1_STR}/products/{ids['ZEPHYR0002']}", headers=superuser_token_headers, json={"description": "Zephyr Regata"})
+    assert response.status_code == 200
+    assert [p["barcode"] for p in search(q="zephyr regata")["items"]] == ["ZEPHYR0002"]
+    assert [p["barcode"] for p in search(q="zephyr cami")["items"]] == ["ZEPHYR0001"]
+    response = client.delete(f"{settings.API_V1_STR}/products/{ids['ZEPHYR0001']}", headers=superuser_token_headers)
+    assert response.status_code == 200
+    assert search(q="zephyr cami")["total"] == 0
+
+    response = client.get(f"{settings.API_V1_STR}/products/search?q=zephyr&faixa_preco=1-2", headers=user_token_headers)
+    assert response.status_code == 400
+
+def test_autocomplete_products(client: TestClient, superuser_token_headers, user_token_headers):
+    for i, description in enumerate(("Quixote Mochila", "Quixote Moletom", "Quixote Moletom Infantil")):
+        payload = {"description": description, "sale_value": "10.00", "barcode": f"QUIXOTE{i}", "initial_stock": 1}
+        response = client.post(f"{settings.API_V1_STR}/products/", headers=superuser_token_headers, json=payload)
+        assert response.status_code == 201
+    response = client.get(f"{settings.API_V1_STR}/products/autocomplete?q=quixote mo", headers=user_token_headers)
+    assert response.status_code == 200
+    assert response.json() == [{"term": "moletom", "count": 2}, {"term": "mochila", "count": 1}]
+
+def test_catalog_index_refresh_keeps_concurrent_writes():
+    index = CatalogIndex(refresh_seconds=0.01)
+    index.build([IndexedProduct(id=1, description="Old Name", section=None, barcode=None, sale_value=Decimal("5"))])
+    loading = threading.Event()
+    release = threading.Event()
+
+    def slow_load():
+        loading.set()
+        release.wait(5)
+        return [IndexedProduct(id=1, description="Fresh Name", section=None, barcode=None, sale_value=Decimal("5"))]
+
+    time.sleep(0.02)
+    index.ensure_built(slow_load)
+    assert loading.wait(5)
+    # Written while the snapshot loads: must survive the swap
+    index.add(IndexedProduct(id=2, description="Added Meanwhile", section=None, barcode=None, sale_value=Decimal("5")))
+    release.set()
+    for _ in range(100):
+        if index.search("fresh").total:
+            break
+        time.sleep(0.01)
+    assert index.search("fresh").ids == [1]
+    assert index.search("meanwhile").ids == [2]
+
+def test_catalog_index_first_build_runs_once_and_keeps_writes():
+    index = CatalogIndex()
+    loads = []
+    release = threading.Event()
+
+    def slow_load():
+        loads.append(threading.current_thread().name)
+        release.wait(5)
+        return [IndexedProduct(id=1, description="Loaded Name", section=None, barcode=None, sale_value=Decimal("5"))]
+
+    # Concurrent first searches share one build on the index's own thread
+    results = []
+    def first_search():
+        index.ensure_built(slow_load)
+        results.append(index.wait(5))
+    searchers = [threading.Thread(target=first_search) for _ in range(4)]
+    for searcher in searchers:
+        searcher.start()
+    for _ in range(100):
+        if loads:
+            break
+        time.sleep(0.01)
+    # Written while the first snapshot loads: replayed before the index is published
+    index.add(IndexedProduct(id=2, description="Added Meanwhile", section=None, barcode=None, sale_value=Decimal("5")))
+    assert not index.built
+    release.set()
+    for searcher in searchers:
+        searcher.join(5)
+    assert results == [True] * 4
+    assert loads == ["catalog-index-build"]
+    assert index.search("loaded").ids == [1]
+    assert index.search("meanwhile").ids == [2]
+
+def test_catalog_index_build_failure_wakes_waiters():
+    index = CatalogIndex()
+
+    def broken_load():
+        raise RuntimeError("database unavailable")
+
+    index.ensure_built(broken_load)
+    assert index.wait(5) is False
+    index.ensure_built(lambda: [IndexedProduct(id=1, description="Retried", section=None, barcode=None, sale_value=Decimal("5"))])
+    assert index.wait(5) is True
+
+def test_product_etag_and_cache(client: TestClient, superuser_token_headers, user_token_headers, count_queries):
+    payload = {"description": "Cached Product", "sale_value": "12.00", "barcode": "CACHE-0001", "section": "Cache", "initial_stock": 5}
+    response = client.post(f"{settings.API_V1_STR}/products/", headers=superuser_token_headers, json=payload)
+    assert response.status_code == 201
+    url = f"{settings.API_V1_STR}/products/{response.json()['id']}"
+
+    first = client.get(url, headers=user_token_headers)
+    assert first.status_code == 200 and first.headers["x-cache"] == "MISS"
+    etag = first.headers["etag"]
+    assert etag.startswith('"') and not etag.startswith('W/')
+    with count_queries() as statements:
+        second = client.get(url, headers=user_token_headers)
+        not_modified = client.get(url, headers={**user_token_headers, "If-None-Match": etag})
+    assert not statements # Served without the database
+    assert second.headers["x-cache"] == "HIT" and second.headers["etag"] == etag and second.json() == first.json()
+    assert not_modified.status_code == 304 and not_modified.content == b"" and not_modified.headers["etag"] == etag
+
+    response = client.put(url, headers=superuser_token_headers, json={"sale_value": "13.00"})
+    assert response.status_code == 200
+    changed = client.get(url, headers={**user_token_headers, "If-None-Match": etag})
+    assert changed.status_code == 200 and changed.headers["x-cache"] == "MISS"
+    assert changed.json()["sale_value"] == "13.00" and changed.headers["etag"] != etag
+
+    assert client.delete(url, headers=superuser_token_headers).status_code == 200
+    assert client.get(url, headers=user_token_headers).status_code == 404
+
+def test_product_cache_skips_fills_from_lagging_replica(client: TestClient, superuser_token_headers, user_token_headers, tmp_path, monkeypatch):
+    # A replica that hasn't received any of the writes yet
+    replica_url = f"sqlite:///{tmp_path / 'lagging_replica.db'}"
+    replica_engine = create_engine(replica_url)
+    Base.metadata.create_all(bind=replica_engine)
+    def lagging_replica():
+        with sessionmaker(bind=replica_engine)() as db:
+            yield db
+    async def lagging_async_replica():
+        async with async_sessionmaker(bind=create_async_engine(replica_url.replace("sqlite", "sqlite+aiosqlite"), poolclass=NullPool))() as db:
+            yield db
+    lagging = {get_read_db: lagging_replica, get_async_read_db: lagging_async_replica}
+    caught_up = {dependency: app.dependency_overrides.get(dependency, dependency) for dependency in lagging}
+    monkeypatch.setattr(response_cache, "replica_lag_seconds", 60)
+    for dependency, override in lagging.items():
+        monkeypatch.setitem(app.dependency_overrides, dependency, override)
+
+    payload = {"description": "Fresh Product", "sale_value": "5.00", "barcode": "CACHE-0003", "initial_stock": 1}
+    response = client.post(f"{settings.API_V1_STR}/products/", headers=superuser_token_headers, json=payload)
+    assert response.status_code == 201
+    listing = f"{settings.API_V1_STR}/products/?limit=1000"
+    lagged_fills = response_cache.stats()["lagged_fills"]
+    stale = client.get(listing, headers=user_token_headers)
+    assert stale.headers["x-cache"] == "MISS" and response.json()["id"] not in [p["id"] for p in stale.json()]
+    assert response_cache.stats()["lagged_fills"] == lagged_fills + 1 # Read from the replica too soon after the write: not kept
+
+    # The replica caught up: that body is the one stored (the lag check runs only with replicas configured)
+    for dependency, override in caught_up.items():
+        monkeypatch.setitem(app.dependency_overrides, dependency, override)
+    products = client.get(listing, headers=user_token_headers)
+    assert products.headers["x-cache"] == "MISS" and response.json()["id"] in [p["id"] for p in products.json()]
+    replica_engine.dispose()
+
+def test_product_list_cache_follows_orders(client: TestClient, superuser_token_headers, user_token_headers, test_client_data):
+    payload = {"description": "Cached Stock Product", "sale_value": "4.00", "barcode": "CACHE-0002", "section": "Cache Stock", "initial_stock": 3}
+    response = client.post(f"{settings.API_V1_STR}/products/", headers=superuser_token_headers, json=payload)
+    assert response.status_code == 201
+    product_id = response.json()["id"]
+    listing = f"{settings.API_V1_STR}/products/?categoria=Cache Stock"
+    available = f"{listing}&disponibilidade=true"
+    assert client.get(listing, headers=user_token_headers).json()[0]["current_stock"] == 3
+    assert client.get(available, headers=user_token_headers).headers["x-cache"] == "MISS"
+    etag = client.get(available, headers=user_token_headers).headers["etag"]
+
+    def order(quantity):
+        response = client.post(f"{settings.API_V1_STR}/orders/", headers=user_token_headers, json={
+            "client_id": test_client_data["id"], "items": [{"product_id": product_id, "quantity": quantity}],
+        })
+        assert response.status_code == 201
+
+    order(1) # Stock change: the pages showing the product are refreshed
+    response = client.get(listing, headers=user_token_headers)
+    assert response.headers["x-cache"] == "MISS" and response.json()[0]["current_stock"] == 2
+    order(2) # Sold out: it leaves the available list
+    response = client.get(available, headers={**user_token_headers, "If-None-Match": etag})
+    assert response.status_code == 200 and response.json() == []
+    unavailable = client.get(f"{listing}&disponibilidade=false", headers=user_token_headers).json()
+    assert [product["id"] for product in unavailable] == [product_id]
+
+def test_response_cache_skips_fills_racing_writes():
+    cache = ResponseCache(ttl_seconds=60, max_size=10)
+    stamp = cache.begin_fill()
+    cache.invalidate(["product:1"]) # Committed while the body was being built
+    cache.store("user:/products/1?", stamp, CachedResponse('"a"', b"{}"), ["product:1"])
+    assert cache.lookup("user:/products/1?") is None and cache.stats()["stale_fills"] == 1
+    cache.store("user:/products/1?", cache.begin_fill(), CachedResponse('"a"', b"{}"), ["product:1"])
+    assert cache.lookup("user:/products/1?").body == b"{}"
+    cache.invalidate(["product:2"])
+    assert cache.lookup("user:/products/1?") is not None # Other products' writes keep the entry
+    cache.invalidate(["product:1"])
+    assert cache.lookup("user:/products/1?") is None
+
+def test_response_cache_skips_fills_within_replica_lag():
+    cache = ResponseCache(ttl_seconds=60, max_size=10, replica_lag_seconds=60)
+    cache.invalidate(["product:1"])
+    # Started after the write, but a replica may not have replayed it yet
+    cache.store("user:/products/1?", cache.begin_fill(), CachedResponse('"a"', b"{}"), ["product:1"])
+    assert cache.lookup("user:/products/1?") is None and cache.stats()["lagged_fills"] == 1
+    cache.store("user:/products/2?", cache.begin_fill(), CachedResponse('"b"', b"{}"), ["product:2"])
+    assert cache.lookup("user:/products/2?") is not None # Other products' bodies are still kept
+    cache.replica_lag_seconds = 0
+    cache.store("user:/products/1?", cache.begin_fill(), CachedResponse('"a"', b"{}"), ["product:1"])
+    assert cache.lookup("user:/products/1?") is not None
@@ -0,0 +1,125 @@
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, delete, text
+from sqlalchemy.orm import sessionmaker
+from app.core.config import settings
+from app import models
+from app.services import report as report_service
+import pytest
+from decimal import Decimal
+
+CANCELLED = models.ORDER_STATUS_CODES[models.OrderStatus.CANCELLED] # Stored status code
+
+# Naive GROUP BY queries over the raw tables: the reports must always agree with them
+NAIVE_DAILY = text(
+    "SELECT date(o.created_at), count(*), sum(o.total_value), "
+    "(SELECT coalesce(sum(i.quantity), 0) FROM order_items i JOIN orders o2 ON o2.id = i.order_id "
+    f" WHERE date(o2.created_at) = date(o.created_at) AND o2.status != {CANCELLED}) "
+    f"FROM orders o WHERE o.status != {CANCELLED} GROUP BY date(o.created_at) ORDER BY 1"
+)
+NAIVE_PRODUCTS = text(
+    "SELECT i.product_id, sum(i.quantity), sum(i.quantity * i.unit_price) FROM order_items i "
+    f"JOIN orders o ON o.id = i.order_id WHERE o.status != {CANCELLED} GROUP BY i.product_id"
+)
+NAIVE_SECTIONS = text(
+    "SELECT s.name, sum(i.quantity), sum(i.quantity * i.unit_price) FROM order_items i "
+    "JOIN orders o ON o.id = i.order_id JOIN products p ON p.id = i.product_id LEFT JOIN sections s ON s.id = p.section_id "
+    f"WHERE o.status != {CANCELLED} GROUP BY s.name"
+)
+
+def cents(value) -> Decimal:
+    return Decimal(str(value)).quantize(Decimal("0.01"))
+
+@pytest.fixture(scope="module")
+def raw_db():
+    # Own engine on the test database file, outside the API's sessions
+    engine = create_engine("sqlite:///./test_db.db", connect_args={"check_same_thread": False})
+    Session = sessionmaker(bind=engine)
+    with Session() as session:
+        yield session
+    engine.dispose()
+
+def assert_reports_match_group_by(client: TestClient, headers, raw_db):
+    raw_db.rollback() # Fresh snapshot
+    daily = client.get(f"{settings.API_V1_STR}/reports/daily-revenue", headers=headers).json()
+    assert [(row["day"], row["orders_count"], cents(row["revenue"]), row["units"]) for row in daily] == [
+        (day, count, cents(revenue), units) for day, count, revenue, units in raw_db.execute(NAIVE_DAILY)
+    ]
+    products = client.get(f"{settings.API_V1_STR}/reports/products?limit=1000", headers=headers).json()
+    assert {row["product_id"]: (row["units"], cents(row["revenue"])) for row in products} == {
+        product_id: (units, cents(revenue)) for product_id, units, revenue in raw_db.execute(NAIVE_PRODUCTS)
+    }
+    sections = client.get(f"{settings.API_V1_STR}/reports/sections", headers=headers).json()
+    assert {row["section"]: (row["units"], cents(row["revenue"])) for row in sections} == {
+        section: (units, cents(revenue)) for section, units, revenue in raw_db.execute(NAIVE_SECTIONS)
+    }
+    return daily, products, sections
+
+def test_reports_follow_order_writes(client: TestClient, superuser_token_headers, user_token_headers, raw_db):
+    # Orders written by other tests (some straight into the database) are backfilled first
+    report_service.rebuild_reports(raw_db)
+
+    response = client.post(f"{settings.API_V1_STR}/clients/", headers=superuser_token_headers, json={
+        "name": "Report Client", "email": "report.client@example.com", "cpf": "73000000001",
+    })
+    assert response.status_code == 201
+    client_id = response.json()["id"]
+    product_ids = []
+    for i, (section, price) in enumerate((("Reports A", "10.50"), ("Reports B", "99.99"), (None, "3.33"))):
+        payload = {"description": f"Report Product {i}", "sale_value": price, "barcode": f"REPORT{i}", "section": section, "initial_stock": 100}
+        response = client.post(f"{settings.API_V1_STR}/products/", headers=superuser_token_headers, json=payload)
+        assert response.status_code == 201
+        product_ids.append(response.json()["id"])
+
+    def create(items, status=None):
+        payload = {"client_id": client_id, "items": [{"product_id": product_ids[p], "quantity": q} for p, q in items]}
+        if status:
+            payload["status"] = status
+        response = client.post(f"{settings.API_V1_STR}/orders/", headers=user_token_headers, json=payload)
+        assert response.status_code == 201
+        return response.json()["id"]
+
+    kept = create([(0, 2), (1, 1), (0, 3)]) # Repeated product
+    to_cancel = create([(1, 4)])
+    create([(2, 5)], status="cancelled") # Never counted
+    reopened = create([(0, 1), (2, 1)], status="cancelled")
+    to_delete = create([(1, 2), (2, 2)])
+    # Batch creation updates the aggregates the same way
+    response = client.post(f"{settings.API_V1_STR}/orders/batch", headers=user_token_headers, json={"orders": [
+        {"client_id": client_id, "items": [{"product_id": product_ids[1], "quantity": 1}, {"product_id": product_ids[2], "quantity": 3}]},
+        {"client_id": client_id, "status": "cancelled", "items": [{"product_id": product_ids[2], "quantity": 1}]},
+    ]})
+    assert response.status_code == 200 and response.json()["created"] == 2
+    assert_reports_match_group_by(client, user_token_headers, raw_db)
+
+    for order_id, new_status in ((to_cancel, "cancelled"), (reopened, "pending"), (kept, "processing")):
+        response = client.put(f"{settings.API_V1_STR}/orders/{order_id}", headers=user_token_headers, json={"status": new_status})
+        assert response.status_code == 200
+    assert client.delete(f"{settings.API_V1_STR}/orders/{to_delete}", headers=superuser_token_headers).status_code == 200
+    # Moving a product to another section moves its past sales too
+    response = client.put(f"{settings.API_V1_STR}/products/{product_ids[0]}", headers=superuser_token_headers, json={"section": "Reports B"})
+    assert response.status_code == 200
+    daily, products, sections = assert_reports_match_group_by(client, user_token_headers, raw_db)
+
+    sales = {row["product_id"]: row for row in products}
+    assert sales[product_ids[0]]["units"] == 6 # 2 + 3 + 1 (reopened)
+    assert cents(sales[product_ids[0]]["revenue"]) == Decimal("63.00")
+    assert "Reports A" not in {row["section"] for row in sections}
+    assert None in {row["section"] for row in sections}
+
+    # Period filter
+    day = daily[-1]["day"]
+    response = client.get(f"{settings.API_V1_STR}/reports/daily-revenue?periodo_inicio={day}&periodo_fim={day}", headers=user_token_headers)
+    assert [row["day"] for row in response.json()] == [day]
+
+def test_rebuild_reports(client: TestClient, user_token_headers, raw_db):
+    before = assert_reports_match_group_by(client, user_token_headers, raw_db)
+    for model in (models.DailyRevenue, models.ProductSales, models.SectionRevenue):
+        raw_db.execute(delete(model))
+    raw_db.commit()
+    counts = report_service.rebuild_reports(raw_db)
+    assert counts["report_product_sales"] >= 3
+    assert assert_reports_match_group_by(client, user_token_headers, raw_db) == before
+
+def test_reports_unauthenticated(client: TestClient):
+    response = client.get(f"{settings.API_V1_STR}/reports/sections")
+    assert response.status_code == 401